@@ -0,0 +1,99 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.crud.convenios_crud import CAMPOS_CONVENIO
+from app.crud.homologaciones_crud import CAMPOS_HOMOLOGACION
+from app.crud.institucion import CAMPOS_INSTITUCION
+from core.proyeccion import columnas_sql
+
+logger = logging.getLogger(__name__)
+
+# Entidad del feed -> (tabla, columna clave, tipo de la clave, columnas). Las filas se envían
+# normalizadas (instituciones sin nom_municipio): el cliente ya sincroniza los municipios.
+ENTIDADES_CAMBIOS = {
+    "convenios": ("convenios", "id_convenio", int, CAMPOS_CONVENIO),
+    "instituciones": ("instituciones", "nit_institucion", str,
+                      tuple(campo for campo in CAMPOS_INSTITUCION if campo != "nom_municipio")),
+    "homologaciones": ("homologacion", "id_homologacion", int, CAMPOS_HOMOLOGACION),
+    "municipios": ("municipio", "id_municipio", str, ("id_municipio", "nom_municipio")),
+}
+
+
+def hora_servidor(db: Session) -> datetime:
+    """Hora de la base de datos: los cursores se comparan con fecha_actualizacion, que la fija MySQL"""
+    try:
+        ahora = db.execute(text("SELECT CURRENT_TIMESTAMP")).scalar()
+        return ahora if isinstance(ahora, datetime) else datetime.fromisoformat(str(ahora))
+    except SQLAlchemyError as e:
+        logger.error(f"Error al consultar la hora del servidor: {e}")
+        raise Exception("Error de base de datos al consultar la hora del servidor")
+
+
+def limite_purga(db: Session) -> Optional[datetime]:
+    """
+    Fecha hasta la que el evento ev_purgar_registro_eliminados borró lápidas, o None si
+    nunca purgó. Un cursor anterior pudo perder eliminaciones: el cliente debe resincronizar.
+    """
+    try:
+        limite = db.execute(
+            text("SELECT purgado_hasta FROM registro_eliminados_purga WHERE id = 1")
+        ).scalar()
+        if limite is None or isinstance(limite, datetime):
+            return limite
+        return datetime.fromisoformat(str(limite))
+    except SQLAlchemyError as e:
+        logger.error(f"Error al consultar el límite de purga de las lápidas: {e}")
+        raise Exception("Error de base de datos al consultar el límite de purga")
+
+
+def obtener_cambios(db: Session, desde: datetime, max_filas: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Filas creadas o actualizadas (fecha_actualizacion >= desde, por índice) y claves
+    eliminadas (registro_eliminados) de cada entidad del feed.
+
+    La comparación es inclusiva: una fila puede repetirse entre dos consultas, lo que no
+    afecta a un cliente que aplica los cambios por clave. Si una entidad supera `max_filas`
+    no se envían sus filas y se marca `resincronizar`, para que el cliente descargue el listado completo.
+    """
+    try:
+        cambios = {}
+        for entidad, (tabla, clave, tipo_clave, campos) in ENTIDADES_CAMBIOS.items():
+            actualizados = db.execute(
+                text(f"""
+                    SELECT {columnas_sql(tabla, campos)}, {tabla}.fecha_actualizacion
+                    FROM {tabla}
+                    WHERE {tabla}.fecha_actualizacion >= :desde
+                    ORDER BY {tabla}.fecha_actualizacion, {tabla}.{clave}
+                    LIMIT :limite
+                """),
+                {"desde": desde, "limite": max_filas + 1}
+            ).mappings().all()
+
+            eliminados: List[Any] = db.execute(
+                text("""
+                    SELECT clave
+                    FROM registro_eliminados
+                    WHERE entidad = :tabla AND fecha_eliminacion >= :desde
+                    ORDER BY fecha_eliminacion, id_eliminado
+                    LIMIT :limite
+                """),
+                {"tabla": tabla, "desde": desde, "limite": max_filas + 1}
+            ).scalars().all()
+
+            if len(actualizados) > max_filas or len(eliminados) > max_filas:
+                cambios[entidad] = {"actualizados": [], "eliminados": [], "resincronizar": True}
+            else:
+                cambios[entidad] = {
+                    "actualizados": actualizados,
+                    # registro_eliminados guarda la clave como texto
+                    "eliminados": [tipo_clave(valor) for valor in dict.fromkeys(eliminados)],
+                    "resincronizar": False,
+                }
+        return cambios
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener el feed de cambios: {e}")
+        raise Exception("Error de base de datos al obtener los cambios")
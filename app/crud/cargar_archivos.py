@@ -4,6 +4,12 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 import logging
 
+from app.crud.convenios_crud import indice_convenios
+from app.crud.reportes import programar_refresco_reportes
+from core.busqueda import con_normalizadas
+from core.cache import invalidar_cache
+from core.notificaciones import canal_cambios
+
 logger = logging.getLogger(__name__)
 
 def insertar_datos_en_bd(db: Session, df_convenios):
@@ -46,6 +52,7 @@ def insertar_datos_en_bd(db: Session, df_convenios):
                     fecha_publicacion_proceso = :fecha_publicacion_proceso,
                     enlace_secop = :enlace_secop,
                     supervisor = :supervisor,
+                    supervisor_norm = :supervisor_norm,
                     precio_estimado = :precio_estimado,
                     tipo_convenio_sena = :tipo_convenio_sena,
                     persona_apoyo_fpi = :persona_apoyo_fpi,
@@ -58,6 +65,7 @@ def insertar_datos_en_bd(db: Session, df_convenios):
                 row_dict = row.to_dict()
                 # Reemplazar NaN por None para SQL
                 row_dict = {k: (None if pd.isna(v) else v) for k, v in row_dict.items()}
+                row_dict = con_normalizadas("convenios", row_dict)
                 
                 result = db.execute(actualizar_convenio_sql, row_dict)
                 db.commit()
@@ -79,20 +87,21 @@ def insertar_datos_en_bd(db: Session, df_convenios):
                     fecha_inicio, duracion_convenio, plazo_ejecucion, prorroga,
                     plazo_prorroga, duracion_total, fecha_publicacion_proceso,
                     enlace_secop, supervisor, precio_estimado, tipo_convenio_sena,
-                    persona_apoyo_fpi, enlace_evidencias
+                    persona_apoyo_fpi, enlace_evidencias, supervisor_norm
                 ) VALUES (
                     :tipo_convenio, :num_convenio, :nit_institucion, :num_proceso, :nombre_institucion,
                     :estado_convenio, :objetivo_convenio, :tipo_proceso, :fecha_firma,
                     :fecha_inicio, :duracion_convenio, :plazo_ejecucion, :prorroga,
                     :plazo_prorroga, :duracion_total, :fecha_publicacion_proceso,
                     :enlace_secop, :supervisor, :precio_estimado, :tipo_convenio_sena,
-                    :persona_apoyo_fpi, :enlace_evidencias
+                    :persona_apoyo_fpi, :enlace_evidencias, :supervisor_norm
                 )
             """)
             
             try:
                 row_dict = row.to_dict()
                 row_dict = {k: (None if pd.isna(v) else v) for k, v in row_dict.items()}
+                row_dict = con_normalizadas("convenios", row_dict)
                 
                 result = db.execute(insertar_convenio_sql, row_dict)
                 db.commit()
@@ -105,6 +114,18 @@ def insertar_datos_en_bd(db: Session, df_convenios):
                 logger.error(msg)
                 db.rollback()
 
+    # La carga masiva no actualiza el índice fila a fila: se reconstruye en la próxima búsqueda
+    indice_convenios.invalidar()
+    # Los triggers de convenios actualizan instituciones y estadísticas
+    invalidar_cache("instituciones", "estadisticas")
+    programar_refresco_reportes()
+    # Avisa a los tableros conectados a este proceso (los demás workers lo notan por data_version)
+    canal_cambios.publicar("importacion", {
+        "insertados": convenios_insertados,
+        "actualizados": convenios_actualizados,
+        "errores": len(errores),
+    })
+
     # Retornar resultado final después del loop
     return {
         "programas_insertados": convenios_insertados,
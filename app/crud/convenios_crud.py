@@ -1,12 +1,18 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from sqlalchemy.exc import SQLAlchemyError
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple, Iterator
 import logging
 import re
 
 from app.schemas.convenios_schema import CrearConvenio, EditarConvenio, RetornoConvenio
+from app.crud.reportes import programar_refresco_reportes
+from core.busqueda import IndiceTrigramas, con_normalizadas, normalizar_texto
+from core.proyeccion import columnas_sql
+from core.database import engine
+from core.config import settings
+from core.cache import invalidar_cache
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,6 +20,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Índice en memoria para las búsquedas por subcadena de número de convenio y de proceso
+indice_convenios = IndiceTrigramas("convenios", "id_convenio", ("num_convenio", "num_proceso"))
+
+CAMPOS_CONVENIO = (
+    "id_convenio", "tipo_convenio", "num_convenio",
+    "nit_institucion", "num_proceso", "nombre_institucion",
+    "estado_convenio", "objetivo_convenio", "tipo_proceso",
+    "fecha_firma", "fecha_inicio", "duracion_convenio",
+    "plazo_ejecucion", "prorroga", "plazo_prorroga",
+    "duracion_total", "fecha_publicacion_proceso", "enlace_secop",
+    "supervisor", "precio_estimado", "tipo_convenio_sena",
+    "persona_apoyo_fpi", "enlace_evidencias",
+)
+
+COLUMNAS_CONVENIO = columnas_sql("convenios", CAMPOS_CONVENIO)
+
+ORDEN_FECHA_FIRMA = """
+    CASE 
+        WHEN convenios.fecha_firma IS NULL OR convenios.fecha_firma = 'N/A'
+        THEN '9999-12-31'
+        ELSE convenios.fecha_firma
+    END DESC
+"""
+
 def validar_fecha_formato(fecha_str: str) -> bool:
     """Valida que una fecha esté en formato ISO (YYYY-MM-DD)"""
     if not fecha_str or fecha_str == "N/A":
@@ -150,18 +180,21 @@ def crear_convenio(db: Session, convenio: CrearConvenio) -> Optional[bool]:
                 estado_convenio, objetivo_convenio, tipo_proceso, fecha_firma, fecha_inicio, 
                 duracion_convenio, plazo_ejecucion, prorroga, plazo_prorroga, duracion_total, 
                 fecha_publicacion_proceso, enlace_secop, supervisor, precio_estimado, 
-                tipo_convenio_sena, persona_apoyo_fpi, enlace_evidencias
+                tipo_convenio_sena, persona_apoyo_fpi, enlace_evidencias, supervisor_norm
             ) VALUES (
                 :tipo_convenio, :num_convenio, :nit_institucion, :num_proceso, :nombre_institucion,
                 :estado_convenio, :objetivo_convenio, :tipo_proceso, :fecha_firma, :fecha_inicio, 
                 :duracion_convenio, :plazo_ejecucion, :prorroga, :plazo_prorroga, :duracion_total, 
                 :fecha_publicacion_proceso, :enlace_secop, :supervisor, :precio_estimado, 
-                :tipo_convenio_sena, :persona_apoyo_fpi, :enlace_evidencias
+                :tipo_convenio_sena, :persona_apoyo_fpi, :enlace_evidencias, :supervisor_norm
             )
         """)
         
-        db.execute(query, datos_convenio)
+        resultado = db.execute(query, con_normalizadas("convenios", datos_convenio))
         db.commit()
+        invalidar_cache("instituciones", "estadisticas")
+        programar_refresco_reportes()
+        indice_convenios.actualizar(resultado.lastrowid, datos_convenio)
         logger.info(f" Convenio creado exitosamente: {datos_convenio.get('num_convenio')}")
         return True
         
@@ -177,26 +210,14 @@ def crear_convenio(db: Session, convenio: CrearConvenio) -> Optional[bool]:
         logger.error(f" Error inesperado al crear el convenio: {str(e)}")
         raise Exception(f"Error al crear el convenio: {str(e)}")
 
-def obtener_todos_convenios(db: Session) -> List[RetornoConvenio]:
+def obtener_todos_convenios(db: Session, campos: Optional[List[str]] = None) -> List[RetornoConvenio]:
+    """`campos` limita las columnas consultadas (por defecto todas)"""
     try:
-        query = text("""
-            SELECT  
-                convenios.id_convenio, convenios.tipo_convenio, convenios.num_convenio, 
-                convenios.nit_institucion, convenios.num_proceso, convenios.nombre_institucion,
-                convenios.estado_convenio, convenios.objetivo_convenio, convenios.tipo_proceso, 
-                convenios.fecha_firma, convenios.fecha_inicio, convenios.duracion_convenio,
-                convenios.plazo_ejecucion, convenios.prorroga, convenios.plazo_prorroga, 
-                convenios.duracion_total, convenios.fecha_publicacion_proceso, convenios.enlace_secop,
-                convenios.supervisor, convenios.precio_estimado, convenios.tipo_convenio_sena, 
-                convenios.persona_apoyo_fpi, convenios.enlace_evidencias
+        columnas = columnas_sql("convenios", campos) if campos else COLUMNAS_CONVENIO
+        query = text(f"""
+            SELECT {columnas}
             FROM convenios
-            ORDER BY 
-                CASE 
-                    WHEN convenios.fecha_firma IS NULL OR convenios.fecha_firma = 'N/A'
-                    THEN '9999-12-31'
-                    ELSE convenios.fecha_firma
-                END DESC,
-                convenios.id_convenio DESC
+            ORDER BY {ORDEN_FECHA_FIRMA}, convenios.id_convenio DESC
         """)
         result = db.execute(query).mappings().all()
         logger.info(f" Se obtuvieron {len(result)} convenios")
@@ -206,6 +227,34 @@ def obtener_todos_convenios(db: Session) -> List[RetornoConvenio]:
         logger.error(f" Error al obtener todos los convenios: {str(e)}")
         raise Exception(f"Error de base de datos al obtener los convenios: {str(e)}")
 
+def exportar_convenios(campos: Optional[List[str]] = None) -> Iterator[List]:
+    """
+    Recorre todos los convenios con un cursor del lado del servidor (SSCursor en PyMySQL)
+    y los entrega en bloques de EXPORTACION_FILAS_POR_BLOQUE filas, sin cargar la tabla
+    completa en memoria.
+
+    Usa su propia conexión en lugar de la sesión de la petición porque el recorrido
+    continúa mientras se envía la respuesta; la conexión se libera al agotar o cerrar
+    el generador (por ejemplo si el cliente se desconecta).
+    """
+    columnas = columnas_sql("convenios", campos) if campos else COLUMNAS_CONVENIO
+    query = text(f"""
+        SELECT {columnas}
+        FROM convenios
+        ORDER BY convenios.id_convenio
+    """)
+    total = 0
+    try:
+        with engine.connect() as conexion:
+            resultado = conexion.execution_options(stream_results=True).execute(query)
+            for bloque in resultado.mappings().partitions(settings.EXPORTACION_FILAS_POR_BLOQUE):
+                total += len(bloque)
+                yield bloque
+        logger.info(f" Exportación de convenios completada: {total} filas")
+    except SQLAlchemyError as e:
+        logger.error(f" Error durante la exportación de convenios tras {total} filas: {str(e)}")
+        raise Exception(f"Error de base de datos al exportar los convenios: {str(e)}")
+
 def obtener_convenio_by_id(db: Session, id_convenio: int):
     try:
         query = text("""
@@ -234,27 +283,55 @@ def obtener_convenio_by_id(db: Session, id_convenio: int):
         logger.error(f" Error al buscar el convenio por id: {str(e)}")
         raise Exception(f"Error de base de datos al buscar el convenio por id: {str(e)}")
 
+def obtener_convenios_by_ids(db: Session, ids: List[int]) -> Tuple[List, List[int]]:
+    """
+    Obtiene varios convenios en una sola consulta WHERE ... IN.
+    Retorna (convenios en el orden de `ids`, ids no encontrados).
+    """
+    try:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return [], []
+        query = text(f"""
+            SELECT {COLUMNAS_CONVENIO}
+            FROM convenios
+            WHERE convenios.id_convenio IN :ids
+        """).bindparams(bindparam("ids", expanding=True))
+        filas = db.execute(query, {"ids": ids}).mappings().all()
+        por_id = {fila["id_convenio"]: fila for fila in filas}
+        logger.info(f" Se obtuvieron {len(por_id)} de {len(ids)} convenios solicitados por lote")
+        return [por_id[i] for i in ids if i in por_id], [i for i in ids if i not in por_id]
+
+    except SQLAlchemyError as e:
+        logger.error(f" Error al buscar convenios por lote de ids: {str(e)}")
+        raise Exception(f"Error de base de datos al buscar convenios por lote: {str(e)}")
+
+def obtener_convenios_by_ids_indice(db: Session, ids: List[int]):
+    """Obtiene los convenios resueltos por el índice de trigramas, en el orden habitual"""
+    if not ids:
+        return []
+    query = text(f"""
+        SELECT {COLUMNAS_CONVENIO}
+        FROM convenios
+        WHERE convenios.id_convenio IN :ids
+        ORDER BY {ORDEN_FECHA_FIRMA}
+    """).bindparams(bindparam("ids", expanding=True))
+    return db.execute(query, {"ids": list(ids)}).mappings().all()
+
 def obtener_convenios_by_num_convenio(db: Session, num_conv: str):
     try:
+        ids = indice_convenios.buscar("num_convenio", num_conv)
+        if ids is not None:
+            result = obtener_convenios_by_ids_indice(db, ids)
+            logger.info(f"🔍 Se encontraron {len(result)} convenios con número: {num_conv}")
+            return result
+
         filtro = f"%{num_conv}%"
-        query = text("""
-            SELECT  
-                convenios.id_convenio, convenios.tipo_convenio, convenios.num_convenio, 
-                convenios.nit_institucion, convenios.num_proceso, convenios.nombre_institucion,
-                convenios.estado_convenio, convenios.objetivo_convenio, convenios.tipo_proceso, 
-                convenios.fecha_firma, convenios.fecha_inicio, convenios.duracion_convenio,
-                convenios.plazo_ejecucion, convenios.prorroga, convenios.plazo_prorroga, 
-                convenios.duracion_total, convenios.fecha_publicacion_proceso, convenios.enlace_secop,
-                convenios.supervisor, convenios.precio_estimado, convenios.tipo_convenio_sena, 
-                convenios.persona_apoyo_fpi, convenios.enlace_evidencias
+        query = text(f"""
+            SELECT {COLUMNAS_CONVENIO}
             FROM convenios
             WHERE convenios.num_convenio LIKE :num_convenio
-            ORDER BY 
-                CASE 
-                    WHEN convenios.fecha_firma IS NULL OR convenios.fecha_firma = 'N/A'
-                    THEN '9999-12-31'
-                    ELSE convenios.fecha_firma
-                END DESC
+            ORDER BY {ORDEN_FECHA_FIRMA}
         """)
         result = db.execute(query, {"num_convenio": filtro}).mappings().all()
         logger.info(f"🔍 Se encontraron {len(result)} convenios con número: {num_conv}")
@@ -264,6 +341,48 @@ def obtener_convenios_by_num_convenio(db: Session, num_conv: str):
         logger.error(f" Error al buscar el convenio por número: {str(e)}")
         raise Exception(f"Error de base de datos al buscar el convenio por número: {str(e)}")
 
+def obtener_convenios_by_num_proceso(db: Session, num_proceso: str):
+    try:
+        ids = indice_convenios.buscar("num_proceso", num_proceso)
+        if ids is not None:
+            result = obtener_convenios_by_ids_indice(db, ids)
+            logger.info(f"🔍 Se encontraron {len(result)} convenios con proceso: {num_proceso}")
+            return result
+
+        filtro = f"%{num_proceso}%"
+        query = text(f"""
+            SELECT {COLUMNAS_CONVENIO}
+            FROM convenios
+            WHERE convenios.num_proceso LIKE :num_proceso
+            ORDER BY {ORDEN_FECHA_FIRMA}
+        """)
+        result = db.execute(query, {"num_proceso": filtro}).mappings().all()
+        logger.info(f"🔍 Se encontraron {len(result)} convenios con proceso: {num_proceso}")
+        return result
+        
+    except SQLAlchemyError as e:
+        logger.error(f" Error al buscar el convenio por número de proceso: {str(e)}")
+        raise Exception(f"Error de base de datos al buscar el convenio por número de proceso: {str(e)}")
+
+def obtener_convenios_by_supervisor(db: Session, supervisor: str):
+    try:
+        # supervisor_norm es una columna generada (minúsculas, sin tildes) con índice:
+        # la búsqueda por prefijo se resuelve como un rango sobre idx_supervisor_norm
+        filtro = f"{normalizar_texto(supervisor)}%"
+        query = text(f"""
+            SELECT {COLUMNAS_CONVENIO}
+            FROM convenios
+            WHERE convenios.supervisor_norm LIKE :supervisor
+            ORDER BY {ORDEN_FECHA_FIRMA}
+        """)
+        result = db.execute(query, {"supervisor": filtro}).mappings().all()
+        logger.info(f"🔍 Se encontraron {len(result)} convenios supervisados por: {supervisor}")
+        return result
+        
+    except SQLAlchemyError as e:
+        logger.error(f" Error al buscar los convenios por supervisor: {str(e)}")
+        raise Exception(f"Error de base de datos al buscar los convenios por supervisor: {str(e)}")
+
 def obtener_convenios_by_rango_fechas_firma(db: Session, fecha_ini: str, fecha_fin: str):
     try:
         query = text("""
@@ -320,6 +439,180 @@ def obtener_convenios_by_rango_fechas_inicio(db: Session, fecha_ini: str, fecha_
         logger.error(f" Error al buscar los convenios por rango de fechas de inicio: {str(e)}")
         raise Exception(f"Error de base de datos al buscar los convenios por rango de fechas de inicio: {str(e)}")
 
+# Columnas por las que se permite ordenar la búsqueda combinada
+COLUMNAS_ORDENABLES = {
+    "id_convenio", "num_convenio", "nombre_institucion", "estado_convenio",
+    "tipo_convenio_sena", "fecha_firma", "fecha_inicio", "precio_estimado",
+}
+
+# Filtros de igualdad cuyas columnas tienen índice propio en la tabla convenios
+FILTROS_IGUALDAD_INDEXADOS = (
+    ("nit_institucion", "idx_nit_institucion"),
+    ("tipo_convenio_sena", "idx_tipo_convenio_sena"),
+    ("estado_convenio", "idx_estado_convenio"),
+    ("persona_apoyo_fpi", "idx_persona_apoyo"),
+)
+
+# Filtros de igualdad sin índice: solo restringen las filas ya seleccionadas
+FILTROS_IGUALDAD_SIN_INDICE = ("tipo_convenio", "tipo_proceso")
+
+def construir_filtros_convenios(db: Session, filtros: Dict) -> Optional[Tuple[List[str], Dict]]:
+    """
+    Traduce los filtros de la búsqueda combinada a condiciones SQL. Índice que puede usar
+    MySQL para cada tipo de filtro:
+      1. Igualdades sobre columnas indexadas (idx_nit_institucion, idx_tipo_convenio_sena, ...)
+      2. Rango sobre fecha_firma (idx_fecha_firma)
+      3. Prefijo sobre supervisor_norm (idx_supervisor_norm)
+      4. Subcadenas de número de convenio / proceso resueltas por el índice de trigramas
+      5. Filtros sin índice (tipo, tipo de proceso, fecha de inicio, nombre, objetivo)
+    Retorna None cuando se sabe de antemano que no hay resultados.
+    """
+    condiciones = []
+    params = {}
+
+    for campo, _indice in FILTROS_IGUALDAD_INDEXADOS:
+        if filtros.get(campo):
+            condiciones.append(f"convenios.{campo} = :{campo}")
+            params[campo] = filtros[campo]
+
+    # Las fechas se guardan como VARCHAR (YYYY-MM-DD o texto como 'N/A'). Un BETWEEN entre
+    # fechas ISO excluye los textos (las letras ordenan después de '9') y conserva el rango.
+    if filtros.get("fecha_firma_desde") or filtros.get("fecha_firma_hasta"):
+        condiciones.append("convenios.fecha_firma BETWEEN :fecha_firma_desde AND :fecha_firma_hasta")
+        params["fecha_firma_desde"] = filtros.get("fecha_firma_desde") or "0000-01-01"
+        params["fecha_firma_hasta"] = filtros.get("fecha_firma_hasta") or "9999-12-31"
+
+    if filtros.get("supervisor"):
+        condiciones.append("convenios.supervisor_norm LIKE :supervisor")
+        params["supervisor"] = f"{normalizar_texto(filtros['supervisor'])}%"
+
+    ids_indice = None
+    for campo in ("num_convenio", "num_proceso"):
+        if not filtros.get(campo):
+            continue
+        ids = indice_convenios.buscar(campo, filtros[campo])
+        if ids is None:
+            condiciones.append(f"convenios.{campo} LIKE :{campo}")
+            params[campo] = f"%{filtros[campo]}%"
+        else:
+            ids_indice = set(ids) if ids_indice is None else ids_indice & set(ids)
+    if ids_indice is not None:
+        if not ids_indice:
+            return None
+        condiciones.append("convenios.id_convenio IN :ids_indice")
+        params["ids_indice"] = list(ids_indice)
+
+    for campo in FILTROS_IGUALDAD_SIN_INDICE:
+        if filtros.get(campo):
+            condiciones.append(f"convenios.{campo} = :{campo}")
+            params[campo] = filtros[campo]
+
+    if filtros.get("fecha_inicio_desde") or filtros.get("fecha_inicio_hasta"):
+        condiciones.append("convenios.fecha_inicio BETWEEN :fecha_inicio_desde AND :fecha_inicio_hasta")
+        params["fecha_inicio_desde"] = filtros.get("fecha_inicio_desde") or "0000-01-01"
+        params["fecha_inicio_hasta"] = filtros.get("fecha_inicio_hasta") or "9999-12-31"
+
+    if filtros.get("nombre_institucion"):
+        condiciones.append("convenios.nombre_institucion LIKE :nombre_institucion")
+        params["nombre_institucion"] = f"%{filtros['nombre_institucion']}%"
+
+    if filtros.get("objetivo"):
+        condiciones.append("convenios.objetivo_convenio LIKE :objetivo")
+        params["objetivo"] = f"%{filtros['objetivo']}%"
+
+    return condiciones, params
+
+def buscar_convenios(
+    db: Session,
+    filtros: Dict,
+    ordenar_por: Optional[str] = None,
+    descendente: bool = True,
+    limite: Optional[int] = None,
+    desplazamiento: int = 0,
+    campos: Optional[List[str]] = None
+) -> Tuple[List, int]:
+    """
+    Búsqueda combinada de convenios: cualquier combinación de filtros, orden y paginación
+    en una sola consulta. Retorna (convenios de la página, total de coincidencias).
+    `campos` limita las columnas consultadas (por defecto todas).
+    """
+    if ordenar_por is not None and ordenar_por not in COLUMNAS_ORDENABLES:
+        raise ValueError(f"No se puede ordenar por '{ordenar_por}'")
+
+    try:
+        construido = construir_filtros_convenios(db, filtros)
+        if construido is None:
+            return [], 0
+        condiciones, params = construido
+
+        where_clause = " AND ".join(condiciones) if condiciones else "1=1"
+        if ordenar_por:
+            direccion = "DESC" if descendente else "ASC"
+            order_clause = f"convenios.{ordenar_por} {direccion}, convenios.id_convenio {direccion}"
+        else:
+            order_clause = f"{ORDEN_FECHA_FIRMA}, convenios.id_convenio DESC"
+
+        paginacion = ""
+        if limite is not None:
+            paginacion = "LIMIT :limite OFFSET :desplazamiento"
+            params["limite"] = limite
+            params["desplazamiento"] = desplazamiento
+
+        columnas = columnas_sql("convenios", campos) if campos else COLUMNAS_CONVENIO
+        # COUNT(*) OVER() entrega el total de coincidencias en la misma consulta de la página
+        query = text(f"""
+            SELECT {columnas}, COUNT(*) OVER() AS total_registros
+            FROM convenios
+            WHERE {where_clause}
+            ORDER BY {order_clause}
+            {paginacion}
+        """)
+        if "ids_indice" in params:
+            query = query.bindparams(bindparam("ids_indice", expanding=True))
+
+        result = db.execute(query, params).mappings().all()
+        if result:
+            total = result[0]["total_registros"]
+        elif desplazamiento > 0 and limite is not None:
+            # Una página después de la última no trae filas (ni el total de la ventana):
+            # se cuentan las coincidencias aparte para no reportar 0 resultados
+            consulta_total = text(f"SELECT COUNT(*) FROM convenios WHERE {where_clause}")
+            if "ids_indice" in params:
+                consulta_total = consulta_total.bindparams(bindparam("ids_indice", expanding=True))
+            total = db.execute(consulta_total, params).scalar()
+        else:
+            total = 0
+        logger.info(f"🔍 Búsqueda combinada de convenios: {len(result)} de {total} con filtros {list(params)}")
+        return result, total
+
+    except SQLAlchemyError as e:
+        logger.error(f" Error en la búsqueda combinada de convenios: {str(e)}")
+        raise Exception(f"Error de base de datos en la búsqueda de convenios: {str(e)}")
+
+def obtener_convenios_by_nit_institucion(db: Session, nit_institucion: str):
+    return buscar_convenios(db, {"nit_institucion": nit_institucion})[0]
+
+def obtener_convenios_by_nombre_institucion(db: Session, nombre_institucion: str):
+    return buscar_convenios(db, {"nombre_institucion": nombre_institucion})[0]
+
+def obtener_convenios_by_estado_convenio(db: Session, estado_convenio: str):
+    return buscar_convenios(db, {"estado_convenio": estado_convenio})[0]
+
+def obtener_convenios_by_tipo_convenio(db: Session, tipo_convenio: str):
+    return buscar_convenios(db, {"tipo_convenio": tipo_convenio})[0]
+
+def obtener_convenios_by_tipo_proceso(db: Session, tipo_proceso: str):
+    return buscar_convenios(db, {"tipo_proceso": tipo_proceso})[0]
+
+def obtener_convenios_by_tipo_convenio_sena(db: Session, tipo_convenio_sena: str):
+    return buscar_convenios(db, {"tipo_convenio_sena": tipo_convenio_sena})[0]
+
+def obtener_convenios_by_persona_apoyo(db: Session, persona_apoyo_fpi: str):
+    return buscar_convenios(db, {"persona_apoyo_fpi": persona_apoyo_fpi})[0]
+
+def buscar_convenios_by_objetivo(db: Session, palabra_clave: str):
+    return buscar_convenios(db, {"objetivo": palabra_clave})[0]
+
 def actualizar_convenio(db: Session, id_conve: int, convenio_actualizar: EditarConvenio) -> bool:
     try:
         campos = convenio_actualizar.model_dump(exclude_unset=True)
@@ -362,6 +655,7 @@ def actualizar_convenio(db: Session, id_conve: int, convenio_actualizar: EditarC
         if "enlace_evidencias" in campos and campos["enlace_evidencias"]:
             campos["enlace_evidencias"] = limpiar_texto_convenio(campos["enlace_evidencias"])
         
+        campos = con_normalizadas("convenios", campos)
         clausula_set = ", ".join([f"{clave} = :{clave}" for clave in campos])
         campos["id_conven"] = id_conve
 
@@ -373,8 +667,11 @@ def actualizar_convenio(db: Session, id_conve: int, convenio_actualizar: EditarC
         
         resultado = db.execute(query, campos)
         db.commit()
+        invalidar_cache("instituciones", "estadisticas")
+        programar_refresco_reportes()
         
         if resultado.rowcount > 0:
+            indice_convenios.recargar(db, [id_conve])
             logger.info(f" Convenio actualizado exitosamente: ID {id_conve}")
             return True
         else:
@@ -398,8 +695,11 @@ def eliminar_convenio(db: Session, id_convenio: int) -> bool:
         """)
         resultado = db.execute(query, {"id_eliminar": id_convenio})
         db.commit()
+        invalidar_cache("instituciones", "estadisticas")
+        programar_refresco_reportes()
         
         if resultado.rowcount > 0:
+            indice_convenios.eliminar(id_convenio)
             logger.info(f" Convenio eliminado exitosamente: ID {id_convenio}")
             return True
         else:
@@ -413,7 +713,4 @@ def eliminar_convenio(db: Session, id_convenio: int) -> bool:
     except Exception as e:
         db.rollback()
         logger.error(f" Error inesperado al eliminar convenio: {str(e)}")
-        raise Exception(f"Error al eliminar el convenio: {str(e)}")
-
-# Las demás funciones de búsqueda permanecen igual...
-# (obtener_convenios_by_num_proceso, obtener_convenios_by_nit_institucion, etc.)
\ No newline at end of file
+        raise Exception(f"Error al eliminar el convenio: {str(e)}")
\ No newline at end of file
@@ -6,7 +6,8 @@ from typing import Optional, List
 from datetime import datetime
 import logging
 
-from app.schemas.estadistica_schema import CrearEstadisticaCategoria, EditarEstadisticaCategoria, RetornoEstadisticaCategoria
+from app.schemas.estadistica_schema import CrearEstadisticaCategoria, EditarEstadisticaCategoria, RetornoEstadisticaCategoria, DashboardEstadisticas, SeriePeriodos
+from core.cache import cache_lectura, invalidar_cache
 
 logger = logging.getLogger(__name__)
 
@@ -23,12 +24,14 @@ def crear_estadistica_categoria(db: Session, estadistica: CrearEstadisticaCatego
         """)
         db.execute(query, data_estadistica)
         db.commit()
+        invalidar_cache("estadisticas")
         return True
     except Exception as e:
         db.rollback()
         logger.error(f"Error al crear la estadística de categoría: {e}")
         raise Exception("Error de base de datos al crear la estadística de categoría")
 
+@cache_lectura("estadisticas", tablas=("estadistica_categoria",))
 def obtener_todas_estadisticas(db: Session) -> List[RetornoEstadisticaCategoria]:
     try:
         query = text("""
@@ -43,6 +46,123 @@ def obtener_todas_estadisticas(db: Session) -> List[RetornoEstadisticaCategoria]
         logger.error(f"Error al obtener todas las estadísticas: {e}")
         raise Exception("Error de base de datos al obtener las estadísticas")
 
+@cache_lectura("dashboard", tablas=("estadistica_categoria", "instituciones", "convenios", "homologacion"))
+def obtener_dashboard(db: Session) -> DashboardEstadisticas:
+    """
+    Todas las categorías de estadistica_categoria con su resumen (v_resumen_estadisticas)
+    y los totales de sp_resumen_estadisticas_generales en una sola consulta. Queda en
+    caché hasta que cambia la versión de alguna de las tablas consultadas.
+    """
+    try:
+        query = text("""
+            SELECT 'fila' AS tipo, categoria, nombre, cantidad, suma_total
+            FROM estadistica_categoria
+            UNION ALL
+            SELECT 'total', 'instituciones', NULL, COUNT(*), NULL FROM instituciones
+            UNION ALL
+            SELECT 'total', 'convenios', NULL, COUNT(*), COALESCE(SUM(precio_estimado), 0) FROM convenios
+            UNION ALL
+            SELECT 'total', 'homologaciones', NULL, COUNT(*), NULL FROM homologacion
+            ORDER BY tipo, categoria, nombre
+        """)
+        categorias = {}
+        totales = {}
+        for fila in db.execute(query).mappings():
+            if fila["tipo"] == "total":
+                totales[fila["categoria"]] = fila
+                continue
+            resumen = categorias.setdefault(
+                fila["categoria"], {"total_items": 0, "suma_cantidades": 0, "suma_montos": 0.0, "filas": []}
+            )
+            suma_total = float(fila["suma_total"]) if fila["suma_total"] is not None else None
+            resumen["total_items"] += 1
+            resumen["suma_cantidades"] += fila["cantidad"] or 0
+            resumen["suma_montos"] += suma_total or 0.0
+            resumen["filas"].append({"nombre": fila["nombre"], "cantidad": fila["cantidad"] or 0, "suma_total": suma_total})
+
+        return DashboardEstadisticas(
+            totales={
+                "total_instituciones": totales["instituciones"]["cantidad"],
+                "total_convenios": totales["convenios"]["cantidad"],
+                "total_homologaciones": totales["homologaciones"]["cantidad"],
+                "monto_total_convenios": float(totales["convenios"]["suma_total"]),
+            },
+            categorias=categorias,
+        )
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener el dashboard de estadísticas: {e}")
+        raise Exception("Error de base de datos al obtener el dashboard de estadísticas")
+
+# Granularidad -> expresión del subperiodo dentro del año (estadistica_periodo guarda meses)
+SUBPERIODOS = {
+    "anio": "0",
+    "trimestre": "(mes + 2) DIV 3",
+    "mes": "mes",
+}
+
+@cache_lectura("estadisticas_periodo", tablas=("convenios",))
+def obtener_estadisticas_periodo(db: Session, campo_fecha: str, granularidad: str,
+                                 por_tipo: bool, por_estado: bool, filtros: dict) -> SeriePeriodos:
+    """
+    Convenios y montos por año, trimestre o mes de la fecha de firma o de inicio, opcionalmente
+    separados por tipo de convenio SENA y por estado. Suma las filas mensuales de
+    estadistica_periodo (que mantienen los triggers), así que no recorre la tabla convenios.
+    """
+    try:
+        subperiodo = SUBPERIODOS[granularidad]
+        columnas = ["anio", f"{subperiodo} AS subperiodo"]
+        grupos = ["anio", "subperiodo"]
+        if por_tipo:
+            columnas.append("tipo_convenio_sena")
+            grupos.append("tipo_convenio_sena")
+        if por_estado:
+            columnas.append("estado_convenio")
+            grupos.append("estado_convenio")
+
+        condiciones = ["campo_fecha = :campo_fecha", "cantidad > 0"]
+        params = {"campo_fecha": campo_fecha}
+        if filtros.get("anio_desde") is not None:
+            condiciones.append("anio >= :anio_desde")
+            params["anio_desde"] = filtros["anio_desde"]
+        if filtros.get("anio_hasta") is not None:
+            condiciones.append("anio <= :anio_hasta")
+            params["anio_hasta"] = filtros["anio_hasta"]
+        for campo in ("tipo_convenio_sena", "estado_convenio"):
+            if filtros.get(campo) is not None:
+                condiciones.append(f"{campo} = :{campo}")
+                params[campo] = filtros[campo]
+
+        query = text(f"""
+            SELECT {', '.join(columnas)}, SUM(cantidad) AS cantidad, SUM(suma_total) AS suma_total
+            FROM estadistica_periodo
+            WHERE {' AND '.join(condiciones)}
+            GROUP BY {', '.join(grupos)}
+            ORDER BY {', '.join(grupos)}
+        """)
+
+        periodos = []
+        for fila in db.execute(query, params).mappings():
+            anio = int(fila["anio"])
+            subperiodo = int(fila["subperiodo"])
+            periodo = {"anio": anio, "cantidad": int(fila["cantidad"]), "suma_total": float(fila["suma_total"])}
+            if granularidad == "trimestre":
+                periodo.update(periodo=f"{anio}-T{subperiodo}", trimestre=subperiodo)
+            elif granularidad == "mes":
+                periodo.update(periodo=f"{anio}-{subperiodo:02d}", mes=subperiodo)
+            else:
+                periodo["periodo"] = str(anio)
+            # La cadena vacía representa los convenios sin tipo o sin estado
+            if por_tipo:
+                periodo["tipo_convenio_sena"] = fila["tipo_convenio_sena"] or None
+            if por_estado:
+                periodo["estado_convenio"] = fila["estado_convenio"] or None
+            periodos.append(periodo)
+
+        return SeriePeriodos(campo_fecha=campo_fecha, granularidad=granularidad, periodos=periodos)
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener las estadísticas por periodo: {e}")
+        raise Exception("Error de base de datos al obtener las estadísticas por periodo")
+
 def obtener_estadistica_by_id(db: Session, id_estadistica: int):
     try:
         query = text("""
@@ -112,6 +232,7 @@ def eliminar_estadistica(db: Session, id_estadistica: int):
         """)
         db.execute(query, {"id_eliminar": id_estadistica})
         db.commit()
+        invalidar_cache("estadisticas")
         return True
     except SQLAlchemyError as e:
         db.rollback()
@@ -129,6 +250,7 @@ def update_estadistica(db: Session, id_est: int, estadistica_update: EditarEstad
         query = text(f"UPDATE estadistica_categoria SET {set_clause} WHERE id_estadistica = :id_estadist")
         db.execute(query, fields)
         db.commit()
+        invalidar_cache("estadisticas")
         return True
     except SQLAlchemyError as e:
         db.rollback()
@@ -1,11 +1,14 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session 
-from sqlalchemy import text 
+from sqlalchemy import text, bindparam
 from sqlalchemy.exc import SQLAlchemyError
-from typing import Optional, List
+from typing import Optional, List, Tuple
 import logging
 
 from app.schemas.homologaciones_schema import CrearHomologacion, EditarHomologacion, RetornoHomologacion
+from app.crud.reportes import programar_refresco_reportes
+from core.proyeccion import columnas_sql
+from core.cache import cache_lectura, invalidar_cache
 
 logger = logging.getLogger(__name__)
 
@@ -35,20 +38,27 @@ def crear_Homologacion(db: Session, homologacion: CrearHomologacion) -> Optional
         """)
         db.execute(query, dataHomologacion)
         db.commit()
+        invalidar_cache("homologaciones", "estadisticas")
+        programar_refresco_reportes()
         return True
     except Exception as e:
         db.rollback()
         logger.error(f"Error al crear la homologación: {e}")
         raise Exception("Error de base de datos al crear una homologación")
 
-def get_all_homologaciones(db: Session) -> List[RetornoHomologacion]:
+CAMPOS_HOMOLOGACION = (
+    "id_homologacion", "nit_institucion_destino",
+    "nombre_programa_sena", "cod_programa_sena", "version_programa",
+    "titulo", "programa_ies", "nivel_programa",
+    "snies", "creditos_homologados", "creditos_totales",
+    "creditos_pendientes", "modalidad", "semestres", "regional", "enlace",
+)
+
+@cache_lectura("homologaciones", tablas=("homologacion",))
+def get_all_homologaciones(db: Session, campos: Optional[List[str]] = None) -> List[RetornoHomologacion]:
     try:
-        query = text("""
-            SELECT homologacion.id_homologacion, homologacion.nit_institucion_destino,
-            homologacion.nombre_programa_sena, homologacion.cod_programa_sena, homologacion.version_programa, 
-            homologacion.titulo, homologacion.programa_ies, homologacion.nivel_programa,
-            homologacion.snies, homologacion.creditos_homologados, homologacion.creditos_totales, 
-            homologacion.creditos_pendientes, homologacion.modalidad, homologacion.semestres, homologacion.regional, homologacion.enlace
+        query = text(f"""
+            SELECT {columnas_sql("homologacion", campos or CAMPOS_HOMOLOGACION)}
             FROM homologacion
         """)
 
@@ -75,6 +85,26 @@ def obtener_homologacion_by_id(db: Session, id_homologacion: int):
         logger.error(f"Error al buscar homologación por id: {e}")
         raise Exception("Error de la base de datos al buscar homologación por id")
     
+def obtener_homologaciones_by_ids(db: Session, ids: List[int]) -> Tuple[List, List[int]]:
+    try:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return [], []
+        query = text("""
+            SELECT id_homologacion, nit_institucion_destino, nombre_programa_sena,
+            cod_programa_sena, version_programa, titulo, programa_ies,
+            nivel_programa, snies, creditos_homologados, creditos_totales,
+            creditos_pendientes, modalidad, semestres, regional, enlace
+            FROM homologacion
+            WHERE id_homologacion IN :ids
+        """).bindparams(bindparam("ids", expanding=True))
+        filas = db.execute(query, {"ids": ids}).mappings().all()
+        por_id = {fila["id_homologacion"]: fila for fila in filas}
+        return [por_id[i] for i in ids if i in por_id], [i for i in ids if i not in por_id]
+    except SQLAlchemyError as e:
+        logger.error(f"Error al buscar homologaciones por lote de ids: {e}")
+        raise Exception("Error de la base de datos al buscar homologaciones por lote")
+    
 def obtener_homologacion_by_nombre_programa_sena(db: Session, programa_sena: str):
     try:
         query = text("""
@@ -135,6 +165,8 @@ def homologacion_update(db: Session, id_homologacion: int, homologacion_update:
         query = text(f"UPDATE homologacion SET {set_clause} WHERE id_homologacion = :id_homologacion")
         result = db.execute(query, fields)
         db.commit()
+        invalidar_cache("homologaciones", "estadisticas")
+        programar_refresco_reportes()
         
         return result.rowcount > 0
     except SQLAlchemyError as e:
@@ -155,6 +187,8 @@ def eliminar_homologacion(db: Session, id_homolog: int):
         """)
         result = db.execute(query, {"homologacion": id_homolog})
         db.commit()
+        invalidar_cache("homologaciones", "estadisticas")
+        programar_refresco_reportes()
         
         return result.rowcount > 0
     except SQLAlchemyError as e:
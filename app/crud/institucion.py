@@ -1,14 +1,22 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session 
-from sqlalchemy import text 
+from sqlalchemy import text, bindparam
 from sqlalchemy.exc import SQLAlchemyError
-from typing import Optional
+from typing import Optional, List, Tuple
 import logging
 
 from app.schemas.institucion import InstitucionBase, EditarInstitucion
+from app.crud.reportes import programar_refresco_reportes
+from core.busqueda import IndiceTrigramas, con_normalizadas, normalizar_texto
+from core.cache import cache_lectura, invalidar_cache
 
 logger = logging.getLogger(__name__)
 
+# Índice en memoria para las búsquedas por subcadena (LIKE '%x%')
+indice_instituciones = IndiceTrigramas(
+    "instituciones", "nit_institucion", ("nombre_institucion", "nit_institucion", "direccion")
+)
+
 def create_institucion(db: Session, institucion: InstitucionBase) -> Optional[bool]:
     try:
         dataInstitucion = institucion.model_dump()
@@ -26,11 +34,16 @@ def create_institucion(db: Session, institucion: InstitucionBase) -> Optional[bo
 
         query = text("""
             INSERT INTO instituciones(nit_institucion, nombre_institucion,
-            direccion, id_municipio, cant_convenios)
-            VALUES (:nit_institucion, :nombre_institucion, :direccion, :id_municipio, :cant_convenios)
+            direccion, id_municipio, cant_convenios,
+            nit_institucion_norm, nombre_institucion_norm, direccion_norm)
+            VALUES (:nit_institucion, :nombre_institucion, :direccion, :id_municipio, :cant_convenios,
+            :nit_institucion_norm, :nombre_institucion_norm, :direccion_norm)
         """)
-        db.execute(query, dataInstitucion)
+        db.execute(query, con_normalizadas("instituciones", dataInstitucion))
         db.commit()
+        invalidar_cache("instituciones")
+        programar_refresco_reportes()
+        indice_instituciones.actualizar(dataInstitucion["nit_institucion"], dataInstitucion)
         return True
     except Exception as e:
         db.rollback()
@@ -39,7 +52,7 @@ def create_institucion(db: Session, institucion: InstitucionBase) -> Optional[bo
 
 def get_institucion_by_nit(db: Session, nit_institucion: str):
     try:
-        ni_institucion = f"{nit_institucion}%"
+        ni_institucion = f"{normalizar_texto(nit_institucion)}%"
         query = text("""
             SELECT instituciones.nit_institucion, 
                 instituciones.nombre_institucion,
@@ -49,7 +62,7 @@ def get_institucion_by_nit(db: Session, nit_institucion: str):
                 municipio.nom_municipio
             FROM instituciones
             INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
-            WHERE UPPER(instituciones.nit_institucion) LIKE UPPER(:nit_intitu)
+            WHERE instituciones.nit_institucion_norm LIKE :nit_intitu
             ORDER BY instituciones.nombre_institucion
         """)
         result = db.execute(query, {"nit_intitu": ni_institucion}).mappings().all()
@@ -60,7 +73,7 @@ def get_institucion_by_nit(db: Session, nit_institucion: str):
     
 def get_institucion_by_name(db: Session, name_institucion: str):
     try:
-        name_institucion = f"{name_institucion}%"
+        name_institucion = f"{normalizar_texto(name_institucion)}%"
         query = text("""
             SELECT instituciones.nit_institucion, 
                 instituciones.nombre_institucion,
@@ -70,7 +83,7 @@ def get_institucion_by_name(db: Session, name_institucion: str):
                 municipio.nom_municipio
             FROM instituciones
             INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
-            WHERE UPPER(instituciones.nombre_institucion) LIKE UPPER(:nom_institucion)
+            WHERE instituciones.nombre_institucion_norm LIKE :nom_institucion
             ORDER BY instituciones.nombre_institucion
         """)
         result = db.execute(query, {"nom_institucion": name_institucion}).mappings().all()
@@ -79,167 +92,6 @@ def get_institucion_by_name(db: Session, name_institucion: str):
         logger.error(f"Error al buscar institución por nombre: {e}")
         raise Exception("Error de la base de datos al buscar institución")
 
-def get_institucion_by_direccion(db: Session, direccion: str):
-    try:
-        direccion_pattern = f"{direccion}%"
-        query = text("""
-            SELECT instituciones.nit_institucion, 
-                instituciones.nombre_institucion,
-                instituciones.direccion, 
-                instituciones.id_municipio, 
-                instituciones.cant_convenios, 
-                municipio.nom_municipio
-            FROM instituciones
-            INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
-            WHERE UPPER(instituciones.direccion) LIKE UPPER(:direccion)
-            ORDER BY instituciones.nombre_institucion
-        """)
-        result = db.execute(query, {"direccion": direccion_pattern}).mappings().all()
-        return result
-    except SQLAlchemyError as e:
-        logger.error(f"Error al buscar institución por dirección: {e}")
-        raise Exception("Error de la base de datos al buscar institución")
-
-def get_institucion_by_municipio(db: Session, id_municipio: int):
-    try:
-        query = text("""
-            SELECT instituciones.nit_institucion, 
-                instituciones.nombre_institucion,
-                instituciones.direccion, 
-                instituciones.id_municipio, 
-                instituciones.cant_convenios, 
-                municipio.nom_municipio
-            FROM instituciones
-            INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
-            WHERE instituciones.id_municipio = :id_municipio
-            ORDER BY instituciones.nombre_institucion
-        """)
-        result = db.execute(query, {"id_municipio": id_municipio}).mappings().all()
-        return result
-    except SQLAlchemyError as e:
-        logger.error(f"Error al buscar institución por municipio: {e}")
-        raise Exception("Error de la base de datos al buscar institución")
-
-def get_institucion_by_convenios(db: Session, cant_convenios: int):
-    try:
-        query = text("""
-            SELECT instituciones.nit_institucion, 
-                instituciones.nombre_institucion,
-                instituciones.direccion, 
-                instituciones.id_municipio, 
-                instituciones.cant_convenios, 
-                municipio.nom_municipio
-            FROM instituciones
-            INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
-            WHERE instituciones.cant_convenios = :cant_convenios
-            ORDER BY instituciones.nombre_institucion
-        """)
-        result = db.execute(query, {"cant_convenios": cant_convenios}).mappings().all()
-        return result
-    except SQLAlchemyError as e:
-        logger.error(f"Error al buscar institución por cantidad de convenios: {e}")
-        raise Exception("Error de la base de datos al buscar institución")
-
-def get_institucion_by_rango_convenios(db: Session, min_convenios: int, max_convenios: int):
-    try:
-        query = text("""
-            SELECT instituciones.nit_institucion, 
-                instituciones.nombre_institucion,
-                instituciones.direccion, 
-                instituciones.id_municipio, 
-                instituciones.cant_convenios, 
-                municipio.nom_municipio
-            FROM instituciones
-            INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
-            WHERE instituciones.cant_convenios BETWEEN :min_convenios AND :max_convenios
-            ORDER BY instituciones.cant_convenios DESC, instituciones.nombre_institucion
-        """)
-        result = db.execute(query, {"min_convenios": min_convenios, "max_convenios": max_convenios}).mappings().all()
-        return result
-    except SQLAlchemyError as e:
-        logger.error(f"Error al buscar institución por rango de convenios: {e}")
-        raise Exception("Error de la base de datos al buscar institución")
-
-def get_all_instituciones(db: Session):
-    try:
-        query = text("""
-            SELECT instituciones.nit_institucion, 
-                instituciones.nombre_institucion,
-                instituciones.direccion, 
-                instituciones.id_municipio, 
-                instituciones.cant_convenios, 
-                municipio.nom_municipio
-            FROM instituciones
-            INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
-            ORDER BY instituciones.nombre_institucion
-        """)
-        result = db.execute(query).mappings().all()
-        return result
-    except SQLAlchemyError as e:
-        logger.error(f"Error al obtener todas las instituciones: {e}")
-        raise Exception("Error de la base de datos al obtener instituciones")
-
-def busqueda_avanzada_instituciones(
-    db: Session, 
-    nit_institucion: Optional[str] = None,
-    nombre_institucion: Optional[str] = None,
-    direccion: Optional[str] = None,
-    id_municipio: Optional[int] = None,
-    min_convenios: Optional[int] = None,
-    max_convenios: Optional[int] = None
-):
-    try:
-        conditions = []
-        params = {}
-        
-        if nit_institucion:
-            conditions.append("UPPER(instituciones.nit_institucion) LIKE UPPER(:nit_institucion)")
-            params["nit_institucion"] = f"{nit_institucion}%"
-        
-        if nombre_institucion:
-            conditions.append("UPPER(instituciones.nombre_institucion) LIKE UPPER(:nombre_institucion)")
-            params["nombre_institucion"] = f"{nombre_institucion}%"
-        
-        if direccion:
-            conditions.append("UPPER(instituciones.direccion) LIKE UPPER(:direccion)")
-            params["direccion"] = f"{direccion}%"
-        
-        if id_municipio is not None:
-            conditions.append("instituciones.id_municipio = :id_municipio")
-            params["id_municipio"] = id_municipio
-        
-        if min_convenios is not None and max_convenios is not None:
-            conditions.append("instituciones.cant_convenios BETWEEN :min_convenios AND :max_convenios")
-            params["min_convenios"] = min_convenios
-            params["max_convenios"] = max_convenios
-        elif min_convenios is not None:
-            conditions.append("instituciones.cant_convenios >= :min_convenios")
-            params["min_convenios"] = min_convenios
-        elif max_convenios is not None:
-            conditions.append("instituciones.cant_convenios <= :max_convenios")
-            params["max_convenios"] = max_convenios
-        
-        where_clause = " AND ".join(conditions) if conditions else "1=1"
-        
-        query = text(f"""
-            SELECT instituciones.nit_institucion, 
-                instituciones.nombre_institucion,
-                instituciones.direccion, 
-                instituciones.id_municipio, 
-                instituciones.cant_convenios, 
-                municipio.nom_municipio
-            FROM instituciones
-            INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
-            WHERE {where_clause}
-            ORDER BY instituciones.nombre_institucion
-        """)
-        
-        result = db.execute(query, params).mappings().all()
-        return result
-    except SQLAlchemyError as e:
-        logger.error(f"Error en búsqueda avanzada de instituciones: {e}")
-        raise Exception("Error de la base de datos en búsqueda avanzada")
-
 def institucion_update(db: Session, nit_institucion: str, update_institucion: EditarInstitucion) -> bool:
     try:
         fields = update_institucion.model_dump(exclude_unset=True)
@@ -253,6 +105,7 @@ def institucion_update(db: Session, nit_institucion: str, update_institucion: Ed
         # ensure id_municipio is string if present
         if "id_municipio" in fields and fields["id_municipio"] is not None:
             fields["id_municipio"] = str(fields["id_municipio"])
+        fields = con_normalizadas("instituciones", fields)
 
         set_clause = ", ".join([f"{key} = :{key}" for key in fields])
         fields["nit_institucion"] = nit_institucion
@@ -260,15 +113,49 @@ def institucion_update(db: Session, nit_institucion: str, update_institucion: Ed
         query = text(f"UPDATE instituciones SET {set_clause} WHERE nit_institucion = :nit_institucion")
         result = db.execute(query, fields)
         db.commit()
+        invalidar_cache("instituciones")
+        programar_refresco_reportes()
+        indice_instituciones.recargar(db, [nit_institucion])
         return result.rowcount > 0
     except SQLAlchemyError as e:
         logger.error(f"Error al editar institución: {e}")
         db.rollback() 
         raise Exception("Error de base de datos al actualizar institución")
 
+def get_instituciones_by_nits(db: Session, nits: List[str]):
+    if not nits:
+        return []
+    query = text("""
+        SELECT instituciones.nit_institucion, 
+            instituciones.nombre_institucion,
+            instituciones.direccion, 
+            instituciones.id_municipio, 
+            instituciones.cant_convenios, 
+            municipio.nom_municipio
+        FROM instituciones
+        INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
+        WHERE instituciones.nit_institucion IN :nits
+        ORDER BY instituciones.nombre_institucion
+    """).bindparams(bindparam("nits", expanding=True))
+    return db.execute(query, {"nits": list(nits)}).mappings().all()
+
+def get_instituciones_lote(db: Session, nits: List[str]) -> Tuple[List, List[str]]:
+    try:
+        nits = list(dict.fromkeys(nits))
+        filas = get_instituciones_by_nits(db, nits)
+        por_nit = {fila["nit_institucion"]: fila for fila in filas}
+        return [por_nit[n] for n in nits if n in por_nit], [n for n in nits if n not in por_nit]
+    except SQLAlchemyError as e:
+        logger.error(f"Error al buscar instituciones por lote de NITs: {e}")
+        raise Exception("Error de la base de datos al buscar instituciones por lote")
+
 def get_institucion_by_direccion(db: Session, direccion: str):
     try:
-        direccion_pattern = f"%{direccion}%"
+        nits = indice_instituciones.buscar("direccion", direccion)
+        if nits is not None:
+            return get_instituciones_by_nits(db, nits)
+
+        direccion_pattern = f"%{normalizar_texto(direccion)}%"
         query = text("""
             SELECT instituciones.nit_institucion, 
                 instituciones.nombre_institucion,
@@ -278,7 +165,7 @@ def get_institucion_by_direccion(db: Session, direccion: str):
                 municipio.nom_municipio
             FROM instituciones
             INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
-            WHERE UPPER(instituciones.direccion) LIKE UPPER(:direccion)
+            WHERE instituciones.direccion_norm LIKE :direccion
             ORDER BY instituciones.nombre_institucion
         """)
         result = db.execute(query, {"direccion": direccion_pattern}).mappings().all()
@@ -347,17 +234,24 @@ def get_institucion_by_rango_convenios(db: Session, min_convenios: int, max_conv
         logger.error(f"Error al buscar institución por rango de convenios: {e}")
         raise Exception("Error de la base de datos al buscar institución")
 
-def get_all_instituciones(db: Session):
+CAMPOS_INSTITUCION = ("nit_institucion", "nombre_institucion", "direccion", "id_municipio", "cant_convenios", "nom_municipio")
+
+@cache_lectura("instituciones", tablas=("instituciones", "municipio"))
+def get_all_instituciones(db: Session, campos: Optional[List[str]] = None):
     try:
-        query = text("""
-            SELECT instituciones.nit_institucion, 
-                instituciones.nombre_institucion,
-                instituciones.direccion, 
-                instituciones.id_municipio, 
-                instituciones.cant_convenios, 
-                municipio.nom_municipio
+        campos = campos or list(CAMPOS_INSTITUCION)
+        columnas = ", ".join(
+            "municipio.nom_municipio" if campo == "nom_municipio" else f"instituciones.{campo}"
+            for campo in campos
+        )
+        # El JOIN con municipio solo se necesita si se pide el nombre del municipio
+        join = ""
+        if "nom_municipio" in campos:
+            join = "INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio"
+        query = text(f"""
+            SELECT {columnas}
             FROM instituciones
-            INNER JOIN municipio ON instituciones.id_municipio = municipio.id_municipio
+            {join}
             ORDER BY instituciones.nombre_institucion
         """)
         result = db.execute(query).mappings().all()
@@ -379,17 +273,29 @@ def busqueda_avanzada_instituciones(
         conditions = []
         params = {}
         
-        if nit_institucion:
-            conditions.append("UPPER(instituciones.nit_institucion) LIKE UPPER(:nit_institucion)")
-            params["nit_institucion"] = f"%{nit_institucion}%"
-        
-        if nombre_institucion:
-            conditions.append("UPPER(instituciones.nombre_institucion) LIKE UPPER(:nombre_institucion)")
-            params["nombre_institucion"] = f"%{nombre_institucion}%"
-        
-        if direccion:
-            conditions.append("UPPER(instituciones.direccion) LIKE UPPER(:direccion)")
-            params["direccion"] = f"%{direccion}%"
+        # Los filtros de texto se resuelven con el índice de trigramas cuando está vigente;
+        # si no, se usa el LIKE original sobre la columna
+        nits_indice = None
+        filtros_texto = (
+            ("nit_institucion", nit_institucion),
+            ("nombre_institucion", nombre_institucion),
+            ("direccion", direccion),
+        )
+        for columna, valor in filtros_texto:
+            if not valor:
+                continue
+            nits = indice_instituciones.buscar(columna, valor)
+            if nits is None:
+                conditions.append(f"instituciones.{columna}_norm LIKE :{columna}")
+                params[columna] = f"%{normalizar_texto(valor)}%"
+            else:
+                nits_indice = set(nits) if nits_indice is None else nits_indice & set(nits)
+
+        if nits_indice is not None:
+            if not nits_indice:
+                return []
+            conditions.append("instituciones.nit_institucion IN :nits_indice")
+            params["nits_indice"] = list(nits_indice)
         
         if id_municipio is not None:
             conditions.append("instituciones.id_municipio = :id_municipio")
@@ -420,6 +326,8 @@ def busqueda_avanzada_instituciones(
             WHERE {where_clause}
             ORDER BY instituciones.nombre_institucion
         """)
+        if "nits_indice" in params:
+            query = query.bindparams(bindparam("nits_indice", expanding=True))
         
         result = db.execute(query, params).mappings().all()
         return result
@@ -435,6 +343,9 @@ def institucion_delete(db: Session, nit: str):
         """)
         result = db.execute(query, {"el_nit": nit})
         db.commit()
+        invalidar_cache("instituciones")
+        programar_refresco_reportes()
+        indice_instituciones.eliminar(nit)
         return result.rowcount > 0
     except SQLAlchemyError as e:
         logger.error(f"Error al eliminar institución por nit: {e}")
@@ -1,28 +1,37 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session 
-from sqlalchemy import text 
+from sqlalchemy import text, bindparam
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Optional
 import logging
 from typing import List
 
 from app.schemas.municipio import MunicipioBase
+from app.crud.reportes import programar_refresco_reportes
+from core.busqueda import IndiceTrigramas, con_normalizadas, normalizar_texto
+from core.cache import cache_lectura, invalidar_cache
 
 logger = logging.getLogger(__name__)
 
+# Índice en memoria para la búsqueda por nombre (LIKE '%x%')
+indice_municipios = IndiceTrigramas("municipio", "id_municipio", ("nom_municipio",))
+
 def create_municipio(db: Session, municipio: MunicipioBase) -> bool:
     try:
         dataMunicipio = municipio.model_dump()
         
         query = text("""
             INSERT INTO municipio(
-                id_municipio, nom_municipio
+                id_municipio, nom_municipio, nom_municipio_norm
             ) VALUES (
-                :id_municipio, :nom_municipio
+                :id_municipio, :nom_municipio, :nom_municipio_norm
             )
         """)
-        db.execute(query, dataMunicipio)
+        db.execute(query, con_normalizadas("municipio", dataMunicipio))
         db.commit()
+        invalidar_cache("municipios", "instituciones")
+        programar_refresco_reportes()
+        indice_municipios.actualizar(str(dataMunicipio["id_municipio"]), dataMunicipio)
         
         return True
     except Exception as e:
@@ -30,6 +39,7 @@ def create_municipio(db: Session, municipio: MunicipioBase) -> bool:
         logger.error(f"Error al crear el municipio: {e}")
         raise Exception("Error de base de datos al crear municipio")
     
+@cache_lectura("municipios", tablas=("municipio",))
 def get_municipios(db: Session)-> List[MunicipioBase]:
     try:
         query = text("""
@@ -61,12 +71,23 @@ def get_municipio_by_id(db: Session, id_municipio:int):
     
 def get_municipio_by_name(db: Session, nom_municipio:str):
     try:
+        ids = indice_municipios.buscar("nom_municipio", nom_municipio)
+        if ids is not None:
+            if not ids:
+                return []
+            query = text("""
+                SELECT id_municipio, nom_municipio
+                FROM municipio
+                WHERE id_municipio IN :ids
+            """).bindparams(bindparam("ids", expanding=True))
+            return db.execute(query, {"ids": ids}).mappings().all()
+
         # buscar por patrón (ej. una letra) usando LIKE, se añade el % alrededor del parámetro
-        nom_municipio = f"%{nom_municipio}%"
+        nom_municipio = f"%{normalizar_texto(nom_municipio)}%"
         query = text("""
             SELECT id_municipio, nom_municipio
             FROM municipio
-            WHERE UPPER(nom_municipio) LIKE UPPER(:nom_municipio)
+            WHERE nom_municipio_norm LIKE :nom_municipio
         """)
         result = db.execute(query, {"nom_municipio": nom_municipio}).mappings().all()
         return result
@@ -79,11 +100,15 @@ def update_municipio(db: Session, id_municipio: int, municipio_update: Municipio
         fields = municipio_update.model_dump(exclude_unset=True)
         if not fields:
             return False
+        fields = con_normalizadas("municipio", fields)
         set_clause = ", ".join([f"{key} = :{key}" for key in fields])
         fields["id_municipio"] = id_municipio
         query = text(f"UPDATE municipio SET {set_clause} WHERE id_municipio = :id_municipio")
         db.execute(query, fields)
         db.commit()
+        invalidar_cache("municipios", "instituciones")
+        programar_refresco_reportes()
+        indice_municipios.recargar(db, [str(id_municipio)])
         return True
     except SQLAlchemyError as e:
         db.rollback()
@@ -98,6 +123,9 @@ def municipio_delete(db: Session, id_municipio: int) -> bool:
         """)
         db.execute(query, {"id_municipio": id_municipio})
         db.commit()
+        invalidar_cache("municipios", "instituciones")
+        programar_refresco_reportes()
+        indice_municipios.eliminar(str(id_municipio))
         return True
     except SQLAlchemyError as e:
         logger.error(f"Error al eliminar municipio por id {e}")
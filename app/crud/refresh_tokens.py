@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Optional, Tuple
+import logging
+
+from core.security import create_refresh_token, create_token_family, hash_refresh_token
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _ahora() -> datetime:
+    # La columna expira es DATETIME sin zona: se guarda y compara siempre en UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _insertar_refresh_token(db: Session, id_usuario: int, familia: str) -> str:
+    token, token_hash = create_refresh_token()
+    db.execute(
+        text("""
+            INSERT INTO refresh_token (id_usuario, token_hash, familia, expira)
+            VALUES (:id_usuario, :token_hash, :familia, :expira)
+        """),
+        {
+            "id_usuario": id_usuario,
+            "token_hash": token_hash,
+            "familia": familia,
+            "expira": _ahora() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        }
+    )
+    return token
+
+
+def _revocar_familia(db: Session, familia: str) -> None:
+    db.execute(
+        text("UPDATE refresh_token SET revocado = 1 WHERE familia = :familia AND revocado = 0"),
+        {"familia": familia}
+    )
+
+
+def crear_refresh_token(db: Session, id_usuario: int) -> str:
+    """
+    Abre una familia de refresh tokens para un login nuevo y retorna el token en claro.
+    Aprovecha para borrar los tokens vencidos del usuario y mantener la tabla acotada.
+    """
+    try:
+        db.execute(
+            text("DELETE FROM refresh_token WHERE id_usuario = :id_usuario AND expira < :ahora"),
+            {"id_usuario": id_usuario, "ahora": _ahora()}
+        )
+        token = _insertar_refresh_token(db, id_usuario, create_token_family())
+        db.commit()
+        return token
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al crear el refresh token: {e}")
+        raise Exception("Error de base de datos al crear el refresh token")
+
+
+def rotar_refresh_token(db: Session, token: str) -> Optional[Tuple[int, str]]:
+    """
+    Canjea un refresh token por uno nuevo de la misma familia (rotación).
+    Retorna (id_usuario, token nuevo), o None si el token no existe, venció o ya fue usado.
+
+    Presentar un token ya rotado indica que fue copiado: se revoca toda la familia, de modo
+    que tanto el atacante como el usuario legítimo deben volver a iniciar sesión.
+    """
+    try:
+        fila = db.execute(
+            text("""
+                SELECT id_refresh_token, id_usuario, familia, revocado, expira > :ahora AS vigente
+                FROM refresh_token
+                WHERE token_hash = :token_hash
+            """),
+            {"token_hash": hash_refresh_token(token), "ahora": _ahora()}
+        ).mappings().first()
+
+        if fila is None or not fila["vigente"]:
+            return None
+
+        if fila["revocado"]:
+            logger.warning(
+                f"Reutilización de refresh token del usuario {fila['id_usuario']}: se revoca la familia"
+            )
+            _revocar_familia(db, fila["familia"])
+            db.commit()
+            return None
+
+        # La condición revocado = 0 hace el canje atómico: de dos peticiones simultáneas
+        # con el mismo token solo una afecta la fila; la otra se trata como reutilización
+        canje = db.execute(
+            text("UPDATE refresh_token SET revocado = 1 WHERE id_refresh_token = :id AND revocado = 0"),
+            {"id": fila["id_refresh_token"]}
+        )
+        if canje.rowcount != 1:
+            _revocar_familia(db, fila["familia"])
+            db.commit()
+            return None
+
+        nuevo_token = _insertar_refresh_token(db, fila["id_usuario"], fila["familia"])
+        db.commit()
+        return fila["id_usuario"], nuevo_token
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al rotar el refresh token: {e}")
+        raise Exception("Error de base de datos al rotar el refresh token")
+
+
+def revocar_refresh_token(db: Session, token: str) -> bool:
+    """Cierra la sesión del token: revoca su familia. Retorna False si el token no existe"""
+    try:
+        familia = db.execute(
+            text("SELECT familia FROM refresh_token WHERE token_hash = :token_hash"),
+            {"token_hash": hash_refresh_token(token)}
+        ).scalar()
+        if familia is None:
+            return False
+        _revocar_familia(db, familia)
+        db.commit()
+        return True
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al revocar el refresh token: {e}")
+        raise Exception("Error de base de datos al revocar el refresh token")
+
+
+def revocar_tokens_usuario(db: Session, id_usuario: int) -> None:
+    """
+    Revoca todas las sesiones del usuario. No hace commit: se ejecuta dentro de la
+    transacción de la operación que la origina (p. ej. el cambio de contraseña).
+    """
+    db.execute(
+        text("UPDATE refresh_token SET revocado = 1 WHERE id_usuario = :id_usuario AND revocado = 0"),
+        {"id_usuario": id_usuario}
+    )
@@ -0,0 +1,251 @@
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Optional
+import threading
+import logging
+
+from core.cache import cache_lectura, invalidar_cache
+from core.config import settings
+from core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Reporte -> instantánea (rpt_*), su clave, columnas, orden de lectura (índice idx_orden) y la
+# consulta de la vista v_* equivalente restringida a las claves pendientes (:claves)
+REPORTES = {
+    "top_instituciones": {
+        "tabla": "rpt_top_instituciones",
+        "clave": "nit_institucion",
+        "columnas": ("nit_institucion", "nombre_institucion", "cant_convenios", "nom_municipio",
+                     "monto_total_convenios", "total_convenios_activos"),
+        "orden": "cant_convenios DESC, monto_total_convenios DESC",
+        "consulta": """
+            SELECT i.nit_institucion, i.nombre_institucion, i.cant_convenios, m.nom_municipio,
+                   COALESCE(SUM(c.precio_estimado), 0), COUNT(DISTINCT c.id_convenio)
+            FROM instituciones i
+            LEFT JOIN convenios c ON i.nit_institucion = c.nit_institucion
+            LEFT JOIN municipio m ON i.id_municipio = m.id_municipio
+            WHERE i.nit_institucion IN :claves
+            GROUP BY i.nit_institucion, i.nombre_institucion, i.cant_convenios, m.nom_municipio
+        """,
+    },
+    "carga_supervisores": {
+        "tabla": "rpt_carga_supervisores",
+        "clave": "supervisor",
+        "columnas": ("supervisor", "total_convenios", "convenios_activos", "convenios_finalizados",
+                     "monto_total_supervisado", "monto_promedio"),
+        "orden": "total_convenios DESC, monto_total_supervisado DESC",
+        "consulta": """
+            SELECT supervisor, COUNT(*),
+                   SUM(CASE WHEN estado_convenio = 'Activo' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN estado_convenio = 'Finalizado' THEN 1 ELSE 0 END),
+                   COALESCE(SUM(precio_estimado), 0), COALESCE(AVG(precio_estimado), 0)
+            FROM convenios
+            WHERE supervisor IN :claves
+            GROUP BY supervisor
+        """,
+    },
+    "convenios_por_municipio": {
+        "tabla": "rpt_convenios_por_municipio",
+        "clave": "id_municipio",
+        "columnas": ("id_municipio", "nom_municipio", "total_instituciones", "total_convenios", "monto_total"),
+        "orden": "total_convenios DESC, monto_total DESC",
+        "consulta": """
+            SELECT m.id_municipio, m.nom_municipio, COUNT(DISTINCT i.nit_institucion),
+                   COUNT(c.id_convenio), COALESCE(SUM(c.precio_estimado), 0)
+            FROM municipio m
+            LEFT JOIN instituciones i ON m.id_municipio = i.id_municipio
+            LEFT JOIN convenios c ON i.nit_institucion = c.nit_institucion
+            WHERE m.id_municipio IN :claves
+            GROUP BY m.id_municipio, m.nom_municipio
+        """,
+    },
+    "resumen_homologaciones": {
+        "tabla": "rpt_resumen_homologaciones",
+        "clave": "nit_institucion",
+        "columnas": ("nit_institucion", "nombre_institucion", "total_homologaciones",
+                     "total_creditos_homologados", "promedio_creditos",
+                     "modalidades_diferentes", "niveles_diferentes"),
+        "orden": "total_homologaciones DESC",
+        "consulta": """
+            SELECT i.nit_institucion, i.nombre_institucion, COUNT(h.id_homologacion),
+                   SUM(h.creditos_homologados), AVG(h.creditos_homologados),
+                   COUNT(DISTINCT h.modalidad), COUNT(DISTINCT h.nivel_programa)
+            FROM instituciones i
+            LEFT JOIN homologacion h ON i.nit_institucion = h.nit_institucion_destino
+            WHERE i.nit_institucion IN :claves
+            GROUP BY i.nit_institucion, i.nombre_institucion
+        """,
+    },
+    "convenios_activos": {
+        "tabla": "rpt_convenios_activos",
+        "clave": "tipo_convenio_sena",
+        "columnas": ("tipo_convenio_sena", "cantidad_activos", "monto_total", "monto_promedio",
+                     "fecha_primer_convenio", "fecha_ultimo_convenio", "supervisores_distintos"),
+        "orden": "cantidad_activos DESC",
+        # Los convenios sin tipo se agrupan bajo la clave '' (la llave primaria no admite NULL)
+        "consulta": """
+            SELECT COALESCE(tipo_convenio_sena, ''), COUNT(*), SUM(precio_estimado), AVG(precio_estimado),
+                   MIN(fecha_firma), MAX(fecha_firma), COUNT(DISTINCT supervisor)
+            FROM convenios
+            WHERE estado_convenio = 'Activo' AND COALESCE(tipo_convenio_sena, '') IN :claves
+            GROUP BY COALESCE(tipo_convenio_sena, '')
+        """,
+    },
+}
+
+# Evita que varios hilos del mismo worker recalculen a la vez las mismas claves
+_lock_refresco = threading.Lock()
+
+
+def refrescar_reportes(db: Session) -> Optional[int]:
+    """
+    Recalcula en las instantáneas solo las claves marcadas por los triggers en rpt_pendientes
+    y retorna cuántas procesó. Cada clave se borra de rpt_pendientes solo si su marca no cambió
+    durante el refresco; si otra escritura la volvió a marcar, se recalcula en el siguiente.
+    Cada lote incrementa la versión "rpt": las cachés y los ETags de todos los workers lo notan.
+
+    Si falla (p. ej. un bloqueo con otro worker que refresca lo mismo) retorna None: se conserva
+    la instantánea anterior y las claves siguen pendientes.
+    """
+    procesadas = 0
+    _lock_refresco.acquire()
+    try:
+        while True:
+            pendientes = db.execute(
+                text("SELECT reporte, clave, marca FROM rpt_pendientes LIMIT :lote"),
+                {"lote": settings.REPORTES_LOTE_REFRESCO}
+            ).mappings().all()
+            if not pendientes:
+                break
+
+            claves_por_reporte = defaultdict(list)
+            for fila in pendientes:
+                claves_por_reporte[fila["reporte"]].append(fila["clave"])
+
+            for nombre, claves in claves_por_reporte.items():
+                reporte = REPORTES.get(nombre)
+                if reporte is None:
+                    logger.warning(f"Reporte desconocido en rpt_pendientes: {nombre}")
+                    continue
+                db.execute(
+                    text(f"DELETE FROM {reporte['tabla']} WHERE {reporte['clave']} IN :claves")
+                    .bindparams(bindparam("claves", expanding=True)),
+                    {"claves": claves}
+                )
+                db.execute(
+                    text(f"INSERT INTO {reporte['tabla']} ({', '.join(reporte['columnas'])}) {reporte['consulta']}")
+                    .bindparams(bindparam("claves", expanding=True)),
+                    {"claves": claves}
+                )
+
+            db.execute(
+                text("DELETE FROM rpt_pendientes WHERE reporte = :reporte AND clave = :clave AND marca = :marca"),
+                [dict(fila) for fila in pendientes]
+            )
+            db.execute(text(
+                "UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6) "
+                "WHERE entidad = 'rpt'"
+            ))
+            db.commit()
+            procesadas += len(pendientes)
+            if len(pendientes) < settings.REPORTES_LOTE_REFRESCO:
+                break
+        return procesadas
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al refrescar las instantáneas de reportes: {e}")
+        return None
+    finally:
+        _lock_refresco.release()
+
+
+def _leer_pagina(db: Session, nombre: str, limite: int, desplazamiento: int):
+    reporte = REPORTES[nombre]
+    try:
+        query = text(f"""
+            SELECT {', '.join(reporte['columnas'])}
+            FROM {reporte['tabla']}
+            ORDER BY {reporte['orden']}, {reporte['clave']}
+            LIMIT :limite OFFSET :desplazamiento
+        """)
+        return db.execute(query, {"limite": limite, "desplazamiento": desplazamiento}).mappings().all()
+    except SQLAlchemyError as e:
+        logger.error(f"Error al leer el reporte {nombre}: {e}")
+        raise Exception(f"Error de base de datos al leer el reporte {nombre}")
+
+
+# Las instantáneas solo cambian con un refresco o una reconstrucción, que incrementan "rpt"
+@cache_lectura("reportes", tablas=("rpt",))
+def obtener_reporte(db: Session, nombre: str, limite: int, desplazamiento: int):
+    """
+    Lee una página del reporte desde su instantánea, en el orden de la vista y por el índice
+    idx_orden: el costo depende del tamaño de la página, no de convenios ni homologaciones.
+    No recalcula nada: las claves pendientes las procesa el hilo de refresco en segundo plano.
+    """
+    return _leer_pagina(db, nombre, limite, desplazamiento)
+
+
+# ----------------------------------------------------------------------
+# Refresco en segundo plano
+# ----------------------------------------------------------------------
+_pedido_refresco = threading.Event()
+_hilo_refresco: Optional[threading.Thread] = None
+_lock_hilo = threading.Lock()
+
+
+def _refrescar_pendientes() -> None:
+    db = SessionLocal()
+    try:
+        if refrescar_reportes(db):
+            invalidar_cache("reportes")
+    except Exception as e:
+        logger.error(f"Error en el refresco de reportes: {e}")
+    finally:
+        db.close()
+
+
+def _refrescar_en_segundo_plano() -> None:
+    while True:
+        # Despierta cuando una escritura lo pide o, en cualquier caso, cada REPORTES_INTERVALO_REFRESCO
+        # segundos (escrituras de otros workers o de fuera de la API, ev_rpt_reconstruir)
+        _pedido_refresco.wait(settings.REPORTES_INTERVALO_REFRESCO)
+        _pedido_refresco.clear()
+        _refrescar_pendientes()
+
+
+def iniciar_refresco_reportes() -> None:
+    """Inicia (una vez por proceso) el hilo que mantiene al día las instantáneas"""
+    global _hilo_refresco
+    with _lock_hilo:
+        if _hilo_refresco is None or not _hilo_refresco.is_alive():
+            _hilo_refresco = threading.Thread(
+                target=_refrescar_en_segundo_plano, name="refresco_reportes", daemon=True
+            )
+            _hilo_refresco.start()
+
+
+def programar_refresco_reportes() -> None:
+    """Pide un refresco de las instantáneas; se llama después del commit de cada escritura"""
+    _pedido_refresco.set()
+
+
+def reconstruir_reportes(db: Session) -> int:
+    """Marca todas las claves (sp_rpt_marcar_todos) y recalcula las instantáneas completas"""
+    try:
+        db.execute(text("CALL sp_rpt_marcar_todos()"))
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al marcar los reportes para reconstrucción: {e}")
+        raise Exception("Error de base de datos al reconstruir los reportes")
+    procesadas = refrescar_reportes(db)
+    if procesadas is None:
+        # Las claves siguen marcadas: el próximo refresco en segundo plano termina la reconstrucción
+        raise Exception("Error de base de datos al recalcular los reportes")
+    # El refresco cambió la versión "rpt": los demás workers lo notan en su próximo
+    # refresco de versiones y este proceso de inmediato
+    invalidar_cache("reportes")
+    return procesadas
@@ -7,6 +7,10 @@ import logging
 
 from app.schemas.usuarios import CrearUsuario, EditarPass, EditarUsuario, RetornoUsuario
 from core.security import get_hashed_password, verify_password
+from core.cache import cache_lectura, invalidar_cache
+from core.autorizacion import registro_usuarios
+from app.crud.refresh_tokens import revocar_tokens_usuario
+from core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +34,7 @@ def create_user(db: Session, user: CrearUsuario) -> Optional[bool]:
         """)
         db.execute(query, dataUser)
         db.commit()
+        registro_usuarios.invalidar()
 
         return True
     except Exception as e:
@@ -37,6 +42,9 @@ def create_user(db: Session, user: CrearUsuario) -> Optional[bool]:
         logger.error(f"Error al crear usuario: {e}")
         raise Exception("Error de base de datos al crear el usuario")
 
+# Consulta de usuario por id (/usuario/obtener-por-id); las escrituras de usuario la invalidan.
+# La autorización de cada petición no pasa por aquí: usa core.autorizacion.registro_usuarios
+@cache_lectura("usuarios", tablas=("usuario",), ttl=settings.CACHE_USUARIO_TTL)
 def get_user_by_id(db: Session, id_usuario:int):
     try:
         query = text("""
@@ -102,6 +110,8 @@ def update_user(db: Session, user_id: int, user_update: EditarUsuario) -> bool:
         query = text(f"UPDATE usuario SET {set_clause} WHERE id_usuario = :user_id")
         db.execute(query, fields)
         db.commit()
+        invalidar_cache("usuarios")
+        registro_usuarios.invalidar()
         return True
     except SQLAlchemyError as e:
         db.rollback()
@@ -119,7 +129,11 @@ def update_password(db: Session, user_data: EditarPass) -> bool:
         query = text(f""" UPDATE usuario SET contra_encript = :pass_encript 
                         WHERE id_usuario = :id_usuario """)
         db.execute(query, datos_usuario)
+        # Cambiar la contraseña cierra las demás sesiones (sus refresh tokens dejan de servir)
+        revocar_tokens_usuario(db, datos_usuario['id_usuario'])
         db.commit()
+        invalidar_cache("usuarios")
+        registro_usuarios.invalidar()
         return True
     except SQLAlchemyError as e:
         db.rollback()
@@ -127,6 +141,19 @@ def update_password(db: Session, user_data: EditarPass) -> bool:
         raise Exception("Error de base de datos al actualizar el usuario")
 
 
+def update_password_hash(db: Session, id_usuario: int, contra_encript: str) -> bool:
+    """Reemplaza el hash de la contraseña (rehash al iniciar sesión cuando cambian los parámetros)"""
+    try:
+        query = text("UPDATE usuario SET contra_encript = :contra_encript WHERE id_usuario = :id_usuario")
+        db.execute(query, {"contra_encript": contra_encript, "id_usuario": id_usuario})
+        db.commit()
+        return True
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al actualizar el hash de la contraseña: {e}")
+        return False
+
+
 def verify_user_pass(db: Session, user_data: EditarPass) -> bool:
     try:
         query = text("""
@@ -180,6 +207,8 @@ def user_delete(db: Session, id:int):
 
         db.execute(query, {"el_id": id})
         db.commit()
+        invalidar_cache("usuarios")
+        registro_usuarios.invalidar()
         
         return True
     
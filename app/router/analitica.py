@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from app.schemas.auth import UsuarioToken
+from app.router.dependencies import usuario_administrador
+from core.analitica import instantanea_analitica, DIMENSIONES, MEDIDAS, TABLAS_ANALITICA
+from core.etag import etag_tablas, encabezados_etag
+from core.respuestas import RespuestaFilasORJSON
+from typing import Dict, List, Optional
+
+router = APIRouter()
+
+etag_analitica = etag_tablas(*TABLAS_ANALITICA)
+# Se declara antes de etag_analitica: el permiso se verifica antes de poder responder 304
+permiso_analitica = usuario_administrador("No tienes permisos para consultar la analítica")
+
+
+def _leer_filtros(filtros: List[str]) -> Dict[str, List[str]]:
+    """Convierte ['estado_convenio:Activo', 'anio_firma:2024', 'anio_firma:2025'] en {dimensión: valores}"""
+    resultado: Dict[str, List[str]] = {}
+    for filtro in filtros:
+        dimension, separador, valor = filtro.partition(":")
+        if not separador:
+            raise ValueError(f"Filtro no válido: {filtro}. Formato: dimension:valor")
+        resultado.setdefault(dimension.strip(), []).append(valor.strip())
+    return resultado
+
+
+@router.get("/dimensiones", status_code=status.HTTP_200_OK)
+def dimensiones(usuario_actual: UsuarioToken = Depends(permiso_analitica)):
+    """Dimensiones y medidas disponibles para agrupar y pivotar"""
+    return {"dimensiones": list(DIMENSIONES), "medidas": list(MEDIDAS)}
+
+
+@router.get("/agrupar", status_code=status.HTTP_200_OK)
+def agrupar(
+    por: List[str] = Query([], description="Dimensiones de agrupación (se puede repetir)"),
+    filtro: List[str] = Query([], description="Filtro dimension:valor (se puede repetir; valores de la misma dimensión se combinan con O)"),
+    usuario_actual: UsuarioToken = Depends(permiso_analitica),
+    etag: Optional[str] = Depends(etag_analitica)
+):
+    """
+    Cantidad, suma y promedio de precio_estimado por combinación de dimensiones
+    (p. ej. por=tipo_convenio_sena&por=estado_convenio&por=anio_firma), calculados sobre
+    la instantánea en memoria, sin consultar la base de datos.
+    """
+    try:
+        return RespuestaFilasORJSON(
+            instantanea_analitica.agrupar(por, _leer_filtros(filtro)), headers=encabezados_etag(etag)
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/pivote", status_code=status.HTTP_200_OK)
+def pivote(
+    filas: List[str] = Query(..., description="Dimensiones de las filas (se puede repetir)"),
+    columnas: str = Query(..., description="Dimensión cuyos valores forman las columnas"),
+    medida: str = Query("cantidad", description="Medida de cada celda", pattern=r'^(cantidad|suma_total|promedio)$'),
+    filtro: List[str] = Query([], description="Filtro dimension:valor (se puede repetir)"),
+    usuario_actual: UsuarioToken = Depends(permiso_analitica),
+    etag: Optional[str] = Depends(etag_analitica)
+):
+    """Tabla cruzada (p. ej. filas=supervisor&columnas=nom_municipio&medida=suma_total)"""
+    try:
+        return RespuestaFilasORJSON(
+            instantanea_analitica.pivotar(filas, columnas, medida, _leer_filtros(filtro)),
+            headers=encabezados_etag(etag)
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
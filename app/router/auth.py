@@ -1,8 +1,11 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends,HTTPException
+from fastapi import APIRouter, Depends,HTTPException, status
 from sqlalchemy.orm import Session
-from app.router.dependencies import authenticate_user
-from app.schemas.auth import ResponseLoggin
+from app.router.dependencies import authenticate_user, rol_vigente
+from app.schemas.auth import ResponseLoggin, RespuestaRefresh, SolicitudRefresh
+from app.crud.refresh_tokens import crear_refresh_token, rotar_refresh_token, revocar_refresh_token
+from core.config import settings
+from core.limitador import limitar_por_ip, obtener_limitador, verificar_limite
 from core.security import create_access_token
 from core.database import get_db
 from fastapi.security import OAuth2PasswordRequestForm
@@ -10,11 +13,28 @@ from fastapi.security import OAuth2PasswordRequestForm
 
 router = APIRouter()
 
-@router.post("/token", response_model=ResponseLoggin)
-async def login_for_access_token(
+# Intentos de login por cuenta: frena la fuerza bruta distribuida contra un mismo correo
+limite_login_cuenta = obtener_limitador(
+    "login_cuenta", settings.LIMITE_LOGIN_CUENTA_CAPACIDAD, settings.LIMITE_LOGIN_CUENTA_POR_MINUTO
+)
+
+# Función síncrona: FastAPI la ejecuta en el threadpool, así la consulta y la espera del
+# hash (que corre en el pool de procesos) no bloquean el event loop
+@router.post(
+    "/token",
+    response_model=ResponseLoggin,
+    dependencies=[Depends(limitar_por_ip(
+        "login_ip", settings.LIMITE_LOGIN_IP_CAPACIDAD, settings.LIMITE_LOGIN_IP_POR_MINUTO
+    ))]
+)
+def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: Session = Depends(get_db)
 ):
+    # Se rechaza antes de consultar el usuario y de verificar la contraseña con argon2
+    cuenta = form_data.username.strip().lower()
+    verificar_limite(limite_login_cuenta, cuenta)
+
     user = authenticate_user(form_data.username, form_data.password, db)
     if not user:
         raise HTTPException(
@@ -22,11 +42,65 @@ async def login_for_access_token(
             detail="Datos Incorrectos en email o password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Un login correcto no consume el cupo de la cuenta (evita bloquear al titular)
+    limite_login_cuenta.devolver(cuenta)
     access_token = create_access_token(
         data={"sub": str(user.id_usuario), "rol":user.id_rol}
     )
+    try:
+        refresh_token = crear_refresh_token(db, user.id_usuario)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
     return ResponseLoggin(
         user=user,
-        access_token=access_token
-    )
\ No newline at end of file
+        access_token=access_token,
+        refresh_token=refresh_token
+    )
+
+
+# Renueva la sesión sin contraseña ni argon2: solo un hash SHA-256 y dos escrituras por llave
+@router.post("/refresh", response_model=RespuestaRefresh)
+def refresh_access_token(
+    solicitud: SolicitudRefresh,
+    db: Session = Depends(get_db)
+):
+    try:
+        resultado = rotar_refresh_token(db, solicitud.refresh_token)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if resultado is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token invalido o expirado, inicie sesión nuevamente",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    id_usuario, refresh_token = resultado
+
+    # El rol se toma del registro de usuarios activos, así un cambio de rol llega al nuevo token
+    id_rol = rol_vigente(id_usuario)
+    if id_rol is None:
+        revocar_refresh_token(db, refresh_token)
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Usuario inactivo. No autorizado"
+        )
+
+    access_token = create_access_token(
+        data={"sub": str(id_usuario), "rol": id_rol}
+    )
+    return RespuestaRefresh(access_token=access_token, refresh_token=refresh_token)
+
+
+# Cierra la sesión: el refresh token y sus rotaciones dejan de servir.
+# El access token vigente expira por sí solo (jwt_access_token_expire_minutes)
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    solicitud: SolicitudRefresh,
+    db: Session = Depends(get_db)
+):
+    try:
+        revocar_refresh_token(db, solicitud.refresh_token)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
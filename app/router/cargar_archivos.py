@@ -2,13 +2,15 @@ from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
 import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
-from app.schemas.usuarios import RetornoUsuario
-from app.router.dependencies import get_current_user
+from app.schemas.auth import UsuarioToken
+from app.router.dependencies import get_usuario_token
 from io import BytesIO
 from app.crud.cargar_archivos import insertar_datos_en_bd
 from core.database import get_db
+from core.metricas import duracion_importacion, filas_importacion
 from typing import Any
 import re
+import time
 from datetime import datetime
 
 router = APIRouter()
@@ -219,7 +221,7 @@ def validar_y_reportar_fechas(df: pd.DataFrame) -> None:
 async def upload_excel(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     """
     Endpoint para cargar convenios desde Excel con limpieza robusta de datos.
@@ -234,6 +236,7 @@ async def upload_excel(
         # ================================================================
         # 1. LECTURA DEL ARCHIVO
         # ================================================================
+        inicio = time.perf_counter()
         contents = await file.read()
         df = pd.read_excel(
             BytesIO(contents),
@@ -376,7 +379,15 @@ async def upload_excel(
         # ================================================================
         # 9. INSERTAR EN BASE DE DATOS
         # ================================================================
+        duracion_importacion.observar(time.perf_counter() - inicio, tipo="convenios", etapa="procesamiento")
+        inicio = time.perf_counter()
         resultados = insertar_datos_en_bd(db, df)
+        duracion_importacion.observar(time.perf_counter() - inicio, tipo="convenios", etapa="base_datos")
+
+        filas_importacion.incrementar(resultados["programas_insertados"], tipo="convenios", resultado="insertado")
+        filas_importacion.incrementar(resultados["programas_actualizados"], tipo="convenios", resultado="actualizado")
+        filas_importacion.incrementar(len(resultados["errores"]), tipo="convenios", resultado="error")
+        filas_importacion.incrementar(registros_eliminados, tipo="convenios", resultado="descartado")
         
         resultados["registros_procesados"] = registros_totales
         resultados["registros_validos"] = registros_validos
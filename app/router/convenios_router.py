@@ -1,17 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from app.schemas.convenios_schema import ConvenioBase, RetornoConvenio, EditarConvenio
+from fastapi.responses import StreamingResponse
+from app.schemas.convenios_schema import ConvenioBase, RetornoConvenio, EditarConvenio, ResultadoBusquedaConvenios, LoteConvenios
 from sqlalchemy.orm import Session
-from app.schemas.usuarios import RetornoUsuario
-from app.router.dependencies import get_current_user
+from app.schemas.auth import UsuarioToken
+from app.router.dependencies import get_usuario_token, usuario_administrador
 from sqlalchemy.exc import SQLAlchemyError
 from core.database import get_db
+from core.config import settings
+from core.proyeccion import resolver_campos
+from core.respuestas import respuesta_rapida
+from core.etag import etag_tablas, encabezados_etag
 from app.crud import convenios_crud as crud_convenios
 from typing import List, Optional
 from datetime import datetime
+from decimal import Decimal
+import csv
+import io
+import json
 import re
 
 router = APIRouter()
 
+# Para los endpoints con ETag: el permiso se verifica antes de poder responder 304
+permiso_consulta = usuario_administrador("No tienes permisos para consultar convenios")
+
 # ============================================================================
 # FUNCIONES AUXILIARES DE VALIDACIÓN
 # ============================================================================
@@ -46,11 +58,37 @@ def normalizar_fecha_entrada(fecha_str: str) -> str:
     
     raise ValueError(f"Formato de fecha inválido: {fecha_str}")
 
+def _valor_json(valor):
+    """Convierte los tipos de la base de datos que json no serializa (DECIMAL, fechas)"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return str(valor)
+
+def _generar_ndjson(campos: List[str]):
+    for bloque in crud_convenios.exportar_convenios(campos):
+        yield "".join(
+            json.dumps(dict(fila), ensure_ascii=False, default=_valor_json) + "\n"
+            for fila in bloque
+        )
+
+def _generar_csv(campos: List[str]):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(campos)
+    for bloque in crud_convenios.exportar_convenios(campos):
+        escritor.writerows([fila[campo] for campo in campos] for fila in bloque)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Encabezado de una tabla vacía
+    if buffer.tell():
+        yield buffer.getvalue()
+
 @router.post("/registrar", status_code=status.HTTP_201_CREATED)
 def crear_convenio(
     convenio: ConvenioBase, 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -78,26 +116,149 @@ def crear_convenio(
             detail=f"Error al crear convenio: {str(e)}"
         )
 
-@router.get("/obtener-todos", status_code=status.HTTP_200_OK, response_model=List[RetornoConvenio]
+@router.get("/obtener-todos", status_code=status.HTTP_200_OK, response_model=List[RetornoConvenio],
+    response_model_exclude_unset=True
 )
 def obtener_todos_los_convenios(
+    fields: Optional[str] = Query(None, description="Campos a retornar separados por coma (por defecto todos)"),
+    rapido: bool = Query(False, description="Serializar las filas directamente con orjson, sin validarlas por fila"),
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(permiso_consulta),
+    etag: Optional[str] = Depends(etag_tablas("convenios"))
 ):
+    try:
+        campos = resolver_campos(fields, crud_convenios.CAMPOS_CONVENIO, ("id_convenio",))
+        convenios = crud_convenios.obtener_todos_convenios(db, campos)
+        if not convenios:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, 
+                detail="No se encontraron convenios registrados"
+            )
+        if rapido:
+            return respuesta_rapida(convenios, encabezados_etag(etag))
+        return convenios
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
+            detail=f"Error de base de datos: {str(e)}"
+        )
+
+@router.get("/exportar", status_code=status.HTTP_200_OK)
+def exportar_convenios(
+    formato: str = Query("ndjson", description="Formato de la exportación", pattern=r'^(ndjson|csv)$'),
+    fields: Optional[str] = Query(None, description="Campos a exportar separados por coma (por defecto todos)"),
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
+):
+    """
+    Exporta todos los convenios en NDJSON o CSV. Las filas se leen de un cursor del
+    servidor y se envían a medida que llegan, sin armar la respuesta completa en memoria.
+    """
     try:
         if usuario_actual.id_rol != 1:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, 
-                detail="No tienes permisos para consultar convenios"
+                detail="No tienes permisos para exportar convenios"
             )
         
-        convenios = crud_convenios.obtener_todos_convenios(db)
-        if not convenios:
+        campos = resolver_campos(fields, crud_convenios.CAMPOS_CONVENIO)
+        if formato == "csv":
+            contenido, media_type = _generar_csv(campos), "text/csv; charset=utf-8"
+        else:
+            contenido, media_type = _generar_ndjson(campos), "application/x-ndjson"
+        return StreamingResponse(
+            contenido,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="convenios.{formato}"'}
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/buscar", status_code=status.HTTP_200_OK, response_model=ResultadoBusquedaConvenios,
+    response_model_exclude_unset=True
+)
+def buscar_convenios(
+    nit_institucion: Optional[str] = Query(None, description="NIT exacto de la institución", max_length=20),
+    tipo_convenio_sena: Optional[str] = Query(None, description="Tipo de convenio SENA", max_length=50),
+    estado_convenio: Optional[str] = Query(None, description="Estado del convenio", max_length=50),
+    persona_apoyo_fpi: Optional[str] = Query(None, description="Persona de apoyo FPI", max_length=80),
+    fecha_firma_desde: Optional[str] = Query(None, description="Fecha de firma desde (YYYY-MM-DD)", pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    fecha_firma_hasta: Optional[str] = Query(None, description="Fecha de firma hasta (YYYY-MM-DD)", pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    supervisor: Optional[str] = Query(None, description="Inicio del nombre del supervisor"),
+    num_convenio: Optional[str] = Query(None, description="Número del convenio (completo o parcial)"),
+    num_proceso: Optional[str] = Query(None, description="Número del proceso (completo o parcial)"),
+    tipo_convenio: Optional[str] = Query(None, description="Tipo de convenio", max_length=50),
+    tipo_proceso: Optional[str] = Query(None, description="Tipo de proceso", max_length=50),
+    fecha_inicio_desde: Optional[str] = Query(None, description="Fecha de inicio desde (YYYY-MM-DD)", pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    fecha_inicio_hasta: Optional[str] = Query(None, description="Fecha de inicio hasta (YYYY-MM-DD)", pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    nombre_institucion: Optional[str] = Query(None, description="Nombre de la institución (completo o parcial)"),
+    objetivo: Optional[str] = Query(None, description="Palabra clave en el objetivo del convenio"),
+    ordenar_por: Optional[str] = Query(None, description="Columna de orden (por defecto fecha de firma)"),
+    orden: str = Query("desc", description="Dirección del orden", pattern=r'^(asc|desc)$'),
+    limite: int = Query(50, ge=1, le=500, description="Cantidad de convenios por página"),
+    desplazamiento: int = Query(0, ge=0, description="Cantidad de convenios a omitir"),
+    fields: Optional[str] = Query(None, description="Campos a retornar separados por coma (por defecto todos)"),
+    db: Session = Depends(get_db),
+    usuario_actual: UsuarioToken = Depends(permiso_consulta),
+    _etag: Optional[str] = Depends(etag_tablas("convenios"))
+):
+    """
+    Búsqueda combinada de convenios: acepta cualquier combinación de filtros
+    y la resuelve en una sola consulta paginada.
+    """
+    try:
+        if fecha_firma_desde and fecha_firma_hasta and fecha_firma_desde > fecha_firma_hasta:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, 
-                detail="No se encontraron convenios registrados"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La fecha de firma inicial no puede ser mayor que la final"
             )
-        return convenios
+        if fecha_inicio_desde and fecha_inicio_hasta and fecha_inicio_desde > fecha_inicio_hasta:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La fecha de inicio inicial no puede ser mayor que la final"
+            )
+        
+        filtros = {
+            "nit_institucion": nit_institucion,
+            "tipo_convenio_sena": tipo_convenio_sena,
+            "estado_convenio": estado_convenio,
+            "persona_apoyo_fpi": persona_apoyo_fpi,
+            "fecha_firma_desde": fecha_firma_desde,
+            "fecha_firma_hasta": fecha_firma_hasta,
+            "supervisor": supervisor,
+            "num_convenio": num_convenio,
+            "num_proceso": num_proceso,
+            "tipo_convenio": tipo_convenio,
+            "tipo_proceso": tipo_proceso,
+            "fecha_inicio_desde": fecha_inicio_desde,
+            "fecha_inicio_hasta": fecha_inicio_hasta,
+            "nombre_institucion": nombre_institucion,
+            "objetivo": objetivo,
+        }
+        campos = resolver_campos(fields, crud_convenios.CAMPOS_CONVENIO, ("id_convenio",))
+        convenios, total = crud_convenios.buscar_convenios(
+            db, filtros, ordenar_por, orden == "desc", limite, desplazamiento, campos
+        )
+        return {
+            "total": total,
+            "limite": limite,
+            "desplazamiento": desplazamiento,
+            "convenios": convenios
+        }
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except HTTPException:
         raise
     except SQLAlchemyError as e:
@@ -111,7 +272,7 @@ def obtener_todos_los_convenios(
 def obtener_convenio_por_id(
     id_convenio: int, 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     """
     Obtiene un convenio específico por su ID único.
@@ -138,12 +299,45 @@ def obtener_convenio_por_id(
             detail=f"Error de base de datos: {str(e)}"
         )
 
+@router.get("/obtener-por-ids", status_code=status.HTTP_200_OK, response_model=LoteConvenios
+)
+def obtener_convenios_por_ids(
+    ids: List[int] = Query(..., description="Ids de los convenios (?ids=1&ids=2...)"),
+    db: Session = Depends(get_db),
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
+):
+    """
+    Obtiene varios convenios por id en una sola consulta, en el orden solicitado,
+    indicando los ids que no existen.
+    """
+    try:
+        if usuario_actual.id_rol != 1:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, 
+                detail="No tienes permisos para consultar convenios"
+            )
+        if len(ids) > settings.MAX_IDS_POR_LOTE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Se permiten como máximo {settings.MAX_IDS_POR_LOTE} ids por consulta"
+            )
+        
+        convenios, no_encontrados = crud_convenios.obtener_convenios_by_ids(db, ids)
+        return {"convenios": convenios, "no_encontrados": no_encontrados}
+    except HTTPException:
+        raise
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
+            detail=f"Error de base de datos: {str(e)}"
+        )
+
 @router.get("/obtener-por-numero-convenio", status_code=status.HTTP_200_OK, response_model=List[RetornoConvenio]
 )
 def obtener_por_numero_convenio(
     num_convenio: str = Query(..., description="Número del convenio a buscar"), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -172,7 +366,7 @@ def obtener_por_numero_convenio(
 def obtener_por_numero_proceso(
     num_proceso: str = Query(..., description="Número del proceso a buscar"), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -201,7 +395,7 @@ def obtener_por_numero_proceso(
 def obtener_por_nit_institucion(
     nit_institucion: str = Query(..., description="NIT de la institución (20 caracteres)", max_length=20), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -230,7 +424,7 @@ def obtener_por_nit_institucion(
 def obtener_por_nombre_institucion(
     nombre_institucion: str = Query(..., description="Nombre de la institución (completo o parcial)"), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -259,7 +453,7 @@ def obtener_por_nombre_institucion(
 def obtener_por_estado_convenio(
     estado_convenio: str = Query(..., description="Estado del convenio", max_length=50), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -288,7 +482,7 @@ def obtener_por_estado_convenio(
 def obtener_por_tipo_convenio(
     tipo_convenio: str = Query(..., description="Tipo de convenio", max_length=50), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -320,7 +514,7 @@ def obtener_por_tipo_convenio(
 def obtener_por_tipo_proceso(
     tipo_proceso: str = Query(..., description="Tipo de proceso", max_length=50), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -349,7 +543,7 @@ def obtener_por_tipo_proceso(
 def obtener_por_tipo_convenio_sena(
     tipo_convenio_sena: str = Query(..., description="Tipo de convenio SENA", max_length=50), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -378,7 +572,7 @@ def obtener_por_tipo_convenio_sena(
 def obtener_por_supervisor(
     supervisor: str = Query(..., description="Nombre del supervisor (completo o parcial)"), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -407,7 +601,7 @@ def obtener_por_supervisor(
 def obtener_por_persona_apoyo(
     persona_apoyo_fpi: str = Query(..., description="Nombre de la persona de apoyo FPI"), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -437,7 +631,7 @@ def obtener_por_rango_fechas_firma(
     fecha_inicio: str = Query(..., description="Fecha de inicio (YYYY-MM-DD)", regex=r'^\d{4}-\d{2}-\d{2}$'),
     fecha_fin: str = Query(..., description="Fecha fin (YYYY-MM-DD)", regex=r'^\d{4}-\d{2}-\d{2}$'),
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -484,7 +678,7 @@ def obtener_por_rango_fechas_inicio(
     fecha_inicio: str = Query(..., description="Fecha de inicio (YYYY-MM-DD)", regex=r'^\d{4}-\d{2}-\d{2}$'),
     fecha_fin: str = Query(..., description="Fecha fin (YYYY-MM-DD)", regex=r'^\d{4}-\d{2}-\d{2}$'),
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -530,7 +724,7 @@ def obtener_por_rango_fechas_inicio(
 def buscar_por_objetivo(
     palabra_clave: str = Query(..., description="Palabra clave para buscar en objetivos"), 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -559,7 +753,7 @@ def actualizar_convenio(
     id_convenio: int, 
     convenio: EditarConvenio, 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
@@ -600,7 +794,7 @@ def actualizar_convenio(
 def eliminar_convenio_por_id(
     id_convenio: int, 
     db: Session = Depends(get_db),
-    usuario_actual: RetornoUsuario = Depends(get_current_user)
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if usuario_actual.id_rol != 1:
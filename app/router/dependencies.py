@@ -1,32 +1,88 @@
-from fastapi import Depends, HTTPException
+from typing import Callable, Optional
+from fastapi import Depends, HTTPException, Query, Request, status
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from app.crud.usuarios import get_user_by_email_security, get_user_by_id
-from core.security import verify_password, verify_token
-from core.database import get_db
+from app.crud.usuarios import get_user_by_email_security, update_password_hash
+from core.security import verify_and_update_password, decode_token
+from core.autorizacion import registro_usuarios
+from app.schemas.auth import UsuarioToken
 from fastapi.security import OAuth2PasswordBearer
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/access/token")
 
-def get_current_user(
-        token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
-):
-    user = verify_token(token)
-    if user is None:
+
+def rol_vigente(id_usuario: int) -> Optional[int]:
+    """registro_usuarios.rol_vigente, respondiendo 503 si la base de datos no está disponible"""
+    try:
+        return registro_usuarios.rol_vigente(id_usuario)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Base de datos no disponible, intente de nuevo más tarde"
+        )
+
+
+def get_usuario_token(token: str = Depends(oauth2_scheme)) -> UsuarioToken:
+    """
+    Autoriza con los claims del token ("sub" y "rol") sin cargar el usuario de la base de datos.
+    El registro de usuarios activos rechaza los tokens de usuarios desactivados, eliminados
+    o cuyo rol cambió después de iniciar sesión.
+    """
+    claims = decode_token(token)
+    if claims is None or claims.get("sub") is None or claims.get("rol") is None:
         raise HTTPException(status_code=401, detail="Token Invalido")
-    user_db = get_user_by_id(db, user)
-    if user_db is None:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    if not user_db.estado:
+    try:
+        id_usuario = int(claims["sub"])
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Token Invalido")
+
+    rol_actual = rol_vigente(id_usuario)
+    if rol_actual is None:
         raise HTTPException(status_code=403, detail="Usuario inactivo. No autorizado")
-    return user_db
+    if rol_actual != claims["rol"]:
+        raise HTTPException(status_code=401, detail="Token desactualizado, inicie sesión nuevamente")
+    return UsuarioToken(id_usuario=id_usuario, id_rol=rol_actual)
+
+
+def usuario_administrador(detalle: str, codigo: int = status.HTTP_403_FORBIDDEN) -> Callable:
+    """
+    Crea una dependencia que exige rol de administrador y retorna el UsuarioToken.
+    Los endpoints con ETag la declaran antes de etag_tablas: FastAPI resuelve las
+    dependencias en orden, así un usuario sin permisos recibe `codigo` y no un 304.
+    """
+    def dependencia(usuario_actual: UsuarioToken = Depends(get_usuario_token)) -> UsuarioToken:
+        if usuario_actual.id_rol != 1:
+            raise HTTPException(status_code=codigo, detail=detalle)
+        return usuario_actual
+
+    return dependencia
+
+
+def get_usuario_token_query(
+    request: Request,
+    token: Optional[str] = Query(None, description="Token JWT, para clientes que no pueden enviar encabezados")
+) -> UsuarioToken:
+    """
+    Igual que get_usuario_token, pero acepta el token también como parámetro `token`:
+    EventSource y WebSocket del navegador no permiten enviar el encabezado Authorization.
+    """
+    autorizacion = request.headers.get("authorization", "")
+    if autorizacion.lower().startswith("bearer "):
+        token = autorizacion[7:]
+    if not token:
+        raise HTTPException(status_code=401, detail="Token Invalido")
+    return get_usuario_token(token)
 
 
 def authenticate_user(username: str, password: str, db: Session):
     user = get_user_by_email_security(db, username)
     if not user:
         return False
-    if not verify_password(password, user.contra_encript):
+    valida, nuevo_hash = verify_and_update_password(password, user.contra_encript)
+    if not valida:
         return False
+    if nuevo_hash:
+        # El hash se creó con otros parámetros de argon2: se reemplaza aprovechando que tenemos la contraseña
+        update_password_hash(db, user.id_usuario, nuevo_hash)
     return user
\ No newline at end of file
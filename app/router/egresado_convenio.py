@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.schemas.egresado_convenio import Egresado_convenioBase
 from sqlalchemy.orm import Session
-from app.schemas.usuarios import RetornoUsuario
-from app.router.dependencies import get_current_user
+from app.schemas.auth import UsuarioToken
+from app.router.dependencies import get_usuario_token
 from sqlalchemy.exc import SQLAlchemyError
 from core.database import get_db
 from app.crud import egresado_convenio as crud_egresado_convenio
@@ -11,7 +11,7 @@ router = APIRouter()
 
 @router.post("/registrar-convenio-egresado", status_code=status.HTTP_201_CREATED)
 def create_egresadoConvenio(egresado_convenio: Egresado_convenioBase, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
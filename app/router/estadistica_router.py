@@ -1,18 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.schemas.estadistica_schema import EstadisticaCategoriaBase, RetornoEstadisticaCategoria, EditarEstadisticaCategoria
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from app.schemas.estadistica_schema import EstadisticaCategoriaBase, RetornoEstadisticaCategoria, EditarEstadisticaCategoria, DashboardEstadisticas, SeriePeriodos
 from sqlalchemy.orm import Session
-from app.schemas.usuarios import RetornoUsuario
-from app.router.dependencies import get_current_user
+from app.schemas.auth import UsuarioToken
+from app.router.dependencies import get_usuario_token, usuario_administrador
 from sqlalchemy.exc import SQLAlchemyError
 from core.database import get_db
+from core.respuestas import respuesta_rapida
+from core.etag import etag_tablas, encabezados_etag
 from app.crud import estadistica_crud as crud_estadistica
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
+# Para los endpoints con ETag: el permiso se verifica antes de poder responder 304
+permiso_consulta = usuario_administrador("No tienes permisos para consultar estadísticas", status.HTTP_401_UNAUTHORIZED)
+
 @router.post("/registrar", status_code=status.HTTP_201_CREATED)
 def create_estadistica(estadistica: EstadisticaCategoriaBase, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -27,23 +32,77 @@ def create_estadistica(estadistica: EstadisticaCategoriaBase, db: Session = Depe
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/obtener-todas", status_code=status.HTTP_200_OK, response_model=List[RetornoEstadisticaCategoria])
-def get_all_estadisticas(db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+def get_all_estadisticas(
+    rapido: bool = Query(False, description="Serializar las filas directamente con orjson, sin validarlas por fila"),
+    db: Session = Depends(get_db),
+    user_token: UsuarioToken = Depends(permiso_consulta),
+    etag: Optional[str] = Depends(etag_tablas("estadistica_categoria"))
 ):
     try:
-        if user_token.id_rol != 1:
-            raise HTTPException(status_code=401, detail="No tienes permisos para consultar estadísticas")
-        
         estadisticas = crud_estadistica.obtener_todas_estadisticas(db)
         if not estadisticas:
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="No se encontraron estadísticas")
+        if rapido:
+            return respuesta_rapida(estadisticas, encabezados_etag(etag))
         return estadisticas
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/dashboard", status_code=status.HTTP_200_OK, response_model=DashboardEstadisticas)
+def get_dashboard(
+    db: Session = Depends(get_db),
+    user_token: UsuarioToken = Depends(permiso_consulta),
+    _etag: Optional[str] = Depends(etag_tablas("estadistica_categoria", "instituciones", "convenios", "homologacion"))
+):
+    """Todas las categorías y los totales generales en una sola llamada (reemplaza una consulta por categoría)"""
+    try:
+        return crud_estadistica.obtener_dashboard(db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/periodos", status_code=status.HTTP_200_OK, response_model=SeriePeriodos,
+    response_model_exclude_unset=True
+)
+def get_estadisticas_periodo(
+    campo_fecha: str = Query("firma", description="Fecha que define el periodo", pattern=r'^(firma|inicio)$'),
+    granularidad: str = Query("mes", description="Tamaño del periodo", pattern=r'^(anio|trimestre|mes)$'),
+    por_tipo: bool = Query(False, description="Separar por tipo de convenio SENA"),
+    por_estado: bool = Query(False, description="Separar por estado del convenio"),
+    anio_desde: Optional[int] = Query(None, ge=1900, le=2999, description="Primer año incluido"),
+    anio_hasta: Optional[int] = Query(None, ge=1900, le=2999, description="Último año incluido"),
+    tipo_convenio_sena: Optional[str] = Query(None, description="Solo este tipo de convenio SENA", max_length=50),
+    estado_convenio: Optional[str] = Query(None, description="Solo este estado del convenio", max_length=50),
+    db: Session = Depends(get_db),
+    user_token: UsuarioToken = Depends(permiso_consulta),
+    _etag: Optional[str] = Depends(etag_tablas("convenios"))
+):
+    """Serie de convenios y montos por año, trimestre o mes de firma o de inicio (para gráficas de tendencia)"""
+    try:
+        if anio_desde is not None and anio_hasta is not None and anio_desde > anio_hasta:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El año inicial no puede ser mayor que el final"
+            )
+
+        filtros = {
+            "anio_desde": anio_desde,
+            "anio_hasta": anio_hasta,
+            "tipo_convenio_sena": tipo_convenio_sena,
+            "estado_convenio": estado_convenio,
+        }
+        return crud_estadistica.obtener_estadisticas_periodo(
+            db, campo_fecha, granularidad, por_tipo, por_estado, filtros
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/obtener-por-id/{id_estadistica}", status_code=status.HTTP_200_OK, response_model=RetornoEstadisticaCategoria)
 def get_by_id(id_estadistica: int, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -58,7 +117,7 @@ def get_by_id(id_estadistica: int, db: Session = Depends(get_db),
 
 @router.get("/obtener-por-categoria", status_code=status.HTTP_200_OK, response_model=List[RetornoEstadisticaCategoria])
 def get_by_categoria(categoria: str, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -73,7 +132,7 @@ def get_by_categoria(categoria: str, db: Session = Depends(get_db),
 
 @router.get("/obtener-por-nombre", status_code=status.HTTP_200_OK, response_model=List[RetornoEstadisticaCategoria])
 def get_by_nombre(nombre: str, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -88,7 +147,7 @@ def get_by_nombre(nombre: str, db: Session = Depends(get_db),
 
 @router.get("/obtener-por-categoria-exacta", status_code=status.HTTP_200_OK, response_model=List[RetornoEstadisticaCategoria])
 def get_by_categoria_exacta(categoria: str, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -103,7 +162,7 @@ def get_by_categoria_exacta(categoria: str, db: Session = Depends(get_db),
 
 @router.put("/editar/{id_estadistica}")
 def update_estadistica(id_estadistica: int, estadistica: EditarEstadisticaCategoria, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -118,7 +177,7 @@ def update_estadistica(id_estadistica: int, estadistica: EditarEstadisticaCatego
 
 @router.delete("/eliminar-por-id/{id_estadistica}", status_code=status.HTTP_200_OK)
 def delete_by_id(id_estadistica: int, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.schemas.homologaciones_schema import CrearHomologacion, RetornoHomologacion, EditarHomologacion
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from app.schemas.homologaciones_schema import CrearHomologacion, RetornoHomologacion, EditarHomologacion, LoteHomologaciones
 from sqlalchemy.orm import Session
-from app.schemas.usuarios import RetornoUsuario
-from app.router.dependencies import get_current_user
+from app.schemas.auth import UsuarioToken
+from app.router.dependencies import get_usuario_token, usuario_administrador
 from sqlalchemy.exc import SQLAlchemyError
 from core.database import get_db
+from core.config import settings
+from core.proyeccion import resolver_campos
+from core.respuestas import respuesta_rapida
+from core.etag import etag_tablas, encabezados_etag
 from app.crud import homologaciones_crud as crud_homologacion
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
 @router.post("/registrar", status_code=status.HTTP_201_CREATED)
 def create_homologacion(homologacion: CrearHomologacion, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -26,26 +30,48 @@ def create_homologacion(homologacion: CrearHomologacion, db: Session = Depends(g
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/obtener-todas-homologaciones/", status_code=status.HTTP_200_OK, response_model=List[RetornoHomologacion])
+@router.get("/obtener-todas-homologaciones/", status_code=status.HTTP_200_OK, response_model=List[RetornoHomologacion],
+    response_model_exclude_unset=True)
 def get_all_homologaciones(
+    fields: Optional[str] = Query(None, description="Campos a retornar separados por coma (por defecto todos)"),
+    rapido: bool = Query(False, description="Serializar las filas directamente con orjson, sin validarlas por fila"),
     db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(usuario_administrador("No tienes permisos", status.HTTP_401_UNAUTHORIZED)),
+    etag: Optional[str] = Depends(etag_tablas("homologacion"))
 ):
     try:
-        if user_token.id_rol != 1:
-            raise HTTPException(status_code=401, detail="No tienes permisos")
-        
-        homologaciones = crud_homologacion.get_all_homologaciones(db)
+        campos = resolver_campos(fields, crud_homologacion.CAMPOS_HOMOLOGACION, ("id_homologacion",))
+        homologaciones = crud_homologacion.get_all_homologaciones(db, campos)
         if homologaciones is None:
             raise HTTPException(status_code=404, detail="Homologaciones no encontrados")
+        if rapido:
+            return respuesta_rapida(homologaciones, encabezados_etag(etag))
         return homologaciones
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/obtener-por-ids", status_code=status.HTTP_200_OK, response_model=LoteHomologaciones)
+def get_homologaciones_by_ids(ids: List[int] = Query(..., description="Ids de las homologaciones (?ids=1&ids=2...)"),
+    db: Session = Depends(get_db),
+    user_token: UsuarioToken = Depends(get_usuario_token)
+):
+    try:
+        if user_token.id_rol != 1:
+            raise HTTPException(status_code=401, detail="No tienes permisos")
+        if len(ids) > settings.MAX_IDS_POR_LOTE:
+            raise HTTPException(status_code=400, detail=f"Se permiten como máximo {settings.MAX_IDS_POR_LOTE} ids por consulta")
+        
+        homologaciones, no_encontrados = crud_homologacion.obtener_homologaciones_by_ids(db, ids)
+        return {"homologaciones": homologaciones, "no_encontrados": no_encontrados}
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/obtener-por-id/{id_homologacion}", status_code=status.HTTP_200_OK, response_model=RetornoHomologacion)
 def get_homologaciones_by_id(id_homologacion: int, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -60,7 +86,7 @@ def get_homologaciones_by_id(id_homologacion: int, db: Session = Depends(get_db)
     
 @router.get("/obtener-por-nivel-programa/{nivel_programa}", status_code=status.HTTP_200_OK, response_model=List[RetornoHomologacion])
 def get_by_nivel_programa(nivel_programa:str, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -75,7 +101,7 @@ def get_by_nivel_programa(nivel_programa:str, db: Session = Depends(get_db),
     
 @router.get("/obtener-por-nombre-programa/{nombre_programa_sena}", status_code=status.HTTP_200_OK, response_model=List[RetornoHomologacion])
 def get_by_nombre_programa_sena(nombre_programa_sena:str, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -90,7 +116,7 @@ def get_by_nombre_programa_sena(nombre_programa_sena:str, db: Session = Depends(
     
 @router.put("/editar/{id_homologacion}")
 def update_homologacion(id_homologacion: int, homologacion: EditarHomologacion, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -105,7 +131,7 @@ def update_homologacion(id_homologacion: int, homologacion: EditarHomologacion,
     
 @router.delete("/eliminar-por-id/{id_homologacion}", status_code=status.HTTP_200_OK)
 def delete_by_id(id_homologacion:int, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -2,11 +2,14 @@ from typing import List, Optional
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from app.schemas.institucion import InstitucionBase, RetornarInstitucion, EditarInstitucion
-from app.schemas.usuarios import RetornoUsuario
-from app.router.dependencies import get_current_user
+from app.schemas.auth import UsuarioToken
+from app.router.dependencies import get_usuario_token, usuario_administrador
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from core.database import get_db
+from core.config import settings
+from core.proyeccion import resolver_campos
+from core.etag import etag_tablas
 from app.crud import institucion as crud_instituciones
 
 router = APIRouter()
@@ -14,7 +17,7 @@ logger = logging.getLogger(__name__)
 
 @router.post("/registrar", status_code=status.HTTP_201_CREATED)
 def create_institucion(institucion: InstitucionBase, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -35,7 +38,7 @@ def create_institucion(institucion: InstitucionBase, db: Session = Depends(get_d
 
 @router.get("/obtener-por-nit", status_code=status.HTTP_200_OK)
 def get_by_nit(nit_institucion: str, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -48,9 +51,25 @@ def get_by_nit(nit_institucion: str, db: Session = Depends(get_db),
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+@router.get("/obtener-por-nits", status_code=status.HTTP_200_OK)
+def get_by_nits(nits: List[str] = Query(..., description="NITs de las instituciones (?nits=...&nits=...)"),
+    db: Session = Depends(get_db),
+    user_token: UsuarioToken = Depends(get_usuario_token)
+):
+    try:
+        if user_token.id_rol != 1:
+            raise HTTPException(status_code=401, detail="No tienes permisos")
+        if len(nits) > settings.MAX_IDS_POR_LOTE:
+            raise HTTPException(status_code=400, detail=f"Se permiten como máximo {settings.MAX_IDS_POR_LOTE} NITs por consulta")
+        
+        instituciones, no_encontrados = crud_instituciones.get_instituciones_lote(db, nits)
+        return {"instituciones": instituciones, "no_encontrados": no_encontrados}
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
 @router.get("/obtener-por-nombre", status_code=status.HTTP_200_OK)
 async def get_by_name(nombre_institucion: str, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -65,7 +84,7 @@ async def get_by_name(nombre_institucion: str, db: Session = Depends(get_db),
 
 @router.get("/obtener-por-direccion", status_code=status.HTTP_200_OK)
 def get_by_direccion(direccion: str, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -80,7 +99,7 @@ def get_by_direccion(direccion: str, db: Session = Depends(get_db),
 
 @router.get("/obtener-por-municipio", status_code=status.HTTP_200_OK)
 def get_by_municipio(id_municipio: int, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -95,7 +114,7 @@ def get_by_municipio(id_municipio: int, db: Session = Depends(get_db),
 
 @router.get("/obtener-por-convenios", status_code=status.HTTP_200_OK)
 def get_by_convenios(cant_convenios: int, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -113,7 +132,7 @@ def get_by_rango_convenios(
     min_convenios: int = Query(0, ge=0),
     max_convenios: int = Query(100, ge=0),
     db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -130,17 +149,20 @@ def get_by_rango_convenios(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/obtener-todas", status_code=status.HTTP_200_OK)
-def get_all_instituciones(db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+def get_all_instituciones(
+    fields: Optional[str] = Query(None, description="Campos a retornar separados por coma (por defecto todos)"),
+    db: Session = Depends(get_db),
+    user_token: UsuarioToken = Depends(usuario_administrador("No tienes permisos", status.HTTP_401_UNAUTHORIZED)),
+    _etag: Optional[str] = Depends(etag_tablas("instituciones", "municipio"))
 ):
     try:
-        if user_token.id_rol != 1:
-            raise HTTPException(status_code=401, detail="No tienes permisos")
-        
-        instituciones = crud_instituciones.get_all_instituciones(db)
+        campos = resolver_campos(fields, crud_instituciones.CAMPOS_INSTITUCION, ("nit_institucion",))
+        instituciones = crud_instituciones.get_all_instituciones(db, campos)
         if instituciones is None or len(instituciones) == 0:
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="No se encontraron instituciones")
         return instituciones
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -153,7 +175,7 @@ def busqueda_avanzada(
     min_convenios: Optional[int] = None,
     max_convenios: Optional[int] = None,
     db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -171,7 +193,7 @@ def busqueda_avanzada(
     
 @router.put("/editar/{nit_institucion}")
 def update_institucion(nit_institucion: str, institucion: EditarInstitucion, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -186,7 +208,7 @@ def update_institucion(nit_institucion: str, institucion: EditarInstitucion, db:
     
 @router.delete("/eliminar-por-nit/{nit_institucion}")
 def delete_institucion(nit_institucion: str, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
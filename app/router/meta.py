@@ -1,39 +1,248 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import text
+import asyncio
+import hmac
+from datetime import datetime, timedelta
+from typing import Optional
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from core.database import get_db
+from core.database import get_db, estadisticas_pool
+from core.config import settings
+from core.respuestas import RespuestaFilasORJSON
+from app.crud.cambios import hora_servidor, limite_purga, obtener_cambios
+from app.router.dependencies import get_usuario_token, get_usuario_token_query, usuario_administrador
+from core.notificaciones import canal_cambios
+from app.schemas.auth import UsuarioToken
+from core.cache import estadisticas_cache
+from core.versiones import TABLAS_VERSIONADAS, leer_versiones
+from core.limitador import estadisticas_limitadores
+from core.analitica import instantanea_analitica
+from core.instrumentacion import estadisticas_sql
+from core.metricas import exportar_prometheus
+from core.perfilado import leer_perfil, listar_perfiles
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Las métricas de operación exponen rutas, consultas y uso del servicio: solo administradores
+permiso_metricas = usuario_administrador("No tienes permisos para consultar las métricas")
+
+
+def permiso_prometheus(request: Request) -> None:
+    """Acepta METRICAS_TOKEN (el scraper de Prometheus no puede renovar un JWT) o el token de un administrador"""
+    autorizacion = request.headers.get("authorization", "")
+    token = autorizacion[7:].strip() if autorizacion.lower().startswith("bearer ") else ""
+    if not token:
+        raise HTTPException(status_code=401, detail="Token Invalido", headers={"WWW-Authenticate": "Bearer"})
+    if settings.METRICAS_TOKEN and hmac.compare_digest(token.encode(), settings.METRICAS_TOKEN.encode()):
+        return
+    permiso_metricas(get_usuario_token(token))
+
 @router.get('/ultima-actualizacion', status_code=200)
 def ultima_actualizacion(db: Session = Depends(get_db)):
     try:
-        # Agrupar las últimas fechas de actualización de tablas relevantes y devolver la máxima
-        query = text("""
-            SELECT MAX(ultima) AS ultima FROM (
-                SELECT MAX(fecha_actualizacion) AS ultima FROM instituciones
-                UNION ALL
-                SELECT MAX(fecha_actualizacion) FROM convenios
-                UNION ALL
-                SELECT MAX(fecha_actualizacion) FROM homologacion
-                UNION ALL
-                SELECT MAX(fecha_actualizacion) FROM municipio
-                UNION ALL
-                SELECT MAX(fecha_actualizacion) FROM usuarios
-            ) t
-        """)
-        result = db.execute(query).scalar()
+        # data_version tiene una fila por entidad mantenida por triggers: lectura por llave primaria,
+        # sin recorrer las tablas de datos
+        versiones = leer_versiones(db, TABLAS_VERSIONADAS)
+        fechas = [fecha for _, fecha in versiones.values() if fecha is not None]
+        result = max(fechas) if fechas else None
         logger.info("ultima_actualizacion consulta retornó: %s", result)
-        if result is None:
-            return {"ultima_actualizacion": None}
-        # Si es un objeto datetime, devolver en ISO; si es string, devolver tal cual
-        try:
-            return {"ultima_actualizacion": result.isoformat()}
-        except Exception:
-            return {"ultima_actualizacion": str(result)}
+        return {
+            "ultima_actualizacion": _fecha_iso(result),
+            "entidades": {
+                tabla: {"version": version, "ultima_actualizacion": _fecha_iso(fecha)}
+                for tabla, (version, fecha) in versiones.items()
+            },
+        }
     except SQLAlchemyError as e:
         logger.error("Error al obtener ultima_actualizacion: %s", e)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _fecha_iso(valor):
+    # Si es un objeto datetime, devolver en ISO; si es string, devolver tal cual
+    if valor is None:
+        return None
+    try:
+        return valor.isoformat()
+    except Exception:
+        return str(valor)
+
+@router.get('/cambios', status_code=200)
+def cambios(
+    desde: Optional[str] = Query(None, description="Cursor retornado por la consulta anterior (sin él solo se retorna el cursor actual)"),
+    db: Session = Depends(get_db),
+    user_token: UsuarioToken = Depends(get_usuario_token)
+):
+    """
+    Feed incremental de convenios, instituciones, homologaciones y municipios creados,
+    actualizados o eliminados desde el cursor.
+
+    Flujo del cliente: consultar sin `desde`, descargar los listados completos y desde
+    entonces consultar con el último `cursor`, aplicando por clave primero `eliminados` y
+    luego `actualizados`. Si una entidad trae `resincronizar`, descargar de nuevo su listado.
+    """
+    try:
+        if user_token.id_rol != 1:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permisos para consultar los cambios")
+
+        ahora = hora_servidor(db)
+        # El cursor queda unos segundos atrás: una transacción que confirma después de esta
+        # consulta con una fecha_actualizacion anterior aparece en la siguiente
+        cursor = (ahora - timedelta(seconds=settings.CAMBIOS_MARGEN_SEGUNDOS)).isoformat()
+        if desde is None:
+            return RespuestaFilasORJSON({"cursor": cursor, "cambios": {}})
+
+        try:
+            fecha_desde = datetime.fromisoformat(desde)
+            if fecha_desde.tzinfo is not None:
+                raise ValueError("El cursor no lleva zona horaria")
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor no válido")
+        purgado_hasta = limite_purga(db)
+        if purgado_hasta is not None and fecha_desde < purgado_hasta:
+            # Las lápidas de ese periodo ya se purgaron: no es posible saber qué se eliminó
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="Cursor expirado, descargue los listados completos")
+
+        return RespuestaFilasORJSON({
+            "cursor": cursor,
+            "cambios": obtener_cambios(db, fecha_desde, settings.CAMBIOS_MAX_FILAS),
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _generar_eventos():
+    # La suscripción se crea al empezar a enviar: si el cliente se va antes, no queda registrada
+    cola = canal_cambios.suscribir()
+    try:
+        # El navegador reconecta solo (EventSource) tras 5 s si se pierde la conexión
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                evento = await asyncio.wait_for(cola.get(), timeout=settings.NOTIFICACIONES_PING)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene abierta la conexión a través de proxies
+                yield ": ping\n\n"
+                continue
+            yield f"event: {evento['tipo']}\ndata: {orjson.dumps(evento).decode()}\n\n"
+    finally:
+        canal_cambios.desuscribir(cola)
+
+@router.get('/eventos', status_code=200)
+async def eventos(user_token: UsuarioToken = Depends(get_usuario_token_query)):
+    """
+    Notificaciones de cambios por Server-Sent Events. Cada evento lista las entidades
+    escritas en la última ventana (NOTIFICACIONES_INTERVALO) y los eventos locales como
+    el fin de una importación; el cliente vuelve a pedir solo lo que cambió.
+    """
+    return StreamingResponse(
+        _generar_eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket('/ws')
+async def eventos_websocket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """Las mismas notificaciones de /meta/eventos por WebSocket (token como parámetro)"""
+    try:
+        await run_in_threadpool(get_usuario_token, token or "")
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    cola = canal_cambios.suscribir()
+    # Se escucha al cliente en paralelo solo para detectar la desconexión a tiempo
+    recepcion = asyncio.ensure_future(websocket.receive())
+    try:
+        while True:
+            espera = asyncio.ensure_future(cola.get())
+            listos, _ = await asyncio.wait(
+                {espera, recepcion}, timeout=settings.NOTIFICACIONES_PING, return_when=asyncio.FIRST_COMPLETED
+            )
+            if espera in listos:
+                await websocket.send_text(orjson.dumps(espera.result()).decode())
+            else:
+                espera.cancel()
+            if recepcion in listos:
+                if recepcion.result()["type"] == "websocket.disconnect":
+                    break
+                recepcion = asyncio.ensure_future(websocket.receive())
+            elif not listos:
+                await websocket.send_text('{"tipo":"ping"}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        recepcion.cancel()
+        canal_cambios.desuscribir(cola)
+
+@router.get('/notificaciones', status_code=200)
+def metricas_notificaciones(user_token: UsuarioToken = Depends(permiso_metricas)):
+    """Suscriptores conectados a este proceso y eventos enviados o descartados por clientes lentos"""
+    return canal_cambios.estadisticas()
+
+@router.get('/cache', status_code=200)
+def metricas_cache(user_token: UsuarioToken = Depends(permiso_metricas)):
+    """Aciertos, fallos y tamaño de las cachés de lectura de este proceso (worker)"""
+    return estadisticas_cache()
+
+@router.get('/pool', status_code=200)
+def metricas_pool(user_token: UsuarioToken = Depends(permiso_metricas)):
+    """Conexiones entregadas/devueltas por el pool y sesiones creadas frente a solicitadas"""
+    return estadisticas_pool()
+
+@router.get('/metrics', status_code=200, response_class=PlainTextResponse)
+def metricas_prometheus(_permiso: None = Depends(permiso_prometheus)):
+    """Métricas de todos los workers en formato de texto de Prometheus (latencia, pool, cachés, cargas)"""
+    return PlainTextResponse(exportar_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get('/sql', status_code=200)
+def metricas_sql(user_token: UsuarioToken = Depends(permiso_metricas)):
+    """Consultas y tiempo de base de datos por ruta en este proceso, ordenadas por tiempo total"""
+    return estadisticas_sql()
+
+@router.get('/perfiles', status_code=200)
+def perfiles(user_token: UsuarioToken = Depends(get_usuario_token)):
+    """Perfiles guardados con X-Perfilar: 1, del más reciente al más antiguo"""
+    try:
+        if user_token.id_rol != 1:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permisos para consultar los perfiles")
+        return listar_perfiles()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get('/perfiles/{id_perfil}', status_code=200, response_class=PlainTextResponse)
+def descargar_perfil(id_perfil: str, user_token: UsuarioToken = Depends(get_usuario_token)):
+    """
+    Pilas colapsadas del perfil ('marco;marco;... muestras' por línea), listas para
+    flamegraph.pl, inferno-flamegraph o speedscope.app
+    """
+    try:
+        if user_token.id_rol != 1:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permisos para descargar perfiles")
+        contenido = leer_perfil(id_perfil)
+        if contenido is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+        return PlainTextResponse(
+            contenido, headers={"Content-Disposition": f'attachment; filename="perfil_{id_perfil}.folded"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get('/limitador', status_code=200)
+def metricas_limitador(user_token: UsuarioToken = Depends(permiso_metricas)):
+    """Intentos permitidos y rechazados (429) por los limitadores de login y registro de este proceso"""
+    return estadisticas_limitadores()
+
+@router.get('/analitica', status_code=200)
+def metricas_analitica(user_token: UsuarioToken = Depends(permiso_metricas)):
+    """Filas, memoria, origen (mysql o parquet) y versiones de la instantánea analítica de este proceso"""
+    return instantanea_analitica.estadisticas()
@@ -1,18 +1,19 @@
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.schemas.municipio import MunicipioBase
-from app.router.dependencies import get_current_user
-from app.schemas.usuarios import RetornoUsuario
+from app.router.dependencies import get_usuario_token, usuario_administrador
+from app.schemas.auth import UsuarioToken
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from core.database import get_db
+from core.etag import etag_tablas
 from app.crud import municipio as crud_municipio
 
 router = APIRouter()
 
 @router.post("/registrar", status_code=status.HTTP_201_CREATED)
 def create_municipio(municipio: MunicipioBase, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -29,7 +30,7 @@ def create_municipio(municipio: MunicipioBase, db: Session = Depends(get_db),
   
 @router.get("/obtener-por-nombre", status_code=status.HTTP_200_OK, response_model=List[MunicipioBase])
 async def get_by_name(nom_municipio:str, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -44,12 +45,10 @@ async def get_by_name(nom_municipio:str, db: Session = Depends(get_db),
 
 @router.get("/obtener-todos", status_code=status.HTTP_200_OK)
 def get_all( db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(usuario_administrador("No tienes permisos para buscar municipios", status.HTTP_401_UNAUTHORIZED)),
+    _etag: Optional[str] = Depends(etag_tablas("municipio"))
 ):
     try:
-        if user_token.id_rol != 1:
-            raise HTTPException(status_code=401, detail="No tienes permisos para buscar municipios")
-        
         municipio = crud_municipio.get_municipios(db)
         if municipio is None:
             raise HTTPException(status_code=404, detail="Municipio no encontrado")
@@ -59,7 +58,7 @@ def get_all( db: Session = Depends(get_db),
     
 @router.get("/obtener-por-id/{id_municipio}", status_code=status.HTTP_200_OK, response_model=MunicipioBase)
 def get_by_id(id_municipio:int, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -75,7 +74,7 @@ def get_by_id(id_municipio:int, db: Session = Depends(get_db),
     
 @router.put("/editar/{id_municipio}")
 def update_municipio(id_municipio: int, municipio: MunicipioBase, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -90,7 +89,7 @@ def update_municipio(id_municipio: int, municipio: MunicipioBase, db: Session =
     
 @router.delete("/eliminar-por-id/{id_municipio}")
 def delete_municipio(id_municipio: int, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -0,0 +1,107 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from app.schemas.auth import UsuarioToken
+from app.schemas.reportes import (
+    ReporteTopInstitucion, ReporteCargaSupervisor, ReporteConveniosMunicipio,
+    ReporteResumenHomologaciones, ReporteConveniosActivos
+)
+from app.router.dependencies import get_usuario_token, usuario_administrador
+from core.database import get_db
+from core.config import settings
+from core.etag import etag_tablas
+from app.crud import reportes as crud_reportes
+from typing import List, Optional
+
+router = APIRouter()
+
+# Las instantáneas cambian solo con los refrescos y las reconstrucciones, que incrementan "rpt"
+etag_reportes = etag_tablas("rpt")
+# Se declara antes de etag_reportes: el permiso se verifica antes de poder responder 304
+permiso_reportes = usuario_administrador("No tienes permisos para consultar reportes")
+
+
+def _leer_reporte(db: Session, nombre: str, limite: int, desplazamiento: int):
+    try:
+        return crud_reportes.obtener_reporte(db, nombre, limite, desplazamiento)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/top-instituciones", status_code=status.HTTP_200_OK, response_model=List[ReporteTopInstitucion])
+def top_instituciones(
+    limite: int = Query(100, ge=1, le=settings.REPORTES_MAX_LIMITE, description="Cantidad de filas por página"),
+    desplazamiento: int = Query(0, ge=0, description="Cantidad de filas a omitir"),
+    db: Session = Depends(get_db),
+    usuario_actual: UsuarioToken = Depends(permiso_reportes),
+    _etag: Optional[str] = Depends(etag_reportes)
+):
+    """Instituciones por cantidad y monto de convenios (v_top_instituciones)"""
+    return _leer_reporte(db, "top_instituciones", limite, desplazamiento)
+
+
+@router.get("/carga-supervisores", status_code=status.HTTP_200_OK, response_model=List[ReporteCargaSupervisor])
+def carga_supervisores(
+    limite: int = Query(100, ge=1, le=settings.REPORTES_MAX_LIMITE, description="Cantidad de filas por página"),
+    desplazamiento: int = Query(0, ge=0, description="Cantidad de filas a omitir"),
+    db: Session = Depends(get_db),
+    usuario_actual: UsuarioToken = Depends(permiso_reportes),
+    _etag: Optional[str] = Depends(etag_reportes)
+):
+    """Convenios y montos supervisados por supervisor (v_carga_supervisores)"""
+    return _leer_reporte(db, "carga_supervisores", limite, desplazamiento)
+
+
+@router.get("/convenios-por-municipio", status_code=status.HTTP_200_OK, response_model=List[ReporteConveniosMunicipio])
+def convenios_por_municipio(
+    limite: int = Query(100, ge=1, le=settings.REPORTES_MAX_LIMITE, description="Cantidad de filas por página"),
+    desplazamiento: int = Query(0, ge=0, description="Cantidad de filas a omitir"),
+    db: Session = Depends(get_db),
+    usuario_actual: UsuarioToken = Depends(permiso_reportes),
+    _etag: Optional[str] = Depends(etag_reportes)
+):
+    """Instituciones, convenios y montos por municipio (v_convenios_por_municipio)"""
+    return _leer_reporte(db, "convenios_por_municipio", limite, desplazamiento)
+
+
+@router.get("/resumen-homologaciones", status_code=status.HTTP_200_OK, response_model=List[ReporteResumenHomologaciones])
+def resumen_homologaciones(
+    limite: int = Query(100, ge=1, le=settings.REPORTES_MAX_LIMITE, description="Cantidad de filas por página"),
+    desplazamiento: int = Query(0, ge=0, description="Cantidad de filas a omitir"),
+    db: Session = Depends(get_db),
+    usuario_actual: UsuarioToken = Depends(permiso_reportes),
+    _etag: Optional[str] = Depends(etag_reportes)
+):
+    """Homologaciones y créditos por institución (v_resumen_homologaciones)"""
+    return _leer_reporte(db, "resumen_homologaciones", limite, desplazamiento)
+
+
+@router.get("/convenios-activos", status_code=status.HTTP_200_OK, response_model=List[ReporteConveniosActivos])
+def convenios_activos(
+    limite: int = Query(100, ge=1, le=settings.REPORTES_MAX_LIMITE, description="Cantidad de filas por página"),
+    desplazamiento: int = Query(0, ge=0, description="Cantidad de filas a omitir"),
+    db: Session = Depends(get_db),
+    usuario_actual: UsuarioToken = Depends(permiso_reportes),
+    _etag: Optional[str] = Depends(etag_reportes)
+):
+    """Convenios activos por tipo de convenio SENA (v_estadisticas_convenios_activos)"""
+    return _leer_reporte(db, "convenios_activos", limite, desplazamiento)
+
+
+@router.post("/reconstruir", status_code=status.HTTP_200_OK)
+def reconstruir(
+    db: Session = Depends(get_db),
+    usuario_actual: UsuarioToken = Depends(get_usuario_token)
+):
+    """Recalcula todas las instantáneas (lo mismo que hace cada noche el evento ev_rpt_reconstruir)"""
+    try:
+        if usuario_actual.id_rol != 1:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permisos para reconstruir reportes")
+
+        procesadas = crud_reportes.reconstruir_reportes(db)
+        return {"message": "Reportes reconstruidos correctamente", "claves_recalculadas": procesadas}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -2,15 +2,24 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from app.router.dependencies import get_current_user
+from app.router.dependencies import get_usuario_token
+from app.schemas.auth import UsuarioToken
 from app.schemas.usuarios import CrearUsuario, EditarPass, EditarUsuario, RetornoUsuario
 from core.database import get_db
+from core.config import settings
+from core.limitador import limitar_por_ip
 from app.crud import usuarios as crud_users
 
 
 router = APIRouter()
 
-@router.post("/registro-publico", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/registro-publico",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limitar_por_ip(
+        "registro_ip", settings.LIMITE_REGISTRO_IP_CAPACIDAD, settings.LIMITE_REGISTRO_IP_POR_MINUTO
+    ))]
+)
 def registro_publico(user: CrearUsuario, db: Session = Depends(get_db)):
     """Endpoint PÚBLICO para que nuevos usuarios se registren SIN autenticación"""
     try:
@@ -26,7 +35,7 @@ def registro_publico(user: CrearUsuario, db: Session = Depends(get_db)):
 def create_user(
     user: CrearUsuario, 
     db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -45,7 +54,7 @@ def create_user(
 @router.get("/obtener-por-id/{id_usuario}", status_code=status.HTTP_200_OK, response_model=RetornoUsuario)
 def get_by_id(id_usuario:int, db: 
               Session = Depends(get_db),
-              user_token: RetornoUsuario = Depends(get_current_user),
+              user_token: UsuarioToken = Depends(get_usuario_token),
               ):
     
     try:
@@ -63,7 +72,7 @@ def get_by_id(id_usuario:int, db:
 @router.get("/obtener-por-correo/{correo}", status_code=status.HTTP_200_OK, response_model=RetornoUsuario)
 def get_by_email(correo:str, db: 
                  Session = Depends(get_db),
-                 user_token: RetornoUsuario = Depends(get_current_user)
+                 user_token: UsuarioToken = Depends(get_usuario_token)
                 ):
     try:
         if user_token.id_rol != 1:
@@ -79,7 +88,7 @@ def get_by_email(correo:str, db:
 @router.get("/obtener-todos-secure", status_code=status.HTTP_200_OK, response_model=List[RetornoUsuario])
 def get_all_s(
     db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -94,7 +103,7 @@ def get_all_s(
 
 @router.put("/editar/{user_id}")
 def update_user(user_id: int, user: EditarUsuario, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -109,7 +118,7 @@ def update_user(user_id: int, user: EditarUsuario, db: Session = Depends(get_db)
 
 @router.put("/editar-contrasenia")
 def update_password(user: EditarPass, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -128,7 +137,7 @@ def update_password(user: EditarPass, db: Session = Depends(get_db),
     
 @router.delete("/eliminar-por-id/{id_usuario}", status_code=status.HTTP_200_OK)
 def delete_by_id(id_usuario:int, db: Session = Depends(get_db),
-    user_token: RetornoUsuario = Depends(get_current_user)
+    user_token: UsuarioToken = Depends(get_usuario_token)
 ):
     try:
         if user_token.id_rol != 1:
@@ -1,6 +1,21 @@
 from pydantic import BaseModel
+from typing import Optional
 from app.schemas.usuarios import RetornoUsuario
 
 class ResponseLoggin(BaseModel):
     user: RetornoUsuario
-    access_token: str
\ No newline at end of file
+    access_token: str
+    refresh_token: Optional[str] = None
+
+class SolicitudRefresh(BaseModel):
+    refresh_token: str
+
+class RespuestaRefresh(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+
+class UsuarioToken(BaseModel):
+    """Identidad del usuario obtenida de los claims del JWT (sin consultar la base de datos)"""
+    id_usuario: int
+    id_rol: int
\ No newline at end of file
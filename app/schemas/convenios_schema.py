@@ -1,4 +1,4 @@
-from typing import Optional, Union
+from typing import Optional, Union, List
 from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 
@@ -181,4 +181,16 @@ class RetornoConvenio(BaseModel):
                 "persona_apoyo_fpi": "María López",
                 "enlace_evidencias": "https://drive.google.com/convenio001"
             }
-        }
\ No newline at end of file
+        }
+
+class ResultadoBusquedaConvenios(BaseModel):
+    """Schema para retornar una página de la búsqueda combinada de convenios"""
+    total: int = Field(..., description="Total de convenios que cumplen los filtros")
+    limite: int
+    desplazamiento: int
+    convenios: List[RetornoConvenio]
+
+class LoteConvenios(BaseModel):
+    """Schema para retornar varios convenios consultados por id en una sola petición"""
+    convenios: List[RetornoConvenio]
+    no_encontrados: List[int] = Field(default_factory=list, description="Ids solicitados que no existen")
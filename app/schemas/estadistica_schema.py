@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -17,4 +17,40 @@ class EditarEstadisticaCategoria(BaseModel):
 
 class RetornoEstadisticaCategoria(EstadisticaCategoriaBase):
     id_estadistica: int
-    fecha_actualizacion: datetime
\ No newline at end of file
+    fecha_actualizacion: datetime
+
+class FilaDashboard(BaseModel):
+    nombre: str
+    cantidad: int
+    suma_total: Optional[float] = None
+
+class ResumenCategoria(BaseModel):
+    total_items: int
+    suma_cantidades: int
+    suma_montos: float
+    filas: List[FilaDashboard]
+
+class TotalesDashboard(BaseModel):
+    total_instituciones: int
+    total_convenios: int
+    total_homologaciones: int
+    monto_total_convenios: float
+
+class DashboardEstadisticas(BaseModel):
+    totales: TotalesDashboard
+    categorias: Dict[str, ResumenCategoria]
+
+class FilaPeriodo(BaseModel):
+    periodo: str = Field(description="Año (2024), trimestre (2024-T1) o mes (2024-01)")
+    anio: int
+    trimestre: Optional[int] = None
+    mes: Optional[int] = None
+    tipo_convenio_sena: Optional[str] = None
+    estado_convenio: Optional[str] = None
+    cantidad: int
+    suma_total: float
+
+class SeriePeriodos(BaseModel):
+    campo_fecha: str
+    granularidad: str
+    periodos: List[FilaPeriodo]
@@ -1,5 +1,5 @@
 
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel,Field
 from datetime import datetime
 
@@ -43,3 +43,7 @@ class EditarHomologacion(BaseModel):
 
 class RetornoHomologacion(HomologacionBase):
     id_homologacion: int
+
+class LoteHomologaciones(BaseModel):
+    homologaciones: List[RetornoHomologacion]
+    no_encontrados: List[int] = Field(default_factory=list)
@@ -0,0 +1,44 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class ReporteTopInstitucion(BaseModel):
+    nit_institucion: str
+    nombre_institucion: Optional[str] = None
+    cant_convenios: Optional[int] = None
+    nom_municipio: Optional[str] = None
+    monto_total_convenios: float
+    total_convenios_activos: int
+
+class ReporteCargaSupervisor(BaseModel):
+    supervisor: str
+    total_convenios: int
+    convenios_activos: int
+    convenios_finalizados: int
+    monto_total_supervisado: float
+    monto_promedio: float
+
+class ReporteConveniosMunicipio(BaseModel):
+    id_municipio: str
+    nom_municipio: Optional[str] = None
+    total_instituciones: int
+    total_convenios: int
+    monto_total: float
+
+class ReporteResumenHomologaciones(BaseModel):
+    nit_institucion: str
+    nombre_institucion: Optional[str] = None
+    total_homologaciones: int
+    total_creditos_homologados: Optional[int] = None
+    promedio_creditos: Optional[float] = None
+    modalidades_diferentes: int
+    niveles_diferentes: int
+
+class ReporteConveniosActivos(BaseModel):
+    tipo_convenio_sena: str
+    cantidad_activos: int
+    monto_total: Optional[float] = None
+    monto_promedio: Optional[float] = None
+    fecha_primer_convenio: Optional[str] = None
+    fecha_ultimo_convenio: Optional[str] = None
+    supervisores_distintos: int
@@ -0,0 +1,53 @@
+"""
+Benchmark de verificación de contraseñas (argon2), la operación dominante del login.
+
+Mide verificaciones por segundo en el mismo proceso y a través del pool de procesos de
+core.security con los parámetros ARGON2_* configurados, y reporta el rendimiento por núcleo.
+
+Uso:
+    python -m benchmarks.login_argon2 [verificaciones] [hilos_concurrentes]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from core import security
+from core.config import settings
+
+
+def medir(verificaciones: int, hilos: int, funcion, hash_guardado: str) -> float:
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        resultados = list(ejecutor.map(lambda _: funcion("contraseña-segura", hash_guardado), range(verificaciones)))
+    duracion = time.perf_counter() - inicio
+    assert all(resultados)
+    return verificaciones / duracion
+
+
+def main():
+    verificaciones = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    nucleos = os.cpu_count() or 1
+
+    hash_guardado = security.pwd_context.hash("contraseña-segura")
+    print(
+        f"argon2: t={settings.ARGON2_TIME_COST} m={settings.ARGON2_MEMORY_COST}KiB "
+        f"p={settings.ARGON2_PARALLELISM} | núcleos: {nucleos} | procesos de hash: {settings.HASH_PROCESOS}"
+    )
+
+    # En el mismo proceso (lo que hacía el login antes): un solo hilo a la vez por el event loop
+    en_proceso = medir(verificaciones, 1, security._verificar, hash_guardado)
+    print(f"  mismo proceso, 1 a la vez:  {en_proceso:7.1f} logins/s")
+
+    # Calentar el pool (arranque de los procesos "spawn") antes de medir
+    security.verify_password("contraseña-segura", hash_guardado)
+    en_pool = medir(verificaciones, hilos, security.verify_password, hash_guardado)
+    procesos = max(1, min(settings.HASH_PROCESOS, nucleos))
+    print(f"  pool de procesos, {hilos} hilos: {en_pool:7.1f} logins/s ({en_pool / procesos:.1f} por núcleo usado)")
+
+
+if __name__ == "__main__":
+    main()
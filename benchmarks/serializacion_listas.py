@@ -0,0 +1,100 @@
+"""
+Benchmark de serialización de listas grandes: ruta por defecto de FastAPI
+(response_model + jsonable_encoder) contra la ruta rápida con orjson (?rapido=true).
+
+Usa una base SQLite en memoria con 10.000 convenios para incluir también la lectura
+de las filas con .mappings().all(), como en las consultas reales.
+
+Uso:
+    python -m benchmarks.serializacion_listas [filas] [repeticiones]
+"""
+import os
+import sys
+import time
+from statistics import median
+from typing import List
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.crud.convenios_crud import CAMPOS_CONVENIO
+from app.schemas.convenios_schema import RetornoConvenio
+from core.respuestas import respuesta_rapida
+
+
+def crear_base(filas: int):
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    with engine.begin() as conexion:
+        conexion.execute(text(f"CREATE TABLE convenios ({', '.join(CAMPOS_CONVENIO)})"))
+        registros = []
+        for i in range(filas):
+            registro = {campo: f"{campo} {i}" for campo in CAMPOS_CONVENIO}
+            registro["id_convenio"] = i + 1
+            registro["precio_estimado"] = 50000000.0 + i
+            registro["objetivo_convenio"] = "Cooperación técnica y académica " * 10
+            registro["enlace_secop"] = "https://www.colombiacompra.gov.co/secop/" + "x" * 200
+            registros.append(registro)
+        columnas = ", ".join(CAMPOS_CONVENIO)
+        valores = ", ".join(f":{campo}" for campo in CAMPOS_CONVENIO)
+        conexion.execute(text(f"INSERT INTO convenios ({columnas}) VALUES ({valores})"), registros)
+    return engine
+
+
+def crear_app(engine) -> FastAPI:
+    app = FastAPI()
+    consulta = text(f"SELECT {', '.join(CAMPOS_CONVENIO)} FROM convenios ORDER BY id_convenio")
+
+    @app.get("/por-defecto", response_model=List[RetornoConvenio])
+    def por_defecto():
+        with engine.connect() as conexion:
+            return conexion.execute(consulta).mappings().all()
+
+    @app.get("/rapido", response_model=List[RetornoConvenio])
+    def rapido():
+        with engine.connect() as conexion:
+            return respuesta_rapida(conexion.execute(consulta).mappings().all())
+
+    return app
+
+
+def medir(cliente: TestClient, ruta: str, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        respuesta = cliente.get(ruta)
+        tiempos.append(time.perf_counter() - inicio)
+        assert respuesta.status_code == 200
+    return median(tiempos)
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    cliente = TestClient(crear_app(crear_base(filas)))
+
+    # La ruta rápida no valida cada fila: se comprueba aquí que su salida sigue
+    # cumpliendo el response_model y coincide con la de la ruta por defecto.
+    adaptador = TypeAdapter(List[RetornoConvenio])
+    esperado = cliente.get("/por-defecto").json()
+    obtenido = cliente.get("/rapido")
+    assert adaptador.validate_json(obtenido.content) == adaptador.validate_python(esperado)
+    assert obtenido.json() == esperado
+
+    por_defecto = medir(cliente, "/por-defecto", repeticiones)
+    rapido = medir(cliente, "/rapido", repeticiones)
+    print(f"Filas: {filas} | tamaño: {len(obtenido.content) / 1024:.0f} KiB | repeticiones: {repeticiones}")
+    print(f"  response_model + jsonable_encoder: {por_defecto * 1000:8.1f} ms")
+    print(f"  orjson directo (?rapido=true):     {rapido * 1000:8.1f} ms")
+    print(f"  aceleración: x{por_defecto / rapido:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import glob
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.config import settings
+from core.database import engine
+from core.versiones import registro_versiones
+
+try:
+    import pyarrow  # noqa: F401 (motor de Parquet de pandas; sin él la instantánea solo vive en memoria)
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+
+logger = logging.getLogger(__name__)
+
+# Un cambio de versión en cualquiera de estas tablas obliga a reconstruir la instantánea
+TABLAS_ANALITICA = ("convenios", "instituciones", "municipio")
+
+# Dimensiones categóricas -> columna de origen
+DIMENSIONES_SQL = {
+    "tipo_convenio_sena": "c.tipo_convenio_sena",
+    "estado_convenio": "c.estado_convenio",
+    "tipo_convenio": "c.tipo_convenio",
+    "tipo_proceso": "c.tipo_proceso",
+    "supervisor": "c.supervisor",
+    "persona_apoyo_fpi": "c.persona_apoyo_fpi",
+    "nit_institucion": "c.nit_institucion",
+    "nombre_institucion": "i.nombre_institucion",
+    "nom_municipio": "m.nom_municipio",
+}
+# Dimensiones numéricas derivadas de las fechas (VARCHAR): solo valores que empiezan por YYYY-MM
+FECHAS = ("firma", "inicio")
+DIMENSIONES_FECHA = tuple(f"{parte}_{fecha}" for fecha in FECHAS for parte in ("anio", "mes"))
+DIMENSIONES = tuple(DIMENSIONES_SQL) + DIMENSIONES_FECHA
+MEDIDAS = ("cantidad", "suma_total", "promedio")
+
+_PATRON_FECHA = r"^\d{4}-(?:0[1-9]|1[0-2])"
+
+
+def _valor_json(valor: Any) -> Any:
+    """Convierte escalares de NumPy/pandas a tipos de Python (NaN y NA -> None)"""
+    if valor is None or valor is pd.NA or (isinstance(valor, float) and np.isnan(valor)):
+        return None
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+        return None if isinstance(valor, float) and np.isnan(valor) else valor
+    return valor
+
+
+def _codificar(crudo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte las filas leídas en columnas compactas: cada dimensión como Categorical
+    (códigos enteros + diccionario de valores) y el monto como float64.
+    """
+    columnas: Dict[str, Any] = {dimension: pd.Categorical(crudo[dimension]) for dimension in DIMENSIONES_SQL}
+    for fecha in FECHAS:
+        valores = crudo[f"fecha_{fecha}"].astype("string")
+        validas = valores.str.match(_PATRON_FECHA).fillna(False).to_numpy(dtype=bool)
+        anio = pd.to_numeric(valores.str.slice(0, 4), errors="coerce").where(validas).astype("Int16")
+        mes = pd.to_numeric(valores.str.slice(5, 7), errors="coerce").where(validas).astype("Int8")
+        columnas[f"anio_{fecha}"] = pd.Categorical(anio)
+        columnas[f"mes_{fecha}"] = pd.Categorical(mes)
+    columnas["precio_estimado"] = crudo["precio_estimado"].astype("float64").to_numpy()
+    return pd.DataFrame(columnas)
+
+
+class InstantaneaAnalitica:
+    """
+    Copia columnar en memoria de convenios (con el nombre y el municipio de su institución)
+    para responder agrupaciones y tablas cruzadas con pandas/NumPy sin consultar MySQL.
+
+    - Se construye con una sola consulta la primera vez que se usa y se reconstruye cuando
+      cambia la versión (data_version) de convenios, instituciones o municipio.
+    - Si ANALITICA_PARQUET_DIR está configurado y pyarrow instalado, cada construcción se guarda
+      en un archivo Parquet con las versiones en el nombre. Los demás workers (o el mismo tras
+      reiniciar) lo leen con memory_map en lugar de repetir la consulta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos: Optional[pd.DataFrame] = None
+        self._version: Optional[Tuple[int, ...]] = None
+        self._origen: Optional[str] = None
+        self._construida_en: Optional[float] = None
+        self._segundos_construccion: Optional[float] = None
+        self.construcciones = 0
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    def _leer_mysql(self) -> pd.DataFrame:
+        columnas = [f"{origen} AS {dimension}" for dimension, origen in DIMENSIONES_SQL.items()]
+        query = text(f"""
+            SELECT {', '.join(columnas)}, c.fecha_firma, c.fecha_inicio, c.precio_estimado
+            FROM convenios c
+            LEFT JOIN instituciones i ON c.nit_institucion = i.nit_institucion
+            LEFT JOIN municipio m ON i.id_municipio = m.id_municipio
+        """)
+        with engine.connect() as conexion:
+            resultado = conexion.execute(query)
+            crudo = pd.DataFrame.from_records(resultado.fetchall(), columns=list(resultado.keys()))
+        return _codificar(crudo)
+
+    def _ruta_parquet(self, version: Tuple[int, ...]) -> Optional[str]:
+        if not settings.ANALITICA_PARQUET_DIR or not PARQUET_DISPONIBLE:
+            return None
+        firma = "_".join(str(numero) for numero in version)
+        return os.path.join(settings.ANALITICA_PARQUET_DIR, f"convenios_{firma}.parquet")
+
+    def _leer_parquet(self, ruta: Optional[str]) -> Optional[pd.DataFrame]:
+        if ruta is None or not os.path.exists(ruta):
+            return None
+        try:
+            return pd.read_parquet(ruta, engine="pyarrow", memory_map=True)
+        except Exception as e:
+            logger.warning(f"No se pudo leer la instantánea analítica {ruta}: {e}")
+            return None
+
+    def _guardar_parquet(self, datos: pd.DataFrame, ruta: Optional[str]) -> None:
+        if ruta is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            datos.to_parquet(temporal, engine="pyarrow", index=False)
+            # Reemplazo atómico: otro worker nunca lee un archivo a medio escribir
+            os.replace(temporal, ruta)
+            for anterior in glob.glob(os.path.join(settings.ANALITICA_PARQUET_DIR, "convenios_*.parquet")):
+                if anterior != ruta:
+                    os.remove(anterior)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la instantánea analítica {ruta}: {e}")
+
+    def _construir(self, version: Optional[Tuple[int, ...]]) -> None:
+        inicio = time.perf_counter()
+        ruta = self._ruta_parquet(version) if version is not None else None
+        datos = self._leer_parquet(ruta)
+        origen = "parquet"
+        if datos is None:
+            datos = self._leer_mysql()
+            origen = "mysql"
+            self._guardar_parquet(datos, ruta)
+
+        self._datos = datos
+        self._version = version
+        self._origen = origen
+        self._construida_en = time.time()
+        self._segundos_construccion = time.perf_counter() - inicio
+        self.construcciones += 1
+        logger.info(
+            f"Instantánea analítica construida desde {origen}: {len(datos)} convenios "
+            f"en {self._segundos_construccion:.3f} s"
+        )
+
+    def _vigente(self, version: Optional[Tuple[int, ...]]) -> bool:
+        # Sin versiones (base de datos caída) se sigue usando la última instantánea
+        return self._datos is not None and (version is None or version == self._version)
+
+    def datos(self) -> pd.DataFrame:
+        """Instantánea al día con las versiones actuales; un solo hilo la reconstruye"""
+        version = registro_versiones.versiones(TABLAS_ANALITICA)
+        if self._vigente(version):
+            return self._datos
+        with self._lock:
+            if not self._vigente(version):
+                try:
+                    self._construir(version)
+                except SQLAlchemyError as e:
+                    logger.error(f"Error al construir la instantánea analítica: {e}")
+                    if self._datos is None:
+                        raise Exception("Error de base de datos al construir la instantánea analítica")
+            return self._datos
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _validar_dimensiones(dimensiones: Iterable[str]) -> List[str]:
+        dimensiones = list(dict.fromkeys(dimensiones))
+        for dimension in dimensiones:
+            if dimension not in DIMENSIONES:
+                raise ValueError(f"Dimensión no válida: {dimension}. Opciones: {', '.join(DIMENSIONES)}")
+        if len(dimensiones) > settings.ANALITICA_MAX_DIMENSIONES:
+            raise ValueError(f"Se permiten como máximo {settings.ANALITICA_MAX_DIMENSIONES} dimensiones")
+        return dimensiones
+
+    @staticmethod
+    def _mascara(datos: pd.DataFrame, filtros: Dict[str, List[str]]) -> np.ndarray:
+        """Filas que cumplen todos los filtros, comparando códigos enteros y no textos"""
+        mascara = np.ones(len(datos), dtype=bool)
+        for dimension, valores in filtros.items():
+            if dimension not in DIMENSIONES:
+                raise ValueError(f"Dimensión de filtro no válida: {dimension}")
+            if dimension in DIMENSIONES_FECHA:
+                try:
+                    valores = [int(valor) for valor in valores]
+                except ValueError:
+                    raise ValueError(f"El filtro {dimension} debe ser numérico")
+            columna = datos[dimension].cat
+            codigos = columna.categories.get_indexer(valores)
+            mascara &= np.isin(columna.codes.to_numpy(), codigos[codigos >= 0])
+        return mascara
+
+    def _agregar(self, por: List[str], filtros: Dict[str, List[str]]) -> pd.DataFrame:
+        datos = self.datos()
+        seleccion = datos.loc[self._mascara(datos, filtros), por + ["precio_estimado"]]
+        if not por:
+            monto = seleccion["precio_estimado"]
+            return pd.DataFrame({"cantidad": [len(monto)], "suma_total": [monto.sum()], "promedio": [monto.mean()]})
+
+        agregado = (
+            seleccion.groupby(por, observed=True, dropna=False, sort=True)["precio_estimado"]
+            .agg(cantidad="size", suma_total="sum", promedio="mean")
+            .reset_index()
+        )
+        if len(agregado) > settings.ANALITICA_MAX_GRUPOS:
+            raise ValueError(
+                f"La consulta produce {len(agregado)} grupos (máximo {settings.ANALITICA_MAX_GRUPOS}); agregue filtros"
+            )
+        return agregado
+
+    def agrupar(self, por: Iterable[str], filtros: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        """Cantidad, suma y promedio de precio_estimado por cada combinación de las dimensiones"""
+        por = self._validar_dimensiones(por)
+        agregado = self._agregar(por, filtros)
+        return [
+            {columna: _valor_json(valor) for columna, valor in fila.items()}
+            for fila in agregado.to_dict("records")
+        ]
+
+    def pivotar(self, filas: Iterable[str], columna: str, medida: str,
+                filtros: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Tabla cruzada: una fila por combinación de `filas` y una columna por valor de `columna`"""
+        filas = self._validar_dimensiones(filas)
+        if columna in filas:
+            raise ValueError("La dimensión de columnas no puede repetirse en las filas")
+        self._validar_dimensiones(filas + [columna])
+        if medida not in MEDIDAS:
+            raise ValueError(f"Medida no válida: {medida}. Opciones: {', '.join(MEDIDAS)}")
+
+        agregado = self._agregar(filas + [columna], filtros)
+        tabla = agregado.set_index(filas + [columna])[medida].unstack(columna)
+        # Las celdas sin convenios suman 0; su promedio no existe
+        if medida != "promedio":
+            tabla = tabla.fillna(0)
+
+        datos = []
+        for clave, valores in zip(tabla.index, tabla.to_numpy()):
+            clave = clave if isinstance(clave, tuple) else (clave,)
+            datos.append({
+                "clave": {dimension: _valor_json(valor) for dimension, valor in zip(filas, clave)},
+                "valores": [_valor_json(valor) for valor in valores],
+            })
+        return {
+            "filas": filas,
+            "columna": columna,
+            "medida": medida,
+            "encabezados": [_valor_json(valor) for valor in tabla.columns],
+            "datos": datos,
+        }
+
+    def estadisticas(self) -> Dict[str, Any]:
+        datos = self._datos
+        return {
+            "construida": datos is not None,
+            "filas": len(datos) if datos is not None else 0,
+            "bytes": int(datos.memory_usage(deep=True).sum()) if datos is not None else 0,
+            "origen": self._origen,
+            "versiones": dict(zip(TABLAS_ANALITICA, self._version)) if self._version else None,
+            "construida_en": self._construida_en,
+            "segundos_construccion": self._segundos_construccion,
+            "construcciones": self.construcciones,
+            "parquet": bool(settings.ANALITICA_PARQUET_DIR) and PARQUET_DISPONIBLE,
+        }
+
+
+instantanea_analitica = InstantaneaAnalitica()
@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.config import settings
+from core.database import engine
+from core.versiones import registro_versiones
+
+logger = logging.getLogger(__name__)
+
+
+class RegistroUsuariosActivos:
+    """
+    Copia en memoria de los usuarios activos (id_usuario -> id_rol) para autorizar
+    con los claims del JWT sin consultar la base de datos en cada petición.
+
+    Funciona como lista de revocación: un token cuyo usuario fue desactivado o eliminado,
+    o cuyo rol cambió, deja de ser aceptado en cuanto la copia se refresca. Se refresca
+    cuando cambia la versión de la tabla usuario (data_version), como máximo cada
+    AUTORIZACION_REFRESCO segundos si no se puede leer la versión, y de inmediato en
+    este proceso cuando las funciones CRUD de usuarios llaman a invalidar().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._activos: Dict[int, int] = {}
+        # Ids consultados que no existen o están inactivos; se descartan con cada refresco
+        self._inactivos: Set[int] = set()
+        self._cargado_en: Optional[float] = None
+        self._version = None
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._cargado_en = None
+
+    def _edad(self) -> float:
+        if self._cargado_en is None:
+            return float("inf")
+        return time.monotonic() - self._cargado_en
+
+    def _desactualizado(self, version) -> bool:
+        return self._edad() >= settings.AUTORIZACION_REFRESCO or (version is not None and version != self._version)
+
+    def _refrescar(self, version) -> None:
+        with self._lock:
+            # Otro hilo pudo refrescar mientras se esperaba el lock
+            if not self._desactualizado(version):
+                return
+            try:
+                with engine.connect() as conexion:
+                    filas = conexion.execute(
+                        text("SELECT id_usuario, id_rol FROM usuario WHERE estado = 1")
+                    ).all()
+                self._activos = {fila.id_usuario: fila.id_rol for fila in filas}
+                self._inactivos = set()
+                self._cargado_en = time.monotonic()
+                self._version = version
+            except SQLAlchemyError as e:
+                if self._cargado_en is None and not self._activos:
+                    raise
+                # Se conserva la última copia conocida hasta que la base de datos responda
+                logger.error(f"No se pudo refrescar el registro de usuarios activos: {e}")
+
+    def _consultar(self, id_usuario: int) -> Optional[int]:
+        """
+        Consulta puntual (por llave primaria) para un id que no está en la copia, p. ej. un
+        usuario creado en otro worker después del último refresco. Solo llegan aquí ids de
+        tokens firmados por el sistema, así que no es una vía para forzar consultas.
+        Un usuario inexistente o inactivo también se recuerda hasta el próximo refresco, así
+        un token revocado no consulta la base de datos en cada petición.
+        """
+        with engine.connect() as conexion:
+            rol = conexion.execute(
+                text("SELECT id_rol FROM usuario WHERE id_usuario = :id_usuario AND estado = 1"),
+                {"id_usuario": id_usuario}
+            ).scalar()
+        with self._lock:
+            if rol is not None:
+                self._activos[id_usuario] = rol
+            else:
+                self._inactivos.add(id_usuario)
+        return rol
+
+    def rol_vigente(self, id_usuario: int) -> Optional[int]:
+        """Retorna el rol actual del usuario, o None si está inactivo o no existe"""
+        version = registro_versiones.versiones(("usuario",))
+        if self._desactualizado(version):
+            self._refrescar(version)
+        rol = self._activos.get(id_usuario)
+        if rol is None and id_usuario not in self._inactivos:
+            rol = self._consultar(id_usuario)
+        return rol
+
+
+registro_usuarios = RegistroUsuariosActivos()
@@ -0,0 +1,279 @@
+import logging
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.database import engine
+from core.versiones import registro_versiones
+
+logger = logging.getLogger(__name__)
+
+
+# Tabla -> (clave, columnas con copia *_norm en mi_db.sql)
+COLUMNAS_NORMALIZADAS = {
+    "municipio": ("id_municipio", ("nom_municipio",)),
+    "instituciones": ("nit_institucion", ("nombre_institucion", "nit_institucion", "direccion")),
+    "convenios": ("id_convenio", ("supervisor",)),
+}
+
+
+def normalizar_texto(texto: Optional[str]) -> str:
+    """
+    Normaliza un texto para búsquedas: minúsculas, sin tildes y sin espacios repetidos.
+    Las columnas *_norm de mi_db.sql guardan este mismo valor (ver con_normalizadas), por lo
+    que los patrones deben pasar por aquí antes de compararse con ellas.
+    """
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.lower().split())
+
+
+def con_normalizadas(tabla: str, datos: dict) -> dict:
+    """
+    Copia de `datos` con la columna *_norm de cada columna normalizada que incluya.
+    Toda escritura de esas columnas debe pasar por aquí: MySQL no puede replicar normalizar_texto.
+    """
+    datos = dict(datos)
+    for columna in COLUMNAS_NORMALIZADAS[tabla][1]:
+        if columna in datos:
+            valor = datos[columna]
+            datos[f"{columna}_norm"] = None if valor is None else normalizar_texto(valor)
+    return datos
+
+
+def completar_normalizadas(lote: int = 1000) -> int:
+    """
+    Llena las columnas *_norm en NULL: filas de los datos iniciales, de la migración o escritas
+    por fuera de la aplicación. Retorna cuántas filas actualizó.
+    """
+    actualizadas = 0
+    try:
+        with engine.connect() as conexion:
+            for tabla, (clave, columnas) in COLUMNAS_NORMALIZADAS.items():
+                for columna in columnas:
+                    while True:
+                        filas = conexion.execute(text(f"""
+                            SELECT {clave}, {columna} FROM {tabla}
+                            WHERE {columna} IS NOT NULL AND {columna}_norm IS NULL
+                            LIMIT :lote
+                        """), {"lote": lote}).mappings().all()
+                        if not filas:
+                            break
+                        conexion.execute(
+                            text(f"UPDATE {tabla} SET {columna}_norm = :norm WHERE {clave} = :clave"),
+                            [{"clave": fila[clave], "norm": normalizar_texto(fila[columna])} for fila in filas]
+                        )
+                        conexion.commit()
+                        actualizadas += len(filas)
+    except SQLAlchemyError as e:
+        logger.error(f"Error al completar las columnas normalizadas: {e}")
+    if actualizadas:
+        logger.info(f"Columnas normalizadas completadas en {actualizadas} filas")
+    return actualizadas
+
+
+def trigramas(texto: str) -> Set[str]:
+    """Retorna el conjunto de trigramas de un texto ya normalizado"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido de trigramas en memoria para búsquedas por subcadena
+    (equivalente a LIKE '%x%') sobre columnas cortas de una tabla.
+
+    - Se construye la primera vez que se consulta, leyendo solo la clave y las columnas indexadas.
+    - Las funciones CRUD lo mantienen sincronizado con actualizar() / eliminar().
+    - Guarda la versión de la tabla en data_version con la que se construyó: cuando cambia por
+      una escritura de otro worker (o tras invalidar()) queda desactualizado. Cada escritura
+      confirmada de este proceso (una fila) ya se aplicó al índice y suma uno a la versión
+      esperada: solo si la tabla está en esa versión se evita reconstruir; cualquier escritura
+      ajena la deja por encima. INDICE_TRIGRAMAS_TTL es el límite de edad en cualquier caso.
+    - Desactualizado, buscar() retorna None y se usa el SQL original mientras un hilo en
+      segundo plano lo reconstruye: ninguna petición espera la lectura de la tabla.
+    """
+
+    def __init__(self, tabla: str, columna_clave: str, columnas: Iterable[str]):
+        self.tabla = tabla
+        self.columna_clave = columna_clave
+        self.columnas = tuple(columnas)
+        self._lock = threading.Lock()
+        self._reconstruyendo = False
+        self._construido_en: Optional[float] = None
+        self._version: Optional[int] = None
+        # columna -> trigrama -> claves
+        self._postings: Dict[str, Dict[str, Set]] = {c: {} for c in self.columnas}
+        # clave -> columna -> valor normalizado
+        self._valores: Dict[object, Dict[str, str]] = {}
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+    def _version_tabla(self) -> Optional[int]:
+        versiones = registro_versiones.versiones((self.tabla,))
+        return None if versiones is None else versiones[0]
+
+    def vigente(self) -> bool:
+        if self._construido_en is None:
+            return False
+        if (time.monotonic() - self._construido_en) >= settings.INDICE_TRIGRAMAS_TTL:
+            return False
+        version = self._version_tabla()
+        # Sin data_version legible solo queda el límite de edad
+        if version is None:
+            return True
+        # Una versión menor a la esperada es la copia de registro_versiones anterior a las
+        # escrituras locales: las que ve ya están en el índice
+        esperada = self._version
+        return esperada is not None and version <= esperada
+
+    def invalidar(self) -> None:
+        """Marca el índice como desactualizado (p. ej. después de una carga masiva)"""
+        with self._lock:
+            self._construido_en = None
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    def reconstruir_en_segundo_plano(self) -> None:
+        """Inicia la reconstrucción en otro hilo, salvo que ya haya una en curso"""
+        with self._lock:
+            if self._reconstruyendo:
+                return
+            self._reconstruyendo = True
+        threading.Thread(target=self._construir, name=f"trigramas_{self.tabla}", daemon=True).start()
+
+    def _construir(self) -> None:
+        try:
+            # La versión se toma antes de leer: una escritura durante la lectura deja el índice
+            # con una versión anterior y se vuelve a construir
+            version = self._version_tabla()
+            query = text(f"SELECT {self.columna_clave}, {', '.join(self.columnas)} FROM {self.tabla}")
+            with engine.connect() as conexion:
+                filas = conexion.execute(query).mappings().all()
+
+            postings: Dict[str, Dict[str, Set]] = {c: {} for c in self.columnas}
+            valores: Dict[object, Dict[str, str]] = {}
+            for fila in filas:
+                clave = fila[self.columna_clave]
+                valores[clave] = {}
+                for columna in self.columnas:
+                    valor = normalizar_texto(fila[columna])
+                    valores[clave][columna] = valor
+                    for trigrama in trigramas(valor):
+                        postings[columna].setdefault(trigrama, set()).add(clave)
+
+            with self._lock:
+                self._postings = postings
+                self._valores = valores
+                self._construido_en = time.monotonic()
+                self._version = version
+            logger.info(f"Índice de trigramas '{self.tabla}' construido con {len(valores)} registros")
+        except SQLAlchemyError as e:
+            logger.error(f"Error al construir índice de trigramas '{self.tabla}': {e}")
+        finally:
+            with self._lock:
+                self._reconstruyendo = False
+
+    # ------------------------------------------------------------------
+    # Mantenimiento en escrituras
+    # ------------------------------------------------------------------
+    def _quitar(self, clave) -> None:
+        anteriores = self._valores.pop(clave, None)
+        if not anteriores:
+            return
+        for columna, valor in anteriores.items():
+            postings = self._postings[columna]
+            for trigrama in trigramas(valor):
+                claves = postings.get(trigrama)
+                if claves is not None:
+                    claves.discard(clave)
+                    if not claves:
+                        del postings[trigrama]
+
+    def _contar_escritura(self) -> None:
+        # El trigger de data_version suma uno por cada fila escrita en la tabla
+        if self._version is not None:
+            self._version += 1
+
+    def actualizar(self, clave, fila: dict) -> None:
+        """Inserta o reemplaza las columnas indexadas de un registro ya confirmado en la base de datos"""
+        with self._lock:
+            if self._construido_en is None:
+                return
+            self._contar_escritura()
+            self._quitar(clave)
+            self._valores[clave] = {}
+            for columna in self.columnas:
+                valor = normalizar_texto(fila.get(columna))
+                self._valores[clave][columna] = valor
+                for trigrama in trigramas(valor):
+                    self._postings[columna].setdefault(trigrama, set()).add(clave)
+
+    def eliminar(self, clave) -> None:
+        with self._lock:
+            self._contar_escritura()
+            self._quitar(clave)
+
+    def recargar(self, db: Session, claves: List) -> None:
+        """Relee de la base de datos las columnas indexadas de las claves indicadas"""
+        if not claves or self._construido_en is None:
+            return
+        try:
+            query = text(f"""
+                SELECT {self.columna_clave}, {', '.join(self.columnas)}
+                FROM {self.tabla}
+                WHERE {self.columna_clave} IN :claves
+            """).bindparams(bindparam("claves", expanding=True))
+            filas = db.execute(query, {"claves": list(claves)}).mappings().all()
+            encontradas = set()
+            for fila in filas:
+                encontradas.add(fila[self.columna_clave])
+                self.actualizar(fila[self.columna_clave], fila)
+            for clave in claves:
+                if clave not in encontradas:
+                    self.eliminar(clave)
+        except SQLAlchemyError as e:
+            logger.error(f"Error al recargar índice de trigramas '{self.tabla}': {e}")
+            self.invalidar()
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def buscar(self, columna: str, subcadena: str) -> Optional[List]:
+        """
+        Retorna las claves cuyo valor en `columna` contiene `subcadena`.
+        Retorna None si la consulta no puede resolverse con el índice (subcadena de menos
+        de 3 caracteres o índice desactualizado); el llamador debe usar su consulta SQL.
+        """
+        patron = normalizar_texto(subcadena)
+        if len(patron) < 3:
+            return None
+        if not self.vigente():
+            self.reconstruir_en_segundo_plano()
+            return None
+
+        with self._lock:
+            postings = self._postings[columna]
+            listas = []
+            for trigrama in trigramas(patron):
+                claves = postings.get(trigrama)
+                if not claves:
+                    return []
+                listas.append(claves)
+            listas.sort(key=len)
+            candidatas = set(listas[0])
+            for claves in listas[1:]:
+                candidatas &= claves
+                if not candidatas:
+                    return []
+            # Verificar la subcadena completa para descartar falsos positivos
+            return [c for c in candidatas if patron in self._valores[c][columna]]
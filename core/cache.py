@@ -0,0 +1,178 @@
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from core.config import settings
+from core.metricas import registrar_colector
+from core.versiones import registro_versiones
+
+logger = logging.getLogger(__name__)
+
+_AUSENTE = object()
+
+
+def _clave(valor: Any) -> Hashable:
+    """Convierte los argumentos en una clave hashable (listas -> tuplas, dicts -> tuplas ordenadas)"""
+    if isinstance(valor, (list, tuple)):
+        return tuple(_clave(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _clave(v)) for k, v in valor.items()))
+    return valor
+
+
+class CacheLectura:
+    """
+    Caché en memoria acotada para resultados de consultas de lectura.
+
+    - Cada entrada guarda las versiones (data_version) de las tablas de las que salió y
+      deja de servirse cuando cambian, aunque la escritura la haya hecho otro worker.
+    - Cada entrada expira pasados `ttl` segundos (respaldo si no se pueden leer las versiones).
+    - Al superar `max_entradas` se descarta la entrada usada hace más tiempo (LRU).
+    - Las funciones CRUD de escritura la vacían con invalidar().
+    """
+
+    def __init__(self, nombre: str, ttl: int, max_entradas: int):
+        self.nombre = nombre
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expiradas = 0
+        self.desactualizadas = 0
+        self.descartadas = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave: Hashable, version: Any = None) -> Any:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return _AUSENTE
+            vence, version_guardada, valor = entrada
+            if version_guardada != version:
+                del self._entradas[clave]
+                self.desactualizadas += 1
+                self.fallos += 1
+                return _AUSENTE
+            if time.monotonic() >= vence:
+                del self._entradas[clave]
+                self.expiradas += 1
+                self.fallos += 1
+                return _AUSENTE
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave: Hashable, valor: Any, version: Any = None) -> None:
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl, version, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.descartadas += 1
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+                "expiradas": self.expiradas,
+                "desactualizadas": self.desactualizadas,
+                "descartadas": self.descartadas,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+# Registro de cachés por nombre: las escrituras invalidan por nombre sin importar el módulo lector
+_caches: Dict[str, CacheLectura] = {}
+
+
+def obtener_cache(nombre: str, ttl: Optional[int] = None) -> CacheLectura:
+    cache = _caches.get(nombre)
+    if cache is None:
+        cache = _caches[nombre] = CacheLectura(
+            nombre,
+            ttl if ttl is not None else settings.CACHE_LECTURA_TTL,
+            settings.CACHE_LECTURA_MAX_ENTRADAS,
+        )
+    return cache
+
+
+def cache_lectura(nombre: str, tablas: Tuple[str, ...] = (), ttl: Optional[int] = None) -> Callable:
+    """
+    Decorador para funciones CRUD de lectura con la firma f(db, *args, **kwargs).
+    La sesión no forma parte de la clave; el resto de argumentos sí. `tablas` son las
+    tablas que lee la consulta: sus versiones deciden si una entrada sigue vigente.
+    Con CACHE_LECTURA_ACTIVA=False la función se ejecuta siempre (útil para depurar).
+    """
+    cache = obtener_cache(nombre, ttl)
+
+    def decorador(funcion: Callable) -> Callable:
+        @functools.wraps(funcion)
+        def envoltura(db, *args, **kwargs):
+            if not settings.CACHE_LECTURA_ACTIVA:
+                return funcion(db, *args, **kwargs)
+            clave = (funcion.__name__, _clave(args), _clave(kwargs))
+            version = registro_versiones.versiones(tablas) if tablas else None
+            valor = cache.obtener(clave, version)
+            if valor is _AUSENTE:
+                valor = funcion(db, *args, **kwargs)
+                cache.guardar(clave, valor, version)
+            return valor
+
+        envoltura.cache = cache
+        return envoltura
+
+    return decorador
+
+
+def invalidar_cache(*nombres: str) -> None:
+    """Vacía las cachés indicadas; se llama después del commit de cada escritura"""
+    # La escritura ya cambió data_version: el próximo acceso relee las versiones
+    registro_versiones.invalidar()
+    for nombre in nombres:
+        cache = _caches.get(nombre)
+        if cache is not None:
+            cache.invalidar()
+            logger.debug(f"Caché de lectura '{nombre}' invalidada")
+
+
+def estadisticas_cache() -> Dict[str, Any]:
+    return {
+        "activa": settings.CACHE_LECTURA_ACTIVA,
+        "ttl": settings.CACHE_LECTURA_TTL,
+        "max_entradas": settings.CACHE_LECTURA_MAX_ENTRADAS,
+        "caches": {nombre: cache.estadisticas() for nombre, cache in sorted(_caches.items())},
+    }
+
+
+def _metricas_cache():
+    """Aciertos, fallos y tasa de aciertos por caché para /meta/metrics"""
+    caches = sorted(_caches.items())
+    estadisticas = [(nombre, cache.estadisticas()) for nombre, cache in caches]
+    return [
+        {"nombre": "cache_aciertos_total", "tipo": "counter", "ayuda": "Lecturas servidas desde la caché",
+         "muestras": [{"etiquetas": {"cache": nombre}, "valor": datos["aciertos"]} for nombre, datos in estadisticas]},
+        {"nombre": "cache_fallos_total", "tipo": "counter", "ayuda": "Lecturas que consultaron la base de datos",
+         "muestras": [{"etiquetas": {"cache": nombre}, "valor": datos["fallos"]} for nombre, datos in estadisticas]},
+        {"nombre": "cache_tasa_aciertos", "tipo": "gauge", "ayuda": "Aciertos / lecturas desde el inicio del proceso",
+         "muestras": [{"etiquetas": {"cache": nombre}, "valor": datos["tasa_aciertos"]}
+                      for nombre, datos in estadisticas if datos["tasa_aciertos"] is not None]},
+        {"nombre": "cache_entradas", "tipo": "gauge", "ayuda": "Entradas guardadas en la caché",
+         "muestras": [{"etiquetas": {"cache": nombre}, "valor": datos["entradas"]} for nombre, datos in estadisticas]},
+    ]
+
+registrar_colector(_metricas_cache)
@@ -1,10 +1,18 @@
 from pydantic_settings import BaseSettings
+import multiprocessing
+import tempfile
 import os # Libreria que viene por defecto en python que permite leer el sistema operativo donde nos encontremos
 from dotenv import load_dotenv
 
 # librería en Python que permite cargar variables de entorno
 load_dotenv()
 
+
+def _varios_workers() -> bool:
+    # uvicorn --workers arranca cada worker con multiprocessing; WEB_CONCURRENCY lo usan uvicorn y gunicorn
+    return int(os.getenv("WEB_CONCURRENCY", "1")) > 1 or multiprocessing.parent_process() is not None
+
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = os.getenv("PROJECT_NAME", "No Sabemos")
     PROJECT_VERSION: str = "0.0.1"
@@ -19,10 +27,117 @@ class Settings(BaseSettings):
 
     DATABASE_URL: str = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     
+    # Imprimir todas las sentencias SQL (solo para depurar: es costoso y llena los logs)
+    SQL_ECHO: bool = os.getenv("SQL_ECHO", "false").lower() == "true"
+    # Instrumentación de consultas: conteo y tiempo por petición y ruta, consultas lentas (ms) en JSON
+    # y alerta cuando una misma sentencia se repite muchas veces en una petición (posible N+1)
+    SQL_INSTRUMENTACION: bool = os.getenv("SQL_INSTRUMENTACION", "true").lower() == "true"
+    SQL_LENTA_MS: float = float(os.getenv("SQL_LENTA_MS", "200"))
+    SQL_LENTA_PARAMETROS: bool = os.getenv("SQL_LENTA_PARAMETROS", "false").lower() == "true"
+    SQL_LENTA_MAX_CARACTERES: int = int(os.getenv("SQL_LENTA_MAX_CARACTERES", "2000"))
+    SQL_REPETIDAS_ALERTA: int = int(os.getenv("SQL_REPETIDAS_ALERTA", "20"))
+    
     # Configuración JWT
     jwt_secret: str = os.getenv("JWT_SECRET")
     jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
     jwt_access_token_expire_minutes: int = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Vigencia de los refresh tokens: el login (argon2) se paga una vez por sesión y no cada vez que vence el access token
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+    # Costo de argon2 para las contraseñas (al cambiarlo, los hashes se actualizan en el siguiente login)
+    ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", "3"))
+    ARGON2_MEMORY_COST: int = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+    ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", "4"))
+    # Procesos dedicados a calcular y verificar hashes (0 = en el mismo proceso, útil para depurar)
+    HASH_PROCESOS: int = int(os.getenv("HASH_PROCESOS", str(min(2, os.cpu_count() or 1))))
+
+    # Límite de intentos (token bucket) en los endpoints públicos que calculan argon2: capacidad = ráfaga permitida
+    LIMITE_ACTIVO: bool = os.getenv("LIMITE_ACTIVO", "true").lower() == "true"
+    LIMITE_LOGIN_IP_CAPACIDAD: int = int(os.getenv("LIMITE_LOGIN_IP_CAPACIDAD", "10"))
+    LIMITE_LOGIN_IP_POR_MINUTO: float = float(os.getenv("LIMITE_LOGIN_IP_POR_MINUTO", "10"))
+    LIMITE_LOGIN_CUENTA_CAPACIDAD: int = int(os.getenv("LIMITE_LOGIN_CUENTA_CAPACIDAD", "5"))
+    LIMITE_LOGIN_CUENTA_POR_MINUTO: float = float(os.getenv("LIMITE_LOGIN_CUENTA_POR_MINUTO", "1"))
+    LIMITE_REGISTRO_IP_CAPACIDAD: int = int(os.getenv("LIMITE_REGISTRO_IP_CAPACIDAD", "3"))
+    LIMITE_REGISTRO_IP_POR_MINUTO: float = float(os.getenv("LIMITE_REGISTRO_IP_POR_MINUTO", "1"))
+    LIMITE_MAX_CLAVES: int = int(os.getenv("LIMITE_MAX_CLAVES", "10000"))
+    # Proxies cuyo X-Forwarded-For se acepta para obtener la IP del cliente (IPs o redes CIDR
+    # separadas por comas, "*" = cualquiera). Vacío = se usa la IP de la conexión
+    PROXIES_CONFIABLES: str = os.getenv("PROXIES_CONFIABLES", "")
+
+    # Segundos entre refrescos de la lista de usuarios activos usada para autorizar con los claims del token
+    AUTORIZACION_REFRESCO: int = int(os.getenv("AUTORIZACION_REFRESCO", "30"))
+
+    # Índices de búsqueda en memoria: se reconstruyen cuando cambia la versión de su tabla en
+    # data_version y, en cualquier caso, pasados INDICE_TRIGRAMAS_TTL segundos
+    INDICE_TRIGRAMAS_TTL: int = int(os.getenv("INDICE_TRIGRAMAS_TTL", "300"))
+
+    # Máximo de ids / NITs aceptados por las consultas por lote
+    MAX_IDS_POR_LOTE: int = int(os.getenv("MAX_IDS_POR_LOTE", "100"))
+
+    # Filas leídas del cursor del servidor por cada bloque enviado en las exportaciones
+    EXPORTACION_FILAS_POR_BLOQUE: int = int(os.getenv("EXPORTACION_FILAS_POR_BLOQUE", "500"))
+
+    # Segundos máximos que un worker tarda en notar una escritura de otro worker (data_version); 0 = consultar siempre
+    VERSIONES_REFRESCO: float = float(os.getenv("VERSIONES_REFRESCO", "1"))
+    # Segundos sin volver a consultar data_version después de un fallo (se sirve la última copia)
+    VERSIONES_REINTENTO: float = float(os.getenv("VERSIONES_REINTENTO", "5"))
+
+    # Feed de cambios (/meta/cambios): margen para transacciones que confirman tarde y máximo de
+    # filas por entidad. La retención de las lápidas la define el evento ev_purgar_registro_eliminados
+    CAMBIOS_MARGEN_SEGUNDOS: int = int(os.getenv("CAMBIOS_MARGEN_SEGUNDOS", "5"))
+    CAMBIOS_MAX_FILAS: int = int(os.getenv("CAMBIOS_MAX_FILAS", "1000"))
+
+    # Notificaciones push (SSE / WebSocket): ventana en segundos en la que se agrupan los cambios,
+    # intervalo de ping para mantener viva la conexión, eventos en espera por cliente y espera
+    # máxima entre reintentos cuando falla la revisión de versiones
+    NOTIFICACIONES_INTERVALO: float = float(os.getenv("NOTIFICACIONES_INTERVALO", "2"))
+    NOTIFICACIONES_PING: int = int(os.getenv("NOTIFICACIONES_PING", "15"))
+    NOTIFICACIONES_COLA: int = int(os.getenv("NOTIFICACIONES_COLA", "8"))
+    NOTIFICACIONES_ESPERA_MAXIMA: float = float(os.getenv("NOTIFICACIONES_ESPERA_MAXIMA", "60"))
+
+    # Reportes (instantáneas rpt_*): claves recalculadas por transacción, segundos máximos entre
+    # refrescos en segundo plano (las escrituras de este worker lo piden de inmediato) y máximo de filas por página
+    REPORTES_LOTE_REFRESCO: int = int(os.getenv("REPORTES_LOTE_REFRESCO", "1000"))
+    REPORTES_INTERVALO_REFRESCO: float = float(os.getenv("REPORTES_INTERVALO_REFRESCO", "30"))
+    REPORTES_MAX_LIMITE: int = int(os.getenv("REPORTES_MAX_LIMITE", "500"))
+
+    # Instantánea analítica en memoria (/analitica): directorio opcional para compartirla entre workers
+    # como Parquet (requiere pyarrow), dimensiones por consulta y máximo de grupos por respuesta
+    ANALITICA_PARQUET_DIR: str = os.getenv("ANALITICA_PARQUET_DIR", "")
+    ANALITICA_MAX_DIMENSIONES: int = int(os.getenv("ANALITICA_MAX_DIMENSIONES", "3"))
+    ANALITICA_MAX_GRUPOS: int = int(os.getenv("ANALITICA_MAX_GRUPOS", "5000"))
+
+    # Métricas Prometheus (/meta/metrics): cada worker escribe las suyas en METRICAS_DIR cada
+    # METRICAS_INTERVALO segundos y la exportación suma las de todos; los contadores de un worker
+    # que no escribe hace METRICAS_EXPIRACION segundos pasan a archivados.json (no retroceden).
+    # Con varios workers el valor por defecto es un directorio temporal del proceso supervisor (el
+    # padre común de los workers), propio de cada despliegue: dos despliegues en el mismo directorio
+    # sumarían sus métricas. Con un solo worker, vacío = solo las del proceso
+    METRICAS_VARIOS_WORKERS: bool = _varios_workers()
+    METRICAS_DIR: str = os.getenv(
+        "METRICAS_DIR",
+        os.path.join(tempfile.gettempdir(), f"sena_metricas_{os.getppid()}") if METRICAS_VARIOS_WORKERS else ""
+    )
+    METRICAS_INTERVALO: float = float(os.getenv("METRICAS_INTERVALO", "5"))
+    METRICAS_EXPIRACION: float = float(os.getenv("METRICAS_EXPIRACION", "60"))
+    # Token que Prometheus envía como bearer_token a /meta/metrics (también se acepta el JWT
+    # de un administrador). Vacío = solo administradores
+    METRICAS_TOKEN: str = os.getenv("METRICAS_TOKEN", "")
+
+    # Perfilado bajo demanda (encabezado X-Perfilar: 1 o ?perfilar=1, solo administradores):
+    # muestreo cada PERFILADO_INTERVALO_MS durante máximo PERFILADO_MAX_SEGUNDOS; se conservan
+    # los últimos PERFILADO_MAX_ARCHIVOS perfiles en PERFILADO_DIR
+    PERFILADO_ACTIVO: bool = os.getenv("PERFILADO_ACTIVO", "true").lower() == "true"
+    PERFILADO_DIR: str = os.getenv("PERFILADO_DIR", os.path.join(tempfile.gettempdir(), "sena_perfiles"))
+    PERFILADO_INTERVALO_MS: float = float(os.getenv("PERFILADO_INTERVALO_MS", "2"))
+    PERFILADO_MAX_SEGUNDOS: float = float(os.getenv("PERFILADO_MAX_SEGUNDOS", "300"))
+    PERFILADO_MAX_ARCHIVOS: int = int(os.getenv("PERFILADO_MAX_ARCHIVOS", "50"))
+
+    # Caché de lectura en memoria para catálogos y listados (CACHE_LECTURA_ACTIVA=false la desactiva)
+    CACHE_LECTURA_ACTIVA: bool = os.getenv("CACHE_LECTURA_ACTIVA", "true").lower() == "true"
+    CACHE_LECTURA_TTL: int = int(os.getenv("CACHE_LECTURA_TTL", "60"))
+    CACHE_LECTURA_MAX_ENTRADAS: int = int(os.getenv("CACHE_LECTURA_MAX_ENTRADAS", "128"))
+    # Consulta de usuario por id (get_user_by_id): TTL corto para que una desactivación se note pronto en otros workers
+    CACHE_USUARIO_TTL: int = int(os.getenv("CACHE_USUARIO_TTL", "30"))
 
     class Config:
         env_file = ".env"
@@ -1,34 +1,135 @@
 from typing import Generator
 import logging
+import threading
+import time
 
-from sqlalchemy import create_engine, text, MetaData
-from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.exc import SQLAlchemyError, OperationalError, DisconnectionError
+from sqlalchemy import create_engine, event, text, MetaData
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.exc import SQLAlchemyError, OperationalError, DisconnectionError, TimeoutError as TimeoutPool
 from sqlalchemy.pool import QueuePool
 
 from core.config import settings
+from core.instrumentacion import instrumentar_engine
+from core.metricas import espera_pool, timeouts_pool, registrar_colector
 
 # Configurar el módulo de logging de Python y se usa para crear un registrador de eventos (logger)
 logger = logging.getLogger(__name__)
 
+class QueuePoolMedido(QueuePool):
+    """QueuePool que mide cuánto espera cada petición por una conexión (métrica db_pool_espera_segundos)"""
+
+    _medicion = threading.local()
+
+    def _do_get(self):
+        # QueuePool._do_get se llama a sí mismo al reintentar: solo se mide la llamada externa
+        if getattr(self._medicion, "midiendo", False):
+            return super()._do_get()
+        self._medicion.midiendo = True
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutPool:
+            timeouts_pool.incrementar()
+            raise
+        finally:
+            self._medicion.midiendo = False
+            espera_pool.observar(time.perf_counter() - inicio)
+
 # Crear el motor de base de datos con configuraciones óptimas
 engine = create_engine(
     settings.DATABASE_URL,
-    echo=True,           # Activar o desactivar el modo debug para imprimir en consola todas las sentencias SQL
+    echo=settings.SQL_ECHO,  # Imprimir en consola todas las sentencias SQL (solo para depurar: SQL_ECHO=true)
     pool_pre_ping=True,  # Verifica que las conexiones estén activas antes de usarlas
     pool_recycle=3600,   # Recicla conexiones después de una hora para evitar el error "connection has been closed", tiempo en milisegundos
     pool_size=10,        # Número máximo de conexiones permanentes en el pool
     max_overflow=20,     # Conexiones adicionales permitidas temporalmente cuando el pool está lleno
     pool_timeout=30,     # Tiempo máximo de espera para obtener una conexión del pool
-    poolclass=QueuePool  # Clase de pool para manejo eficiente de conexiones
+    poolclass=QueuePoolMedido  # QueuePool que además mide la espera por conexión
 )
 
+# Conteo y tiempo de las consultas por petición y registro de consultas lentas (core/instrumentacion.py)
+if settings.SQL_INSTRUMENTACION:
+    instrumentar_engine(engine)
+
 # Crear la fábrica de sesiones
 # - autocommit=False: Los cambios solo se guardan cuando se hace commit explícitamente
 # - autoflush=False: Las operaciones pendientes solo se envían a la BD cuando se hace flush explícitamente
 # - bind=engine: Vincula la sesión al motor creado anteriormente
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Contadores del pool para medir cuántas peticiones realmente usan una conexión
+_lock_metricas = threading.Lock()
+metricas_pool = {
+    "checkouts": 0,               # conexiones entregadas por el pool
+    "checkins": 0,                # conexiones devueltas al pool
+    "conexiones_creadas": 0,      # conexiones nuevas abiertas contra MySQL
+    "sesiones_solicitadas": 0,    # dependencias get_db resueltas
+    "sesiones_materializadas": 0, # sesiones que llegaron a usarse (pidieron una conexión)
+}
+
+def _contar(nombre: str) -> None:
+    with _lock_metricas:
+        metricas_pool[nombre] += 1
+
+@event.listens_for(engine, "checkout")
+def _al_entregar_conexion(dbapi_connection, connection_record, connection_proxy):
+    _contar("checkouts")
+
+@event.listens_for(engine, "checkin")
+def _al_devolver_conexion(dbapi_connection, connection_record):
+    _contar("checkins")
+
+@event.listens_for(engine, "connect")
+def _al_crear_conexion(dbapi_connection, connection_record):
+    _contar("conexiones_creadas")
+
+# La Session solo pide una conexión al pool en su primera consulta: una petición rechazada
+# por el token o el rol, respondida con 304 o servida desde la caché no ocupa el pool
+@event.listens_for(SessionLocal, "after_begin")
+def _al_usar_sesion(session, transaction, connection):
+    # after_begin se repite con cada transacción (p. ej. después de un commit): se cuenta la primera
+    if not session.info.get("materializada"):
+        session.info["materializada"] = True
+        _contar("sesiones_materializadas")
+
+def estadisticas_pool() -> dict:
+    """Contadores acumulados del proceso y estado actual del pool"""
+    with _lock_metricas:
+        datos = dict(metricas_pool)
+    pool = engine.pool
+    datos.update({
+        "en_uso": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "tamano": pool.size() if hasattr(pool, "size") else None,
+        "desborde": pool.overflow() if hasattr(pool, "overflow") else None,
+    })
+    return datos
+
+def _metricas_pool():
+    """Estado del pool y contadores de get_db para /meta/metrics"""
+    datos = estadisticas_pool()
+    medidores = {
+        "db_pool_en_uso": ("Conexiones entregadas y no devueltas", datos["en_uso"]),
+        "db_pool_desborde": ("Conexiones abiertas por encima de pool_size (negativo: sin abrir aún)", datos["desborde"]),
+        "db_pool_tamano": ("Conexiones permanentes configuradas (pool_size)", datos["tamano"]),
+    }
+    contadores = {
+        "db_pool_checkouts_total": ("Conexiones entregadas por el pool", datos["checkouts"]),
+        "db_conexiones_creadas_total": ("Conexiones nuevas abiertas contra MySQL", datos["conexiones_creadas"]),
+        "db_sesiones_solicitadas_total": ("Dependencias get_db resueltas", datos["sesiones_solicitadas"]),
+        "db_sesiones_materializadas_total": ("Sesiones que llegaron a usarse", datos["sesiones_materializadas"]),
+    }
+    familias = [
+        {"nombre": nombre, "tipo": "gauge", "ayuda": ayuda, "muestras": [{"etiquetas": {}, "valor": valor}]}
+        for nombre, (ayuda, valor) in medidores.items() if valor is not None
+    ]
+    familias += [
+        {"nombre": nombre, "tipo": "counter", "ayuda": ayuda, "muestras": [{"etiquetas": {}, "valor": valor}]}
+        for nombre, (ayuda, valor) in contadores.items()
+    ]
+    return familias
+
+registrar_colector(_metricas_pool)
+
 # Declarar la base para los modelos ORM
 Base = declarative_base()
 
@@ -41,7 +142,8 @@ def get_db() -> Generator:
     Dependencia para obtener una sesión de base de datos en FastAPI.
     
     Crea una nueva sesión por cada solicitud y la cierra automáticamente
-    al finalizar, incluso si ocurre alguna excepción.
+    al finalizar, incluso si ocurre alguna excepción. La sesión solo toma una
+    conexión del pool si el endpoint llega a consultar la base de datos.
     
     Yields:
         Session: Una sesión de SQLAlchemy para interactuar con la base de datos.
@@ -54,6 +156,7 @@ def get_db() -> Generator:
         ```
     """
     db = SessionLocal()
+    _contar("sesiones_solicitadas")
     try:
         yield db  # El 'yield' permite que la función de endpoint use la sesión.
     # except SQLAlchemyError as e:
@@ -0,0 +1,66 @@
+import hashlib
+import logging
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+from core.versiones import registro_versiones
+
+logger = logging.getLogger(__name__)
+
+
+def _coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110): ignora el prefijo W/ y acepta '*'"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    valor = etag.removeprefix("W/")
+    return any(candidato.strip().removeprefix("W/") == valor for candidato in if_none_match.split(","))
+
+
+def encabezados_etag(etag: Optional[str]) -> Dict[str, str]:
+    """
+    Encabezados de caché HTTP para un ETag. Los endpoints que retornan su propia Response
+    (p. ej. respuesta_rapida) deben pasarlos: FastAPI solo copia los encabezados de la
+    dependencia a la respuesta que construye a partir del valor retornado.
+    """
+    if etag is None:
+        return {}
+    # El cliente puede guardar la respuesta pero debe revalidarla siempre con If-None-Match
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def etag_tablas(*tablas: str) -> Callable:
+    """
+    Crea una dependencia que calcula el ETag de un endpoint de lectura a partir de las
+    versiones de las tablas que consulta (data_version, vía registro_versiones), de la
+    ruta y de los parámetros de la petición.
+
+    Si el cliente envía un If-None-Match que coincide responde 304 Not Modified antes de
+    ejecutar el endpoint, es decir, sin tocar la base de datos. Debe declararse después de
+    las dependencias de autenticación y de permisos (p. ej. usuario_administrador): FastAPI
+    las resuelve en orden, así un usuario sin permisos recibe el error y no un 304.
+
+    Retorna el ETag (o None) para que el endpoint lo pase con encabezados_etag() si
+    construye su propia Response.
+    """
+    def dependencia(request: Request, response: Response) -> Optional[str]:
+        versiones = registro_versiones.versiones(tablas)
+        if versiones is None:
+            # Sin versión no hay caché HTTP, pero la petición sigue normalmente
+            logger.warning(f"Sin versiones de datos para el ETag de {request.url.path}")
+            return None
+
+        firma = "|".join(
+            [request.url.path, request.url.query] + [f"{tabla}:{version}" for tabla, version in zip(tablas, versiones)]
+        )
+        etag = f'W/"{hashlib.sha1(firma.encode()).hexdigest()[:20]}"'
+
+        if _coincide(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=encabezados_etag(etag))
+
+        response.headers.update(encabezados_etag(etag))
+        return etag
+
+    return dependencia
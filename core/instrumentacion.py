@@ -0,0 +1,201 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from core.config import settings
+from core.metricas import registrar_colector
+
+# Registro aparte para poder enviar las consultas lentas a otro destino (una línea JSON por consulta)
+logger_sql_lenta = logging.getLogger("sql.lenta")
+
+
+class MetricasPeticion:
+    """Consultas y tiempo de base de datos acumulados durante una petición"""
+
+    __slots__ = ("consultas", "tiempo_db", "sentencias", "scope")
+
+    def __init__(self, scope):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.sentencias: Counter = Counter()
+        # El router completa el scope con la ruta resuelta al despachar la petición
+        self.scope = scope
+
+    def ruta(self) -> str:
+        return _ruta_de(self.scope)
+
+
+# La petición en curso. Los endpoints y dependencias síncronas corren en el threadpool con una
+# copia del contexto, así que ven (y modifican) el mismo objeto que creó el middleware
+_peticion_actual: ContextVar[Optional[MetricasPeticion]] = ContextVar("metricas_peticion", default=None)
+
+_lock = threading.Lock()
+_por_ruta: Dict[str, Dict[str, Any]] = {}
+_totales = {"consultas": 0, "tiempo_db": 0.0, "consultas_lentas": 0, "alertas_repetidas": 0}
+
+
+def _ruta_de(scope) -> str:
+    # FastAPI deja la ruta resuelta en el scope: se agrupa por plantilla (/convenios/{id}), no por URL
+    ruta = scope.get("route")
+    return f"{scope.get('method', '')} {getattr(ruta, 'path', None) or 'sin_ruta'}"
+
+
+def _registrar_lenta(sentencia: str, duracion: float, parametros: Any, ejecucion_multiple: bool) -> None:
+    peticion = _peticion_actual.get()
+    registro = {
+        "evento": "sql_lenta",
+        "duracion_ms": round(duracion * 1000, 2),
+        "umbral_ms": settings.SQL_LENTA_MS,
+        "ruta": peticion.ruta() if peticion is not None else None,
+        "sentencia": " ".join(sentencia.split())[:settings.SQL_LENTA_MAX_CARACTERES],
+        "ejecucion_multiple": ejecucion_multiple,
+    }
+    # Los parámetros pueden incluir datos personales o hashes: solo si se habilitan explícitamente
+    if settings.SQL_LENTA_PARAMETROS:
+        registro["parametros"] = repr(parametros)[:settings.SQL_LENTA_MAX_CARACTERES]
+    logger_sql_lenta.warning(json.dumps(registro, ensure_ascii=False))
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    """Registra los eventos que miden cada sentencia ejecutada por el engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        duracion = time.perf_counter() - conn.info["inicio_consulta"].pop()
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            peticion.consultas += 1
+            peticion.tiempo_db += duracion
+            peticion.sentencias[statement] += 1
+        with _lock:
+            _totales["consultas"] += 1
+            _totales["tiempo_db"] += duracion
+        if duracion * 1000 >= settings.SQL_LENTA_MS:
+            with _lock:
+                _totales["consultas_lentas"] += 1
+            _registrar_lenta(statement, duracion, parameters, executemany)
+
+    # Si la sentencia falla no hay after_cursor_execute: se descarta su marca de inicio
+    @event.listens_for(engine, "handle_error")
+    def _error(contexto_error):
+        conexion = contexto_error.connection
+        if conexion is not None and conexion.info.get("inicio_consulta"):
+            conexion.info["inicio_consulta"].pop()
+
+
+def _cerrar_peticion(ruta: str, metricas: MetricasPeticion, duracion: float) -> None:
+    with _lock:
+        datos = _por_ruta.get(ruta)
+        if datos is None:
+            datos = _por_ruta[ruta] = {
+                "peticiones": 0, "consultas": 0, "max_consultas": 0,
+                "tiempo_db": 0.0, "tiempo_total": 0.0, "peticiones_sin_db": 0,
+            }
+        datos["peticiones"] += 1
+        datos["consultas"] += metricas.consultas
+        datos["max_consultas"] = max(datos["max_consultas"], metricas.consultas)
+        datos["tiempo_db"] += metricas.tiempo_db
+        datos["tiempo_total"] += duracion
+        if metricas.consultas == 0:
+            datos["peticiones_sin_db"] += 1
+
+    # La misma sentencia muchas veces en una petición suele ser un patrón N+1
+    if metricas.sentencias:
+        sentencia, repeticiones = metricas.sentencias.most_common(1)[0]
+        if repeticiones >= settings.SQL_REPETIDAS_ALERTA:
+            with _lock:
+                _totales["alertas_repetidas"] += 1
+            logger_sql_lenta.warning(json.dumps({
+                "evento": "sql_repetida",
+                "ruta": ruta,
+                "repeticiones": repeticiones,
+                "consultas_peticion": metricas.consultas,
+                "sentencia": " ".join(sentencia.split())[:settings.SQL_LENTA_MAX_CARACTERES],
+            }, ensure_ascii=False))
+
+
+class MiddlewareInstrumentacion:
+    """
+    Middleware ASGI que abre las métricas de cada petición HTTP, agrega el encabezado
+    Server-Timing (tiempo y número de consultas) y acumula los totales por ruta.
+    Es ASGI puro (sin BaseHTTPMiddleware) para no copiar el cuerpo ni romper las respuestas en streaming.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_INSTRUMENTACION:
+            await self.app(scope, receive, send)
+            return
+
+        metricas = MetricasPeticion(scope)
+        token = _peticion_actual.set(metricas)
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                encabezados = MutableHeaders(scope=mensaje)
+                encabezados.append(
+                    "Server-Timing",
+                    f'db;dur={metricas.tiempo_db * 1000:.1f};desc="{metricas.consultas} consultas"'
+                )
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _peticion_actual.reset(token)
+            _cerrar_peticion(metricas.ruta(), metricas, time.perf_counter() - inicio)
+
+
+def estadisticas_sql() -> Dict[str, Any]:
+    """Totales del proceso y, por ruta, consultas y tiempo de base de datos promedio por petición"""
+    with _lock:
+        totales = dict(_totales)
+        rutas = {ruta: dict(datos) for ruta, datos in _por_ruta.items()}
+
+    por_ruta = []
+    for ruta, datos in rutas.items():
+        peticiones = datos["peticiones"]
+        por_ruta.append({
+            "ruta": ruta,
+            "peticiones": peticiones,
+            "peticiones_sin_db": datos["peticiones_sin_db"],
+            "consultas_promedio": round(datos["consultas"] / peticiones, 2),
+            "max_consultas": datos["max_consultas"],
+            "tiempo_db_ms_promedio": round(datos["tiempo_db"] * 1000 / peticiones, 2),
+            "tiempo_total_ms_promedio": round(datos["tiempo_total"] * 1000 / peticiones, 2),
+            "tiempo_db_ms_total": round(datos["tiempo_db"] * 1000, 2),
+        })
+    # Primero las rutas que más tiempo de base de datos consumen en total
+    por_ruta.sort(key=lambda fila: fila["tiempo_db_ms_total"], reverse=True)
+    totales["tiempo_db_ms"] = round(totales.pop("tiempo_db") * 1000, 2)
+    return {"umbral_lenta_ms": settings.SQL_LENTA_MS, "totales": totales, "rutas": por_ruta}
+
+
+def _metricas_sql():
+    with _lock:
+        totales = dict(_totales)
+    return [
+        {"nombre": "db_consultas_total", "tipo": "counter", "ayuda": "Sentencias SQL ejecutadas",
+         "muestras": [{"etiquetas": {}, "valor": totales["consultas"]}]},
+        {"nombre": "db_consultas_segundos_total", "tipo": "counter", "ayuda": "Tiempo acumulado en sentencias SQL",
+         "muestras": [{"etiquetas": {}, "valor": totales["tiempo_db"]}]},
+        {"nombre": "db_consultas_lentas_total", "tipo": "counter", "ayuda": "Sentencias que superaron SQL_LENTA_MS",
+         "muestras": [{"etiquetas": {}, "valor": totales["consultas_lentas"]}]},
+    ]
+
+registrar_colector(_metricas_sql)
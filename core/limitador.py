@@ -0,0 +1,172 @@
+import ipaddress
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from core.config import settings
+
+
+class LimitadorTokenBucket:
+    """
+    Limitador de tasa por clave (IP, cuenta, ...) con el algoritmo token bucket.
+
+    Cada clave tiene una cubeta de `capacidad` fichas que se recarga a `por_minuto`
+    fichas por minuto; cada intento consume una. Permite ráfagas cortas y acota el
+    ritmo sostenido. Rechazar cuesta un acceso a un diccionario, así que las peticiones
+    excedentes nunca llegan a argon2. Las cubetas viven en memoria del proceso (worker)
+    y se descartan por LRU al superar `max_claves`.
+    """
+
+    def __init__(self, nombre: str, capacidad: int, por_minuto: float, max_claves: int):
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.por_segundo = por_minuto / 60
+        self.max_claves = max_claves
+        self._lock = threading.Lock()
+        self._cubetas: "OrderedDict[str, list]" = OrderedDict()
+        self.permitidas = 0
+        self.rechazadas = 0
+        self.devueltas = 0
+
+    def _recargar(self, clave: str, ahora: float) -> list:
+        cubeta = self._cubetas.get(clave)
+        if cubeta is None:
+            cubeta = self._cubetas[clave] = [float(self.capacidad), ahora]
+            while len(self._cubetas) > self.max_claves:
+                self._cubetas.popitem(last=False)
+        else:
+            fichas, ultima = cubeta
+            cubeta[0] = min(self.capacidad, fichas + (ahora - ultima) * self.por_segundo)
+            cubeta[1] = ahora
+            self._cubetas.move_to_end(clave)
+        return cubeta
+
+    def consumir(self, clave: str) -> float:
+        """Consume una ficha. Retorna 0 si se permite, o los segundos a esperar si se rechaza"""
+        with self._lock:
+            cubeta = self._recargar(clave, time.monotonic())
+            if cubeta[0] >= 1:
+                cubeta[0] -= 1
+                self.permitidas += 1
+                return 0.0
+            self.rechazadas += 1
+            if self.por_segundo <= 0:
+                return float("inf")
+            return (1 - cubeta[0]) / self.por_segundo
+
+    def devolver(self, clave: str) -> None:
+        """Reintegra la ficha de un intento exitoso (p. ej. un login correcto no debe penalizar la cuenta)"""
+        with self._lock:
+            cubeta = self._cubetas.get(clave)
+            if cubeta is not None:
+                cubeta[0] = min(self.capacidad, cubeta[0] + 1)
+                self.devueltas += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            intentos = self.permitidas + self.rechazadas
+            return {
+                "capacidad": self.capacidad,
+                "por_minuto": round(self.por_segundo * 60, 4),
+                "claves": len(self._cubetas),
+                "permitidas": self.permitidas,
+                "rechazadas": self.rechazadas,
+                "tasa_rechazo": round(self.rechazadas / intentos, 4) if intentos else None,
+                "devueltas": self.devueltas,
+            }
+
+
+# Registro de limitadores por nombre (los endpoints comparten cubeta si usan el mismo nombre)
+_limitadores: Dict[str, LimitadorTokenBucket] = {}
+
+
+def obtener_limitador(nombre: str, capacidad: int, por_minuto: float) -> LimitadorTokenBucket:
+    limitador = _limitadores.get(nombre)
+    if limitador is None:
+        limitador = _limitadores[nombre] = LimitadorTokenBucket(
+            nombre, capacidad, por_minuto, settings.LIMITE_MAX_CLAVES
+        )
+    return limitador
+
+
+@lru_cache(maxsize=1)
+def _redes_confiables(valor: str) -> Optional[Tuple]:
+    """Redes de PROXIES_CONFIABLES, o None si se confía en cualquier proxy ("*")"""
+    redes = []
+    for parte in valor.split(","):
+        parte = parte.strip()
+        if parte == "*":
+            return None
+        if parte:
+            redes.append(ipaddress.ip_network(parte, strict=False))
+    return tuple(redes)
+
+
+def _es_proxy_confiable(ip: str) -> bool:
+    if not settings.PROXIES_CONFIABLES:
+        return False
+    redes = _redes_confiables(settings.PROXIES_CONFIABLES)
+    if redes is None:
+        return True
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(direccion in red for red in redes)
+
+
+def ip_cliente(request: Request) -> str:
+    """
+    IP del cliente para las cubetas por IP. Detrás del proxy del hosting la conexión llega
+    desde el proxy: si es uno de PROXIES_CONFIABLES se toma de X-Forwarded-For la última IP
+    que no sea un proxy confiable (las anteriores las puede escribir el propio cliente)
+    """
+    ip = request.client.host if request.client else "desconocida"
+    if not _es_proxy_confiable(ip):
+        return ip
+    reenviadas = [
+        parte.strip()
+        for valor in request.headers.getlist("x-forwarded-for")
+        for parte in valor.split(",")
+        if parte.strip()
+    ]
+    for reenviada in reversed(reenviadas):
+        ip = reenviada
+        if not _es_proxy_confiable(ip):
+            break
+    return ip
+
+
+def verificar_limite(limitador: LimitadorTokenBucket, clave: str) -> None:
+    """Consume una ficha de la clave o responde 429 con Retry-After"""
+    if not settings.LIMITE_ACTIVO:
+        return
+    espera = limitador.consumir(clave)
+    if espera > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos, intente de nuevo más tarde",
+            headers={"Retry-After": str(max(1, math.ceil(min(espera, 86400))))},
+        )
+
+
+def limitar_por_ip(nombre: str, capacidad: int, por_minuto: float) -> Callable:
+    """Crea una dependencia que limita el endpoint por IP"""
+    limitador = obtener_limitador(nombre, capacidad, por_minuto)
+
+    def dependencia(request: Request) -> None:
+        verificar_limite(limitador, ip_cliente(request))
+
+    return dependencia
+
+
+def estadisticas_limitadores() -> Dict[str, Any]:
+    return {
+        "activo": settings.LIMITE_ACTIVO,
+        "limitadores": {nombre: l.estadisticas() for nombre, l in sorted(_limitadores.items())},
+    }
@@ -0,0 +1,376 @@
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos al archivar
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Límites (segundos) de los histogramas de latencia
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_IMPORTACION = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+class Contador:
+    """Contador monótono con etiquetas"""
+
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._lock = threading.Lock()
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def incrementar(self, valor: float = 1, **etiquetas: str) -> None:
+        clave = tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def muestras(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            valores = list(self._valores.items())
+        return [{"etiquetas": dict(zip(self.etiquetas, clave)), "valor": valor} for clave, valor in valores]
+
+
+class Histograma:
+    """Histograma con límites fijos: por serie guarda la cuenta de cada intervalo, la suma y el total"""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (),
+                 limites: Tuple[float, ...] = LIMITES_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.limites = tuple(sorted(limites))
+        self._lock = threading.Lock()
+        # clave -> [cuentas por intervalo (la última es +Inf), suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observar(self, valor: float, **etiquetas: str) -> None:
+        clave = tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def muestras(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            series = [(clave, list(cuentas), suma, total) for clave, (cuentas, suma, total) in self._series.items()]
+        return [
+            {"etiquetas": dict(zip(self.etiquetas, clave)), "cuentas": cuentas, "suma": suma, "total": total}
+            for clave, cuentas, suma, total in series
+        ]
+
+
+_metricas: Dict[str, Any] = {}
+# Funciones que al exportar retornan familias calculadas en ese momento (pool, cachés):
+# no cuestan nada por petición
+_colectores: List[Callable[[], Iterable[Dict[str, Any]]]] = []
+
+
+def contador(nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()) -> Contador:
+    return _metricas.setdefault(nombre, Contador(nombre, ayuda, etiquetas))
+
+
+def histograma(nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (),
+               limites: Tuple[float, ...] = LIMITES_LATENCIA) -> Histograma:
+    return _metricas.setdefault(nombre, Histograma(nombre, ayuda, etiquetas, limites))
+
+
+def registrar_colector(colector: Callable[[], Iterable[Dict[str, Any]]]) -> None:
+    """
+    Registra una función que retorna familias {"nombre", "tipo" (counter|gauge), "ayuda",
+    "muestras": [{"etiquetas", "valor"}]} con el estado actual del proceso.
+    """
+    _colectores.append(colector)
+
+
+# Métricas de la aplicación
+peticiones_http = contador(
+    "http_peticiones_total", "Peticiones HTTP atendidas", ("metodo", "ruta", "estado")
+)
+duracion_http = histograma(
+    "http_duracion_segundos", "Latencia de las peticiones HTTP", ("metodo", "ruta")
+)
+espera_pool = histograma(
+    "db_pool_espera_segundos", "Tiempo de espera para obtener una conexión del pool",
+    limites=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+)
+timeouts_pool = contador(
+    "db_pool_timeouts_total", "Solicitudes de conexión que agotaron pool_timeout"
+)
+duracion_importacion = histograma(
+    "importacion_duracion_segundos", "Duración de las cargas de archivos por etapa",
+    ("tipo", "etapa"), LIMITES_IMPORTACION
+)
+filas_importacion = contador(
+    "importacion_filas_total", "Filas procesadas por las cargas de archivos", ("tipo", "resultado")
+)
+
+
+# ----------------------------------------------------------------------
+# Instantánea del proceso y combinación entre workers
+# ----------------------------------------------------------------------
+def _instantanea() -> Dict[str, Any]:
+    familias = []
+    for metrica in list(_metricas.values()):
+        familia = {"nombre": metrica.nombre, "tipo": metrica.tipo, "ayuda": metrica.ayuda, "muestras": metrica.muestras()}
+        if metrica.tipo == "histogram":
+            familia["limites"] = list(metrica.limites)
+        familias.append(familia)
+    for colector in _colectores:
+        try:
+            familias.extend(colector())
+        except Exception as e:
+            logger.warning(f"Colector de métricas con error: {e}")
+    return {"pid": os.getpid(), "hora": time.time(), "familias": familias}
+
+
+def _ruta_archivo(pid: int) -> str:
+    return os.path.join(settings.METRICAS_DIR, f"worker_{pid}.json")
+
+
+def _guardar_instantanea() -> None:
+    if not settings.METRICAS_DIR:
+        return
+    try:
+        os.makedirs(settings.METRICAS_DIR, exist_ok=True)
+        ruta = _ruta_archivo(os.getpid())
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(_instantanea(), archivo)
+        os.replace(temporal, ruta)
+    except OSError as e:
+        logger.warning(f"No se pudieron guardar las métricas del worker: {e}")
+
+
+def _ruta_archivados() -> str:
+    return os.path.join(settings.METRICAS_DIR, "archivados.json")
+
+
+def _leer_json(ruta: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(ruta, encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return None
+
+
+def _archivar(ruta: str) -> None:
+    """
+    Suma los contadores e histogramas de un worker terminado a archivados.json y borra su
+    archivo, así los totales exportados no retroceden (Prometheus lo vería como un reinicio
+    del contador). Sus medidores (gauge) describían un proceso que ya no existe y se descartan.
+    """
+    with open(os.path.join(settings.METRICAS_DIR, "archivados.lock"), "a") as bloqueo:
+        # Varios workers pueden ver vencido el mismo archivo: solo uno lo suma
+        if fcntl is not None:
+            fcntl.flock(bloqueo, fcntl.LOCK_EX)
+        muerto = _leer_json(ruta)
+        if muerto is None:
+            return
+        archivados = _leer_json(_ruta_archivados()) or {"pid": "archivados", "familias": []}
+        familias = [
+            familia for familia in _combinar([archivados, muerto]) if familia["tipo"] != "gauge"
+        ]
+        temporal = f"{_ruta_archivados()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({"pid": "archivados", "hora": time.time(), "familias": _a_familias(familias)}, archivo)
+        os.replace(temporal, _ruta_archivados())
+        os.remove(ruta)
+
+
+def _leer_instantaneas() -> List[Dict[str, Any]]:
+    """Instantáneas de todos los workers (la de este proceso, al momento) y totales archivados"""
+    propia = _instantanea()
+    if not settings.METRICAS_DIR:
+        return [propia]
+    instantaneas = [propia]
+    limite = time.time() - settings.METRICAS_EXPIRACION
+    for ruta in glob.glob(os.path.join(settings.METRICAS_DIR, "worker_*.json")):
+        if ruta == _ruta_archivo(propia["pid"]):
+            continue
+        try:
+            # Un worker que dejó de escribir (terminado o reiniciado) pasa a los archivados
+            if os.path.getmtime(ruta) < limite:
+                _archivar(ruta)
+                continue
+            with open(ruta, encoding="utf-8") as archivo:
+                instantaneas.append(json.load(archivo))
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudieron leer las métricas de {ruta}: {e}")
+            continue
+    try:
+        archivados = _leer_json(_ruta_archivados())
+        if archivados is not None:
+            instantaneas.append(archivados)
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudieron leer las métricas archivadas: {e}")
+    return instantaneas
+
+
+def _combinar(instantaneas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Suma contadores e histogramas de todos los workers por etiquetas. Los medidores (gauge)
+    describen el estado de cada proceso y se exportan con la etiqueta worker.
+    """
+    familias: Dict[str, Dict[str, Any]] = {}
+    for instantanea in instantaneas:
+        for familia in instantanea["familias"]:
+            destino = familias.setdefault(familia["nombre"], {
+                "nombre": familia["nombre"], "tipo": familia["tipo"], "ayuda": familia["ayuda"],
+                "limites": familia.get("limites"), "series": {},
+            })
+            for muestra in familia["muestras"]:
+                etiquetas = dict(muestra["etiquetas"])
+                if familia["tipo"] == "gauge":
+                    etiquetas["worker"] = str(instantanea["pid"])
+                clave = tuple(sorted(etiquetas.items()))
+                serie = destino["series"].get(clave)
+                if familia["tipo"] == "histogram":
+                    if serie is None:
+                        destino["series"][clave] = [list(muestra["cuentas"]), muestra["suma"], muestra["total"]]
+                    else:
+                        serie[0] = [a + b for a, b in zip(serie[0], muestra["cuentas"])]
+                        serie[1] += muestra["suma"]
+                        serie[2] += muestra["total"]
+                else:
+                    destino["series"][clave] = (serie or 0) + muestra["valor"]
+    return list(familias.values())
+
+
+def _a_familias(combinadas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convierte el resultado de _combinar al formato de las instantáneas"""
+    familias = []
+    for familia in combinadas:
+        muestras = []
+        for clave, serie in familia["series"].items():
+            if familia["tipo"] == "histogram":
+                cuentas, suma, total = serie
+                muestras.append({"etiquetas": dict(clave), "cuentas": cuentas, "suma": suma, "total": total})
+            else:
+                muestras.append({"etiquetas": dict(clave), "valor": serie})
+        nueva = {"nombre": familia["nombre"], "tipo": familia["tipo"], "ayuda": familia["ayuda"], "muestras": muestras}
+        if familia["limites"] is not None:
+            nueva["limites"] = familia["limites"]
+        familias.append(nueva)
+    return familias
+
+
+def _etiquetas_texto(etiquetas: Iterable[Tuple[str, str]]) -> str:
+    partes = []
+    for nombre, valor in etiquetas:
+        valor = str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        partes.append(f'{nombre}="{valor}"')
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+def exportar_prometheus() -> str:
+    """Métricas de todos los workers en el formato de texto de Prometheus (versión 0.0.4)"""
+    instantaneas = _leer_instantaneas()
+    # Permite notar en Prometheus una exportación que no incluye a todos los workers
+    workers = sum(1 for instantanea in instantaneas if instantanea["pid"] != "archivados")
+    lineas = [
+        "# HELP metricas_workers Workers cuyas métricas incluye la exportación",
+        "# TYPE metricas_workers gauge",
+        f"metricas_workers {workers}",
+    ]
+    for familia in sorted(_combinar(instantaneas), key=lambda f: f["nombre"]):
+        nombre = familia["nombre"]
+        lineas.append(f"# HELP {nombre} {familia['ayuda']}")
+        lineas.append(f"# TYPE {nombre} {familia['tipo']}")
+        for clave, serie in sorted(familia["series"].items()):
+            if familia["tipo"] != "histogram":
+                lineas.append(f"{nombre}{_etiquetas_texto(clave)} {_numero(serie)}")
+                continue
+            cuentas, suma, total = serie
+            acumulado = 0
+            for limite, cuenta in zip(list(familia["limites"]) + ["+Inf"], cuentas):
+                acumulado += cuenta
+                le = limite if limite == "+Inf" else _numero(limite)
+                lineas.append(f"{nombre}_bucket{_etiquetas_texto(clave + (('le', le),))} {acumulado}")
+            lineas.append(f"{nombre}_sum{_etiquetas_texto(clave)} {_numero(suma)}")
+            lineas.append(f"{nombre}_count{_etiquetas_texto(clave)} {total}")
+    return "\n".join(lineas) + "\n"
+
+
+# ----------------------------------------------------------------------
+# Escritura periódica y middleware
+# ----------------------------------------------------------------------
+_hilo_escritura: Optional[threading.Thread] = None
+_lock_hilo = threading.Lock()
+
+
+def _escribir_periodicamente() -> None:
+    while True:
+        _guardar_instantanea()
+        time.sleep(settings.METRICAS_INTERVALO)
+
+
+def iniciar_escritura() -> None:
+    """Inicia (una vez por proceso) el hilo que comparte las métricas de este worker con los demás"""
+    global _hilo_escritura
+    if not settings.METRICAS_DIR:
+        if settings.METRICAS_VARIOS_WORKERS:
+            logger.warning(
+                "Varios workers con METRICAS_DIR vacío: /meta/metrics solo reporta el worker que responde"
+            )
+        return
+    with _lock_hilo:
+        if _hilo_escritura is None or not _hilo_escritura.is_alive():
+            _hilo_escritura = threading.Thread(target=_escribir_periodicamente, name="metricas", daemon=True)
+            _hilo_escritura.start()
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mide la latencia y el código de estado de cada petición HTTP por
+    plantilla de ruta. Por petición solo toma dos marcas de tiempo y actualiza dos series en memoria.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        iniciar_escritura()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado = [500]
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # Se agrupa por plantilla (/convenios/{id}); las rutas inexistentes comparten una serie
+            ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+            metodo = scope.get("method", "")
+            duracion_http.observar(time.perf_counter() - inicio, metodo=metodo, ruta=ruta)
+            peticiones_http.incrementar(metodo=metodo, ruta=ruta, estado=estado[0])
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from core.config import settings
+from core.versiones import TABLAS_VERSIONADAS, registro_versiones
+
+logger = logging.getLogger(__name__)
+
+
+class CanalCambios:
+    """
+    Canal de notificaciones de cambios para los clientes suscritos por SSE o WebSocket.
+
+    Una sola tarea por proceso (worker) compara las versiones de data_version cada
+    NOTIFICACIONES_INTERVALO segundos y envía un único evento con todas las entidades
+    que cambiaron en esa ventana. El costo en base de datos no depende del número de
+    suscriptores, y la tarea solo existe mientras haya alguno conectado.
+
+    Los eventos locales (p. ej. el fin de una importación) se agregan al evento de la
+    siguiente ventana en lugar de enviarse uno por uno.
+    """
+
+    def __init__(self):
+        self._suscriptores: Set[asyncio.Queue] = set()
+        self._tarea: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._versiones: Optional[Dict[str, int]] = None
+        self._pendientes: List[Dict[str, Any]] = []
+        self.eventos_enviados = 0
+        self.eventos_descartados = 0
+
+    def suscribir(self) -> asyncio.Queue:
+        cola: asyncio.Queue = asyncio.Queue(maxsize=settings.NOTIFICACIONES_COLA)
+        self._suscriptores.add(cola)
+        if self._tarea is None or self._tarea.done():
+            self._loop = asyncio.get_running_loop()
+            self._tarea = self._loop.create_task(self._vigilar())
+        return cola
+
+    def desuscribir(self, cola: asyncio.Queue) -> None:
+        self._suscriptores.discard(cola)
+
+    def publicar(self, tipo: str, datos: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Registra un evento local para la próxima ventana. Puede llamarse desde los hilos
+        del threadpool (funciones CRUD síncronas); sin suscriptores no hace nada.
+        """
+        if not self._suscriptores or self._loop is None or self._loop.is_closed():
+            return
+        evento = {"tipo": tipo, **(datos or {})}
+        self._loop.call_soon_threadsafe(self._pendientes.append, evento)
+
+    def _leer_versiones(self) -> Optional[Dict[str, int]]:
+        versiones = registro_versiones.versiones(TABLAS_VERSIONADAS)
+        return None if versiones is None else dict(zip(TABLAS_VERSIONADAS, versiones))
+
+    def _difundir(self, evento: Dict[str, Any]) -> None:
+        for cola in list(self._suscriptores):
+            if cola.full():
+                # Un cliente lento solo necesita el estado más reciente: se descarta el evento más antiguo
+                cola.get_nowait()
+                self.eventos_descartados += 1
+            cola.put_nowait(evento)
+        self.eventos_enviados += 1
+
+    def _revisar(self, versiones: Optional[Dict[str, int]]) -> None:
+        cambiadas = []
+        if versiones is not None and self._versiones is not None:
+            cambiadas = [tabla for tabla, version in versiones.items() if version != self._versiones.get(tabla)]
+        if versiones is not None:
+            self._versiones = versiones
+
+        pendientes, self._pendientes = self._pendientes, []
+        if cambiadas or pendientes:
+            self._difundir({
+                "tipo": "cambios",
+                "entidades": cambiadas,
+                "versiones": self._versiones,
+                "eventos": pendientes,
+            })
+
+    @staticmethod
+    def _espera(fallos: int) -> float:
+        """Intervalo normal; tras fallos seguidos se duplica hasta NOTIFICACIONES_ESPERA_MAXIMA"""
+        if not fallos:
+            return settings.NOTIFICACIONES_INTERVALO
+        return min(settings.NOTIFICACIONES_INTERVALO * 2 ** fallos, settings.NOTIFICACIONES_ESPERA_MAXIMA)
+
+    async def _vigilar(self) -> None:
+        fallos = 0
+        inicial = True
+        try:
+            while self._suscriptores:
+                if not inicial or fallos:
+                    await asyncio.sleep(self._espera(fallos))
+                try:
+                    versiones = await run_in_threadpool(self._leer_versiones)
+                    if inicial:
+                        # Versiones de referencia: se notifica lo que cambie desde aquí
+                        self._versiones = versiones
+                        inicial = False
+                    else:
+                        self._revisar(versiones)
+                    fallos = 0
+                except Exception as e:
+                    # Un error (p. ej. de la base de datos) no detiene el canal: se reintenta
+                    fallos += 1
+                    logger.error(
+                        f"Error en el canal de notificaciones ({fallos} seguidos), "
+                        f"reintento en {self._espera(fallos):.1f} s: {e}"
+                    )
+        finally:
+            self._versiones = None
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "suscriptores": len(self._suscriptores),
+            "activo": self._tarea is not None and not self._tarea.done(),
+            "intervalo": settings.NOTIFICACIONES_INTERVALO,
+            "eventos_enviados": self.eventos_enviados,
+            "eventos_descartados": self.eventos_descartados,
+        }
+
+
+canal_cambios = CanalCambios()
@@ -0,0 +1,317 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.datastructures import MutableHeaders
+
+from core.autorizacion import registro_usuarios
+from core.config import settings
+from core.security import decode_token
+
+logger = logging.getLogger(__name__)
+
+# Los identificadores llegan desde la URL de descarga: solo se aceptan los generados aquí
+PATRON_ID_PERFIL = re.compile(r"^[0-9]+_[0-9a-f]{12}$")
+VALORES_ACTIVACION = {"1", "true", "si", "sí"}
+# Muestras en las que ningún hilo ejecutaba código de la petición (E/S asíncrona, cola del threadpool)
+MARCO_ESPERA = "(en espera)"
+
+_RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _nombre_marco(codigo) -> str:
+    archivo = codigo.co_filename
+    if archivo.startswith(_RAIZ_PROYECTO + os.sep):
+        archivo = os.path.relpath(archivo, _RAIZ_PROYECTO)
+    elif "site-packages" + os.sep in archivo:
+        archivo = archivo.split("site-packages" + os.sep, 1)[1]
+    # El formato de pilas colapsadas separa los marcos con ';'
+    return f"{codigo.co_qualname} ({archivo}:{codigo.co_firstlineno})".replace(";", ",")
+
+
+def _pila(marco, hasta) -> Optional[List[str]]:
+    """Marcos desde `hasta` (incluido) hasta el marco en ejecución, o None si `hasta` no está en la pila"""
+    nombres = []
+    while marco is not None:
+        nombres.append(_nombre_marco(marco.f_code))
+        if marco is hasta:
+            nombres.reverse()
+            return nombres
+        marco = marco.f_back
+    return None
+
+
+def _pila_desde_codigos(marco, codigos) -> Optional[List[str]]:
+    """Marcos desde el más externo cuyo código está en `codigos` hasta el marco en ejecución"""
+    nombres = []
+    inicio = None
+    while marco is not None:
+        nombres.append(_nombre_marco(marco.f_code))
+        if marco.f_code in codigos:
+            inicio = len(nombres)
+        marco = marco.f_back
+    if inicio is None:
+        return None
+    pila = nombres[:inicio]
+    pila.reverse()
+    return pila
+
+
+def _codigos_ruta(ruta) -> set:
+    """Código del endpoint y de sus dependencias: lo que FastAPI ejecuta en el threadpool"""
+    codigos = set()
+    pendientes = [getattr(ruta, "dependant", None)]
+    while pendientes:
+        dependencia = pendientes.pop()
+        if dependencia is None:
+            continue
+        codigo = getattr(dependencia.call, "__code__", None)
+        if codigo is not None:
+            codigos.add(codigo)
+        pendientes.extend(dependencia.dependencies)
+    return codigos
+
+
+class MuestreadorPeticion:
+    """
+    Perfilador por muestreo de una sola petición. Un hilo toma cada PERFILADO_INTERVALO_MS
+    la pila de los hilos que ejecutan la petición y cuenta las pilas repetidas:
+    - en el event loop, solo si la corrutina de la petición (`marco_raiz`) está en la pila,
+      así no se cuentan otras peticiones que comparten el loop;
+    - en el threadpool, los hilos que ejecutan el endpoint o sus dependencias síncronas.
+      Si otra petición ejecuta el mismo endpoint a la vez, sus muestras se mezclan.
+    Las muestras sin ningún hilo activo se cuentan como espera, así el ancho total del
+    flame graph corresponde al tiempo real de la petición.
+    """
+
+    def __init__(self, scope, marco_raiz):
+        self.scope = scope
+        self.marco_raiz = marco_raiz
+        self.hilo_loop = threading.get_ident()
+        self.pilas: Counter = Counter()
+        self.muestras = 0
+        self.inicio = time.perf_counter()
+        self.duracion = 0.0
+        self._codigos: Optional[set] = None
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, name="perfilado", daemon=True)
+
+    def ruta(self) -> str:
+        ruta = self.scope.get("route")
+        return getattr(ruta, "path", None) or self.scope.get("path", "")
+
+    def iniciar(self) -> None:
+        self._hilo.start()
+
+    def detener(self) -> None:
+        if self._detener.is_set():
+            return
+        self._detener.set()
+        self._hilo.join()
+        self.duracion = time.perf_counter() - self.inicio
+
+    def _muestrear(self) -> None:
+        intervalo = settings.PERFILADO_INTERVALO_MS / 1000
+        limite = self.inicio + settings.PERFILADO_MAX_SEGUNDOS
+        propio = threading.get_ident()
+        while not self._detener.wait(intervalo) and time.perf_counter() < limite:
+            # La ruta se resuelve después de entrar al middleware
+            if self._codigos is None and self.scope.get("route") is not None:
+                self._codigos = _codigos_ruta(self.scope["route"])
+
+            pilas = []
+            for id_hilo, marco in sys._current_frames().items():
+                if id_hilo == propio:
+                    continue
+                if id_hilo == self.hilo_loop:
+                    pila = _pila(marco, self.marco_raiz)
+                elif self._codigos:
+                    pila = _pila_desde_codigos(marco, self._codigos)
+                else:
+                    pila = None
+                if pila:
+                    pilas.append(";".join(pila))
+            # Una muestra tomada mientras se detiene el muestreo solo vería al propio perfilador
+            if self._detener.is_set():
+                break
+            self.pilas.update(pilas or [MARCO_ESPERA])
+            self.muestras += 1
+
+    def pilas_colapsadas(self) -> str:
+        """Formato de pilas colapsadas (flamegraph.pl, inferno, speedscope): 'raiz;...;hoja cuenta'"""
+        raiz = f"{self.scope.get('method', '')} {self.ruta()}".replace(";", ",")
+        lineas = [f"{raiz};{pila} {cuenta}" for pila, cuenta in self.pilas.most_common()]
+        return "\n".join(lineas) + "\n"
+
+
+def _solicitado(scope) -> bool:
+    if not settings.PERFILADO_ACTIVO:
+        return False
+    for nombre, valor in scope["headers"]:
+        if nombre == b"x-perfilar":
+            return valor.decode("latin-1").strip().lower() in VALORES_ACTIVACION
+    consulta = scope.get("query_string", b"")
+    if b"perfilar=" in consulta:
+        valores = parse_qs(consulta.decode("latin-1")).get("perfilar", [])
+        return bool(valores) and valores[-1].strip().lower() in VALORES_ACTIVACION
+    return False
+
+
+def _es_administrador(scope) -> bool:
+    """Las mismas reglas de get_usuario_token: token vigente, usuario activo y rol actual 1"""
+    autorizacion = ""
+    for nombre, valor in scope["headers"]:
+        if nombre == b"authorization":
+            autorizacion = valor.decode("latin-1")
+            break
+    if not autorizacion.lower().startswith("bearer "):
+        return False
+    claims = decode_token(autorizacion[7:].strip())
+    if claims is None or claims.get("sub") is None or claims.get("rol") != 1:
+        return False
+    try:
+        id_usuario = int(claims["sub"])
+    except (TypeError, ValueError):
+        return False
+    try:
+        return registro_usuarios.rol_vigente(id_usuario) == 1
+    except SQLAlchemyError:
+        return False
+
+
+def _ruta_perfil(id_perfil: str, extension: str) -> str:
+    return os.path.join(settings.PERFILADO_DIR, f"{id_perfil}.{extension}")
+
+
+def _guardar_perfil(muestreador: MuestreadorPeticion) -> Optional[str]:
+    id_perfil = f"{int(time.time())}_{uuid.uuid4().hex[:12]}"
+    datos = {
+        "id": id_perfil,
+        "metodo": muestreador.scope.get("method", ""),
+        "ruta": muestreador.ruta(),
+        "fecha": time.time(),
+        "duracion_ms": round(muestreador.duracion * 1000, 2),
+        "muestras": muestreador.muestras,
+        "intervalo_ms": settings.PERFILADO_INTERVALO_MS,
+    }
+    try:
+        os.makedirs(settings.PERFILADO_DIR, exist_ok=True)
+        with open(_ruta_perfil(id_perfil, "folded"), "w", encoding="utf-8") as archivo:
+            archivo.write(muestreador.pilas_colapsadas())
+        with open(_ruta_perfil(id_perfil, "json"), "wb") as archivo:
+            archivo.write(orjson.dumps(datos))
+        _purgar_perfiles()
+        return id_perfil
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el perfil de la petición: {e}")
+        return None
+
+
+def _purgar_perfiles() -> None:
+    """Conserva solo los PERFILADO_MAX_ARCHIVOS perfiles más recientes"""
+    perfiles = listar_perfiles()
+    for datos in perfiles[settings.PERFILADO_MAX_ARCHIVOS:]:
+        for extension in ("folded", "json"):
+            try:
+                os.remove(_ruta_perfil(datos["id"], extension))
+            except OSError:
+                pass
+
+
+def listar_perfiles() -> List[Dict[str, Any]]:
+    """Perfiles guardados (de todos los workers), del más reciente al más antiguo"""
+    perfiles = []
+    try:
+        nombres = os.listdir(settings.PERFILADO_DIR)
+    except OSError:
+        return perfiles
+    for nombre in nombres:
+        if not nombre.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(settings.PERFILADO_DIR, nombre), "rb") as archivo:
+                perfiles.append(orjson.loads(archivo.read()))
+        except (OSError, ValueError):
+            continue
+    perfiles.sort(key=lambda datos: datos["fecha"], reverse=True)
+    return perfiles
+
+
+def leer_perfil(id_perfil: str) -> Optional[str]:
+    """Pilas colapsadas del perfil, o None si el identificador no es válido o ya se purgó"""
+    if not PATRON_ID_PERFIL.match(id_perfil):
+        return None
+    try:
+        with open(_ruta_perfil(id_perfil, "folded"), encoding="utf-8") as archivo:
+            return archivo.read()
+    except OSError:
+        return None
+
+
+class MiddlewarePerfilado:
+    """
+    Middleware ASGI que perfila una petición cuando un administrador lo pide con el encabezado
+    `X-Perfilar: 1` o el parámetro `perfilar=1`. El perfil se guarda en PERFILADO_DIR y la
+    respuesta indica dónde descargarlo (encabezados X-Perfil-Id y X-Perfil-Url).
+    Las peticiones sin la marca solo pagan la revisión de sus encabezados; la marca de quien
+    no es administrador se ignora.
+    Las respuestas en streaming (sin Content-Length, como el SSE de /meta/eventos) no esperan
+    al perfil: sus encabezados salen de inmediato y el perfil solo aparece en /meta/perfiles.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _solicitado(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # registro_usuarios puede consultar la base de datos: fuera del event loop
+        if not await run_in_threadpool(_es_administrador, scope):
+            await self.app(scope, receive, send)
+            return
+
+        muestreador = MuestreadorPeticion(scope, sys._getframe())
+        respuesta_iniciada = [None]
+
+        async def enviar(mensaje):
+            # Los encabezados salen antes de terminar el perfil: se retiene el inicio de la
+            # respuesta hasta que la aplicación envía el cuerpo completo. Un streaming puede
+            # tardar indefinidamente en su primer fragmento, así que su inicio no se retiene
+            if mensaje["type"] == "http.response.start":
+                if "content-length" in MutableHeaders(scope=mensaje):
+                    respuesta_iniciada[0] = mensaje
+                    return
+            elif mensaje["type"] == "http.response.body" and not mensaje.get("more_body", False):
+                muestreador.detener()
+                id_perfil = await run_in_threadpool(_guardar_perfil, muestreador)
+                inicio = respuesta_iniciada[0]
+                if inicio is not None:
+                    encabezados = MutableHeaders(scope=inicio)
+                    encabezados.append("X-Perfil-Muestras", str(muestreador.muestras))
+                    if id_perfil is not None:
+                        encabezados.append("X-Perfil-Id", id_perfil)
+                        encabezados.append("X-Perfil-Url", f"/meta/perfiles/{id_perfil}")
+                    await send(inicio)
+                    respuesta_iniciada[0] = None
+            elif respuesta_iniciada[0] is not None:
+                await send(respuesta_iniciada[0])
+                respuesta_iniciada[0] = None
+            await send(mensaje)
+
+        muestreador.iniciar()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            muestreador.detener()
@@ -0,0 +1,34 @@
+from typing import List, Optional, Sequence
+
+
+def resolver_campos(
+    fields: Optional[str],
+    disponibles: Sequence[str],
+    obligatorios: Sequence[str] = ()
+) -> List[str]:
+    """
+    Convierte el parámetro `fields` ("campo1,campo2,...") en la lista de columnas a consultar.
+
+    - Sin `fields` se retornan todas las columnas disponibles.
+    - Los campos obligatorios (claves) se incluyen siempre.
+    - El resultado conserva el orden de `disponibles`, así la consulta es estable.
+    - Lanza ValueError si se pide un campo que no existe.
+    """
+    if not fields or not fields.strip():
+        return list(disponibles)
+
+    solicitados = {campo.strip() for campo in fields.split(",") if campo.strip()}
+    desconocidos = sorted(solicitados - set(disponibles))
+    if desconocidos:
+        raise ValueError(
+            f"Campos no válidos: {', '.join(desconocidos)}. "
+            f"Campos disponibles: {', '.join(disponibles)}"
+        )
+
+    solicitados.update(obligatorios)
+    return [campo for campo in disponibles if campo in solicitados]
+
+
+def columnas_sql(tabla: str, campos: Sequence[str]) -> str:
+    """Lista de columnas calificadas con la tabla para un SELECT"""
+    return ", ".join(f"{tabla}.{campo}" for campo in campos)
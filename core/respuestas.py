@@ -0,0 +1,33 @@
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+
+import orjson
+from fastapi.responses import Response
+
+
+def _por_defecto(valor: Any):
+    """Tipos que orjson no serializa por sí solo y que llegan desde las filas de la base de datos"""
+    if isinstance(valor, Mapping):
+        return dict(valor)
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+class RespuestaFilasORJSON(Response):
+    """
+    Respuesta JSON que serializa las filas de la base de datos (RowMapping) directamente
+    a bytes con orjson, sin construir un modelo Pydantic por fila ni pasar por jsonable_encoder.
+
+    Al retornar una Response, FastAPI omite la validación del response_model, por lo que
+    las consultas que la usan deben seleccionar exactamente las columnas del modelo.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_por_defecto)
+
+
+def respuesta_rapida(filas: Iterable, headers: Optional[Dict[str, str]] = None) -> RespuestaFilasORJSON:
+    return RespuestaFilasORJSON(list(filas), headers=headers)
@@ -1,18 +1,75 @@
+import atexit
+import hashlib
+import multiprocessing
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from core.config import settings
 
-# Configurar hashing de contraseñas
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Configurar hashing de contraseñas (un hash con otros parámetros queda "deprecated" y se actualiza al iniciar sesión)
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+# argon2 ocupa la CPU decenas de milisegundos por operación: se ejecuta en un pool de
+# procesos acotado (HASH_PROCESOS) para no bloquear el event loop ni competir por el GIL
+_pool_hash: Optional[ProcessPoolExecutor] = None
+_lock_pool = threading.Lock()
+
+def _obtener_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool_hash
+    if settings.HASH_PROCESOS <= 0:
+        return None
+    if _pool_hash is None:
+        with _lock_pool:
+            if _pool_hash is None:
+                # "spawn" evita heredar por fork los hilos y conexiones del servidor
+                _pool_hash = ProcessPoolExecutor(
+                    max_workers=settings.HASH_PROCESOS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool_hash
+
+@atexit.register
+def _cerrar_pool() -> None:
+    if _pool_hash is not None:
+        _pool_hash.shutdown(wait=False, cancel_futures=True)
+
+def _ejecutar(funcion, *args):
+    pool = _obtener_pool()
+    if pool is None:
+        return funcion(*args)
+    return pool.submit(funcion, *args).result()
+
+# Funciones que corren dentro de los procesos del pool (deben ser de módulo para poder enviarse)
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verificar(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def _verificar_y_actualizar(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
 
 # Función para generar un hashed_password
 def get_hashed_password(password: str):
-    return pwd_context.hash(password)
+    return _ejecutar(_hash, password)
 
 # Función para verificar una contraseña hashada
 def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+    return _ejecutar(_verificar, plain_password, hashed_password)
+
+# Verifica la contraseña y, si el hash usa parámetros anteriores, retorna también el hash nuevo
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return _ejecutar(_verificar_y_actualizar, plain_password, hashed_password)
 
 # Función para crear un token JWT
 def create_access_token(data: dict):
@@ -22,15 +79,35 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
-# Función para verificar si un token JWT es valido
-def verify_token(token: str):
+# Refresh tokens: valores aleatorios opacos (no JWT). Como tienen 256 bits de entropía basta
+# con guardar su SHA-256; no necesitan argon2, así que renovar la sesión cuesta microsegundos
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+# Genera un refresh token nuevo; retorna (token para el cliente, hash para la base de datos)
+def create_refresh_token() -> Tuple[str, str]:
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+# Identificador de la familia de refresh tokens de un login (las rotaciones la heredan)
+def create_token_family() -> str:
+    return secrets.token_hex(16)
+
+# Función para decodificar un token JWT y obtener sus claims (None si no es valido)
+def decode_token(token: str):
     try:
-        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        user_id = payload.get("sub")
-        return int(user_id) if user_id is not None else None
+        return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
     except jwt.ExpiredSignatureError: # Token ha expirado
         print("Token expirado")
         return None
     except JWTError as e:
         print("Error al decodificar el token:", str(e))
-        return None
\ No newline at end of file
+        return None
+
+# Función para verificar si un token JWT es valido
+def verify_token(token: str):
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    user_id = payload.get("sub")
+    return int(user_id) if user_id is not None else None
\ No newline at end of file
@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.config import settings
+from core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Entidades con fila en data_version (los triggers de mi_db.sql la incrementan en cada escritura,
+# también en las tablas hijas cuando el padre cambia su llave con ON UPDATE CASCADE). Todas las
+# escrituras de una entidad se serializan en su fila de data_version hasta el commit.
+# "rpt" no es una tabla: cambia cuando se recalculan las instantáneas de reportes (rpt_*) y cuando
+# sp_rpt_marcar_todos las marca para reconstruirlas
+TABLAS_VERSIONADAS = ("convenios", "instituciones", "homologacion", "municipio", "estadistica_categoria", "usuario", "rpt")
+
+
+def _validar(tablas: Iterable[str]) -> List[str]:
+    tablas = list(dict.fromkeys(tablas))
+    for tabla in tablas:
+        if tabla not in TABLAS_VERSIONADAS:
+            raise ValueError(f"La tabla '{tabla}' no tiene versión")
+    return tablas
+
+
+def leer_versiones(conexion, tablas: Iterable[str]) -> Dict[str, Tuple[int, Optional[object]]]:
+    """
+    Lee (versión, fecha de la última escritura) de cada tabla desde data_version.
+    Son búsquedas por llave primaria: el costo no depende del tamaño de las tablas.
+    """
+    tablas = _validar(tablas)
+    query = text(
+        "SELECT entidad, version, fecha_actualizacion FROM data_version WHERE entidad IN :tablas"
+    ).bindparams(bindparam("tablas", expanding=True))
+    filas = conexion.execute(query, {"tablas": tablas}).mappings()
+    versiones = {tabla: (0, None) for tabla in tablas}
+    for fila in filas:
+        versiones[fila["entidad"]] = (int(fila["version"]), fila["fecha_actualizacion"])
+    return versiones
+
+
+class RegistroVersiones:
+    """
+    Copia en memoria de data_version compartida por las cachés de lectura y los ETags.
+
+    Se refresca con una sola consulta como máximo cada VERSIONES_REFRESCO segundos, así
+    una escritura hecha en otro worker se nota en ese plazo sin consultar la base de datos
+    en cada lectura. Las escrituras de este proceso llaman a invalidar() y se notan de inmediato.
+
+    Un solo hilo consulta a la vez y fuera del lock: los demás siguen con la copia anterior.
+    Si la consulta falla no se reintenta durante VERSIONES_REINTENTO segundos, así una base de
+    datos lenta o caída no deja a todos los hilos esperando su propio timeout de conexión.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versiones: Dict[str, int] = {}
+        self._cargado_en: Optional[float] = None
+        self._fallo_en: Optional[float] = None
+        self._refrescando = False
+        # Cambia con cada invalidar(): una consulta que empezó antes no deja la copia como vigente
+        self._generacion = 0
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._cargado_en = None
+            self._generacion += 1
+
+    def _vigente(self) -> bool:
+        return self._cargado_en is not None and time.monotonic() - self._cargado_en < settings.VERSIONES_REFRESCO
+
+    def _en_espera(self) -> bool:
+        return self._fallo_en is not None and time.monotonic() - self._fallo_en < settings.VERSIONES_REINTENTO
+
+    def _refrescar(self) -> None:
+        with self._lock:
+            # Otro hilo pudo refrescar, estar refrescando o haber fallado hace poco
+            if self._refrescando or self._vigente() or self._en_espera():
+                return
+            self._refrescando = True
+            generacion = self._generacion
+        try:
+            with engine.connect() as conexion:
+                versiones = leer_versiones(conexion, TABLAS_VERSIONADAS)
+            with self._lock:
+                self._versiones = {tabla: version for tabla, (version, _) in versiones.items()}
+                self._fallo_en = None
+                if generacion == self._generacion:
+                    self._cargado_en = time.monotonic()
+        except SQLAlchemyError as e:
+            # Se conserva la última copia conocida (o ninguna) hasta que la base de datos responda
+            logger.error(f"No se pudo refrescar data_version: {e}")
+            with self._lock:
+                self._fallo_en = time.monotonic()
+        finally:
+            with self._lock:
+                self._refrescando = False
+
+    def versiones(self, tablas: Iterable[str]) -> Optional[Tuple[int, ...]]:
+        """
+        Versiones actuales de las tablas, en el orden dado; None si todavía no se pudieron leer
+        (p. ej. la primera consulta está en curso en otro hilo o falló)
+        """
+        tablas = _validar(tablas)
+        if not self._vigente():
+            self._refrescar()
+        if not self._versiones:
+            return None
+        return tuple(self._versiones.get(tabla, 0) for tabla in tablas)
+
+
+registro_versiones = RegistroVersiones()
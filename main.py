@@ -1,5 +1,7 @@
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.router import usuarios as users
 from app.router import cargar_archivos as cargar
@@ -10,8 +12,23 @@ from app.router import homologaciones_router as homologaciones
 from app.router import municipio
 from app.router import estadistica_router as estadisticas
 from app.router import meta
+from app.router import reportes
+from app.router import analitica
+from app.crud.reportes import iniciar_refresco_reportes
+from core.instrumentacion import MiddlewareInstrumentacion
+from core.metricas import MiddlewareMetricas
+from core.perfilado import MiddlewarePerfilado
+from core.busqueda import completar_normalizadas
 
-app = FastAPI()
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # Columnas *_norm de filas escritas fuera de la aplicación (datos iniciales, migraciones)
+    await run_in_threadpool(completar_normalizadas)
+    iniciar_refresco_reportes()
+    yield
+
+app = FastAPI(lifespan=ciclo_de_vida)
 
 # Incluir en el objeto app los routers
 app.include_router(auth.router, prefix="/access", tags=["servicios de login"])
@@ -23,6 +40,8 @@ app.include_router(municipio.router, prefix="/municipio", tags=["Servicios de mu
 app.include_router(homologaciones.router, prefix="/homologaciones", tags=["Servicios de homologaciones"]) 
 app.include_router(estadisticas.router, prefix="/estadisticas", tags=["Estadisticas secundarias"]) 
 app.include_router(meta.router, prefix="/meta", tags=["Metadatos"])
+app.include_router(reportes.router, prefix="/reportes", tags=["Reportes"])
+app.include_router(analitica.router, prefix="/analitica", tags=["Analítica"])
 
 
 # Configuración de CORS para permitir todas las solicitudes desde cualquier origen
@@ -34,6 +53,13 @@ app.add_middleware(
     allow_headers=["*"],  # Permitir cualquier encabezado en las solicitudes
 )
 
+# Consultas SQL y tiempo de base de datos por petición (encabezado Server-Timing y /meta/sql)
+app.add_middleware(MiddlewareInstrumentacion)
+# Latencia y códigos de estado por ruta para /meta/metrics
+app.add_middleware(MiddlewareMetricas)
+# Perfil de una petición a pedido de un administrador (X-Perfilar: 1), el más externo para medirla completa
+app.add_middleware(MiddlewarePerfilado)
+
 @app.get("/")
 def read_root():
     return {
@@ -45,7 +45,14 @@ CREATE TABLE usuario (
 CREATE TABLE municipio ( 
     id_municipio VARCHAR(20) PRIMARY KEY,
     nom_municipio VARCHAR(80) NOT NULL,
-    INDEX idx_nombre_municipio (nom_municipio)
+    -- Columna normalizada para búsquedas por prefijo con índice. La llena la aplicación con
+    -- core.busqueda.normalizar_texto (minúsculas, sin tildes, espacios simples); si se escribe
+    -- nom_municipio por fuera de ella, dejarla en NULL: se completa al iniciar la aplicación
+    nom_municipio_norm VARCHAR(80) COLLATE utf8mb4_bin DEFAULT NULL,
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_nombre_municipio (nom_municipio),
+    INDEX idx_nombre_municipio_norm (nom_municipio_norm),
+    INDEX idx_fecha_actualizacion (fecha_actualizacion)
 ) ENGINE=InnoDB COMMENT='Municipios de Risaralda';
 
 -- ------------------------------------------------------------
@@ -60,10 +67,19 @@ CREATE TABLE instituciones (
     cant_convenios TINYINT UNSIGNED DEFAULT 0,
     fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    -- Columnas normalizadas para búsquedas por prefijo con índice (las llena la aplicación,
+    -- igual que municipio.nom_municipio_norm)
+    nombre_institucion_norm VARCHAR(100) COLLATE utf8mb4_bin DEFAULT NULL,
+    nit_institucion_norm VARCHAR(20) COLLATE utf8mb4_bin DEFAULT NULL,
+    direccion_norm VARCHAR(100) COLLATE utf8mb4_bin DEFAULT NULL,
     FOREIGN KEY (id_municipio) REFERENCES municipio(id_municipio) ON DELETE RESTRICT ON UPDATE CASCADE,
     INDEX idx_nombre_institucion (nombre_institucion),
+    INDEX idx_nombre_institucion_norm (nombre_institucion_norm),
+    INDEX idx_nit_institucion_norm (nit_institucion_norm),
+    INDEX idx_direccion_norm (direccion_norm),
     INDEX idx_municipio (id_municipio),
-    INDEX idx_cant_convenios (cant_convenios)
+    INDEX idx_cant_convenios (cant_convenios),
+    INDEX idx_fecha_actualizacion (fecha_actualizacion)
 ) ENGINE=InnoDB COMMENT='Instituciones con convenios';
 
 -- ------------------------------------------------------------
@@ -96,13 +112,19 @@ CREATE TABLE convenios (
     enlace_evidencias TEXT,
     fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    -- Columna normalizada para búsquedas por prefijo con índice (la llena la aplicación,
+    -- igual que municipio.nom_municipio_norm)
+    supervisor_norm VARCHAR(400) COLLATE utf8mb4_bin DEFAULT NULL,
     FOREIGN KEY (nit_institucion) REFERENCES instituciones(nit_institucion) ON DELETE RESTRICT ON UPDATE CASCADE,
     UNIQUE KEY uk_convenio_unico (num_convenio, nit_institucion),
+    INDEX idx_supervisor_norm (supervisor_norm(100)),
+    INDEX idx_supervisor (supervisor(100)),
     INDEX idx_estado_convenio (estado_convenio),
     INDEX idx_tipo_convenio_sena (tipo_convenio_sena),
     INDEX idx_persona_apoyo (persona_apoyo_fpi),
     INDEX idx_fecha_firma (fecha_firma),
-    INDEX idx_nit_institucion (nit_institucion)
+    INDEX idx_nit_institucion (nit_institucion),
+    INDEX idx_fecha_actualizacion (fecha_actualizacion)
 ) ENGINE=InnoDB COMMENT='Convenios interinstitucionales';
 
 -- ------------------------------------------------------------
@@ -133,7 +155,8 @@ CREATE TABLE homologacion (
     INDEX idx_nivel_programa (nivel_programa),
     INDEX idx_regional (regional),
     INDEX idx_programa_ies (programa_ies),
-    INDEX idx_nit_institucion (nit_institucion_destino)
+    INDEX idx_nit_institucion (nit_institucion_destino),
+    INDEX idx_fecha_actualizacion (fecha_actualizacion)
 ) ENGINE=InnoDB COMMENT='Homologaciones de programas académicos';
 
 -- ------------------------------------------------------------
@@ -156,6 +179,140 @@ CREATE TABLE estadistica_categoria (
     INDEX idx_cantidad (cantidad DESC)
 ) ENGINE=InnoDB COMMENT='Estadísticas unificadas del sistema';
 
+-- ------------------------------------------------------------
+-- Tabla: refresh_token
+-- Descripción: Tokens de renovación de sesión (solo se guarda su hash SHA-256)
+-- ------------------------------------------------------------
+CREATE TABLE refresh_token (
+    id_refresh_token INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    id_usuario INT UNSIGNED NOT NULL,
+    token_hash CHAR(64) NOT NULL,
+    familia CHAR(32) NOT NULL,
+    expira DATETIME NOT NULL,
+    revocado BOOLEAN DEFAULT FALSE,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (id_usuario) REFERENCES usuario(id_usuario) ON DELETE CASCADE,
+    UNIQUE KEY uk_token_hash (token_hash),
+    INDEX idx_familia (familia),
+    INDEX idx_usuario_revocado (id_usuario, revocado),
+    INDEX idx_expira (expira)
+) ENGINE=InnoDB COMMENT='Tokens de renovación de sesión';
+
+-- ------------------------------------------------------------
+-- Tabla: data_version
+-- Descripción: Versión de cada entidad; los triggers la incrementan en cada escritura
+-- ------------------------------------------------------------
+CREATE TABLE data_version (
+    entidad VARCHAR(40) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+) ENGINE=InnoDB COMMENT='Versión por entidad para cachés, ETags y última actualización';
+
+-- ------------------------------------------------------------
+-- Tabla: registro_eliminados
+-- Descripción: Lápidas (tombstones) de filas eliminadas para el feed de cambios
+-- ------------------------------------------------------------
+CREATE TABLE registro_eliminados (
+    id_eliminado BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    entidad VARCHAR(40) NOT NULL,
+    clave VARCHAR(40) NOT NULL,
+    fecha_eliminacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_entidad_fecha (entidad, fecha_eliminacion),
+    INDEX idx_fecha_eliminacion (fecha_eliminacion)
+) ENGINE=InnoDB COMMENT='Filas eliminadas de convenios, instituciones, homologacion y municipio';
+
+-- ------------------------------------------------------------
+-- Tabla: registro_eliminados_purga
+-- Descripción: Fecha hasta la que se purgaron las lápidas; con un cursor anterior ya no
+-- se puede saber qué se eliminó y /meta/cambios responde 410
+-- ------------------------------------------------------------
+CREATE TABLE registro_eliminados_purga (
+    id TINYINT UNSIGNED PRIMARY KEY,
+    purgado_hasta TIMESTAMP NULL DEFAULT NULL
+) ENGINE=InnoDB COMMENT='Límite de la última purga de registro_eliminados';
+
+-- ------------------------------------------------------------
+-- Tablas: rpt_* (instantáneas de las vistas de reportes)
+-- Descripción: Mismas columnas que las vistas v_*, guardadas por clave. Los triggers
+-- marcan en rpt_pendientes las claves afectadas por cada escritura y un hilo de la API
+-- recalcula solo esas claves en segundo plano; las lecturas usan el índice idx_orden.
+-- ------------------------------------------------------------
+CREATE TABLE rpt_pendientes (
+    reporte VARCHAR(30) NOT NULL,
+    clave VARCHAR(400) NOT NULL,
+    marca INT UNSIGNED NOT NULL DEFAULT 0 COMMENT 'Cambia si la clave se vuelve a marcar durante un refresco',
+    PRIMARY KEY (reporte, clave)
+) ENGINE=InnoDB COMMENT='Claves de reportes pendientes de recalcular';
+
+CREATE TABLE rpt_top_instituciones (
+    nit_institucion VARCHAR(20) PRIMARY KEY,
+    nombre_institucion VARCHAR(100),
+    cant_convenios TINYINT UNSIGNED,
+    nom_municipio VARCHAR(80),
+    monto_total_convenios DECIMAL(17,2) NOT NULL DEFAULT 0,
+    total_convenios_activos INT NOT NULL DEFAULT 0,
+    INDEX idx_orden (cant_convenios DESC, monto_total_convenios DESC)
+) ENGINE=InnoDB COMMENT='Instantánea de v_top_instituciones';
+
+CREATE TABLE rpt_carga_supervisores (
+    supervisor VARCHAR(400) PRIMARY KEY,
+    total_convenios INT NOT NULL DEFAULT 0,
+    convenios_activos INT NOT NULL DEFAULT 0,
+    convenios_finalizados INT NOT NULL DEFAULT 0,
+    monto_total_supervisado DECIMAL(17,2) NOT NULL DEFAULT 0,
+    monto_promedio DECIMAL(17,2) NOT NULL DEFAULT 0,
+    INDEX idx_orden (total_convenios DESC, monto_total_supervisado DESC)
+) ENGINE=InnoDB COMMENT='Instantánea de v_carga_supervisores';
+
+CREATE TABLE rpt_convenios_por_municipio (
+    id_municipio VARCHAR(20) PRIMARY KEY,
+    nom_municipio VARCHAR(80),
+    total_instituciones INT NOT NULL DEFAULT 0,
+    total_convenios INT NOT NULL DEFAULT 0,
+    monto_total DECIMAL(17,2) NOT NULL DEFAULT 0,
+    INDEX idx_orden (total_convenios DESC, monto_total DESC)
+) ENGINE=InnoDB COMMENT='Instantánea de v_convenios_por_municipio';
+
+CREATE TABLE rpt_resumen_homologaciones (
+    nit_institucion VARCHAR(20) PRIMARY KEY,
+    nombre_institucion VARCHAR(100),
+    total_homologaciones INT NOT NULL DEFAULT 0,
+    total_creditos_homologados BIGINT,
+    promedio_creditos DECIMAL(10,2),
+    modalidades_diferentes INT NOT NULL DEFAULT 0,
+    niveles_diferentes INT NOT NULL DEFAULT 0,
+    INDEX idx_orden (total_homologaciones DESC)
+) ENGINE=InnoDB COMMENT='Instantánea de v_resumen_homologaciones';
+
+CREATE TABLE rpt_convenios_activos (
+    tipo_convenio_sena VARCHAR(50) PRIMARY KEY COMMENT 'Cadena vacía = convenios sin tipo',
+    cantidad_activos INT NOT NULL DEFAULT 0,
+    monto_total DECIMAL(17,2),
+    monto_promedio DECIMAL(17,2),
+    fecha_primer_convenio VARCHAR(50),
+    fecha_ultimo_convenio VARCHAR(50),
+    supervisores_distintos INT NOT NULL DEFAULT 0,
+    INDEX idx_orden (cantidad_activos DESC)
+) ENGINE=InnoDB COMMENT='Instantánea de v_estadisticas_convenios_activos';
+
+-- ------------------------------------------------------------
+-- Tabla: estadistica_periodo
+-- Descripción: Convenios y montos por mes de fecha_firma y de fecha_inicio, por tipo de
+-- convenio SENA y estado. Los trimestres y años se suman a partir de los meses al leer.
+-- La mantienen los triggers de convenios; las fechas que no empiezan por YYYY-MM se omiten.
+-- ------------------------------------------------------------
+CREATE TABLE estadistica_periodo (
+    campo_fecha ENUM('firma', 'inicio') NOT NULL COMMENT 'Fecha del convenio que define el periodo',
+    anio SMALLINT UNSIGNED NOT NULL,
+    mes TINYINT UNSIGNED NOT NULL,
+    tipo_convenio_sena VARCHAR(50) NOT NULL DEFAULT '' COMMENT 'Cadena vacía = convenios sin tipo',
+    estado_convenio VARCHAR(50) NOT NULL DEFAULT '' COMMENT 'Cadena vacía = convenios sin estado',
+    cantidad INT NOT NULL DEFAULT 0,
+    suma_total DECIMAL(17,2) NOT NULL DEFAULT 0 COMMENT 'Suma de precio_estimado',
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (campo_fecha, anio, mes, tipo_convenio_sena, estado_convenio)
+) ENGINE=InnoDB COMMENT='Estadísticas de convenios por periodo';
+
 
 -- ============================================================
 -- SECCIÓN 2: TRIGGERS
@@ -795,6 +952,354 @@ BEGIN
     END IF;
 END$$
 
+
+-- ------------------------------------------------------------
+-- TRIGGERS PARA TABLA: data_version
+-- Descripción: Incrementar la versión de la entidad en cada INSERT, UPDATE o DELETE
+-- (incluye las escrituras hechas por otros triggers, cargas masivas y procedimientos)
+-- Los cambios que propaga ON UPDATE CASCADE no disparan triggers en las tablas hijas:
+-- el trigger de UPDATE del padre incrementa también la versión de las hijas cuando
+-- cambia la llave (municipio -> instituciones; instituciones -> convenios y
+-- homologacion; rol -> usuario).
+-- Cada escritura actualiza la misma fila de su entidad en data_version y la mantiene
+-- bloqueada hasta el commit: todas las escrituras concurrentes de una entidad se
+-- serializan en esa fila. Las cargas masivas deben confirmar en lotes cortos.
+-- ------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS tr_convenios_version_insert$$
+CREATE TRIGGER tr_convenios_version_insert
+AFTER INSERT ON convenios
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'convenios'$$
+
+DROP TRIGGER IF EXISTS tr_convenios_version_update$$
+CREATE TRIGGER tr_convenios_version_update
+AFTER UPDATE ON convenios
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'convenios'$$
+
+DROP TRIGGER IF EXISTS tr_convenios_version_delete$$
+CREATE TRIGGER tr_convenios_version_delete
+AFTER DELETE ON convenios
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'convenios'$$
+
+DROP TRIGGER IF EXISTS tr_instituciones_version_insert$$
+CREATE TRIGGER tr_instituciones_version_insert
+AFTER INSERT ON instituciones
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'instituciones'$$
+
+DROP TRIGGER IF EXISTS tr_instituciones_version_update$$
+CREATE TRIGGER tr_instituciones_version_update
+AFTER UPDATE ON instituciones
+FOR EACH ROW
+BEGIN
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'instituciones';
+    -- El NIT nuevo llega a convenios y homologacion por ON UPDATE CASCADE, sin sus triggers
+    IF NOT (OLD.nit_institucion <=> NEW.nit_institucion) THEN
+        UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+        WHERE entidad IN ('convenios', 'homologacion');
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS tr_instituciones_version_delete$$
+CREATE TRIGGER tr_instituciones_version_delete
+AFTER DELETE ON instituciones
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'instituciones'$$
+
+DROP TRIGGER IF EXISTS tr_homologacion_version_insert$$
+CREATE TRIGGER tr_homologacion_version_insert
+AFTER INSERT ON homologacion
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'homologacion'$$
+
+DROP TRIGGER IF EXISTS tr_homologacion_version_update$$
+CREATE TRIGGER tr_homologacion_version_update
+AFTER UPDATE ON homologacion
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'homologacion'$$
+
+DROP TRIGGER IF EXISTS tr_homologacion_version_delete$$
+CREATE TRIGGER tr_homologacion_version_delete
+AFTER DELETE ON homologacion
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'homologacion'$$
+
+DROP TRIGGER IF EXISTS tr_municipio_version_insert$$
+CREATE TRIGGER tr_municipio_version_insert
+AFTER INSERT ON municipio
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'municipio'$$
+
+DROP TRIGGER IF EXISTS tr_municipio_version_update$$
+CREATE TRIGGER tr_municipio_version_update
+AFTER UPDATE ON municipio
+FOR EACH ROW
+BEGIN
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'municipio';
+    -- El id nuevo llega a instituciones por ON UPDATE CASCADE, sin sus triggers
+    IF NOT (OLD.id_municipio <=> NEW.id_municipio) THEN
+        UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+        WHERE entidad = 'instituciones';
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS tr_municipio_version_delete$$
+CREATE TRIGGER tr_municipio_version_delete
+AFTER DELETE ON municipio
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'municipio'$$
+
+DROP TRIGGER IF EXISTS tr_estadistica_categoria_version_insert$$
+CREATE TRIGGER tr_estadistica_categoria_version_insert
+AFTER INSERT ON estadistica_categoria
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'estadistica_categoria'$$
+
+DROP TRIGGER IF EXISTS tr_estadistica_categoria_version_update$$
+CREATE TRIGGER tr_estadistica_categoria_version_update
+AFTER UPDATE ON estadistica_categoria
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'estadistica_categoria'$$
+
+DROP TRIGGER IF EXISTS tr_estadistica_categoria_version_delete$$
+CREATE TRIGGER tr_estadistica_categoria_version_delete
+AFTER DELETE ON estadistica_categoria
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'estadistica_categoria'$$
+
+DROP TRIGGER IF EXISTS tr_usuario_version_insert$$
+CREATE TRIGGER tr_usuario_version_insert
+AFTER INSERT ON usuario
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'usuario'$$
+
+DROP TRIGGER IF EXISTS tr_usuario_version_update$$
+CREATE TRIGGER tr_usuario_version_update
+AFTER UPDATE ON usuario
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'usuario'$$
+
+DROP TRIGGER IF EXISTS tr_usuario_version_delete$$
+CREATE TRIGGER tr_usuario_version_delete
+AFTER DELETE ON usuario
+FOR EACH ROW
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'usuario'$$
+
+-- El id nuevo llega a usuario por ON UPDATE CASCADE, sin sus triggers
+DROP TRIGGER IF EXISTS tr_rol_version_update$$
+CREATE TRIGGER tr_rol_version_update
+AFTER UPDATE ON rol
+FOR EACH ROW
+    IF NOT (OLD.id_rol <=> NEW.id_rol) THEN
+        UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+        WHERE entidad = 'usuario';
+    END IF$$
+
+
+-- ------------------------------------------------------------
+-- TRIGGERS PARA TABLA: registro_eliminados
+-- Descripción: Registrar la clave de cada fila eliminada (feed de cambios /meta/cambios)
+-- ------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS tr_convenios_registro_eliminados$$
+CREATE TRIGGER tr_convenios_registro_eliminados
+AFTER DELETE ON convenios
+FOR EACH ROW
+    INSERT INTO registro_eliminados (entidad, clave) VALUES ('convenios', OLD.id_convenio)$$
+
+DROP TRIGGER IF EXISTS tr_instituciones_registro_eliminados$$
+CREATE TRIGGER tr_instituciones_registro_eliminados
+AFTER DELETE ON instituciones
+FOR EACH ROW
+    INSERT INTO registro_eliminados (entidad, clave) VALUES ('instituciones', OLD.nit_institucion)$$
+
+DROP TRIGGER IF EXISTS tr_homologacion_registro_eliminados$$
+CREATE TRIGGER tr_homologacion_registro_eliminados
+AFTER DELETE ON homologacion
+FOR EACH ROW
+    INSERT INTO registro_eliminados (entidad, clave) VALUES ('homologacion', OLD.id_homologacion)$$
+
+DROP TRIGGER IF EXISTS tr_municipio_registro_eliminados$$
+CREATE TRIGGER tr_municipio_registro_eliminados
+AFTER DELETE ON municipio
+FOR EACH ROW
+    INSERT INTO registro_eliminados (entidad, clave) VALUES ('municipio', OLD.id_municipio)$$
+
+
+-- ------------------------------------------------------------
+-- TRIGGERS PARA TABLAS: rpt_* (reportes)
+-- Descripción: Marcar en rpt_pendientes las claves de reporte afectadas por la escritura.
+-- Solo se marca (una fila por clave, sin duplicados): el recálculo se hace después,
+-- una vez por clave, aunque una importación escriba miles de convenios.
+-- ------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS tr_convenios_rpt_insert$$
+CREATE TRIGGER tr_convenios_rpt_insert
+AFTER INSERT ON convenios
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar_convenio(NEW.nit_institucion, NEW.supervisor, NEW.tipo_convenio_sena);
+END$$
+
+DROP TRIGGER IF EXISTS tr_convenios_rpt_update$$
+CREATE TRIGGER tr_convenios_rpt_update
+AFTER UPDATE ON convenios
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar_convenio(OLD.nit_institucion, OLD.supervisor, OLD.tipo_convenio_sena);
+    CALL sp_rpt_marcar_convenio(NEW.nit_institucion, NEW.supervisor, NEW.tipo_convenio_sena);
+END$$
+
+DROP TRIGGER IF EXISTS tr_convenios_rpt_delete$$
+CREATE TRIGGER tr_convenios_rpt_delete
+AFTER DELETE ON convenios
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar_convenio(OLD.nit_institucion, OLD.supervisor, OLD.tipo_convenio_sena);
+END$$
+
+DROP TRIGGER IF EXISTS tr_instituciones_rpt_insert$$
+CREATE TRIGGER tr_instituciones_rpt_insert
+AFTER INSERT ON instituciones
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar_institucion(NEW.nit_institucion, NEW.id_municipio);
+END$$
+
+DROP TRIGGER IF EXISTS tr_instituciones_rpt_update$$
+CREATE TRIGGER tr_instituciones_rpt_update
+AFTER UPDATE ON instituciones
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar_institucion(OLD.nit_institucion, OLD.id_municipio);
+    CALL sp_rpt_marcar_institucion(NEW.nit_institucion, NEW.id_municipio);
+END$$
+
+DROP TRIGGER IF EXISTS tr_instituciones_rpt_delete$$
+CREATE TRIGGER tr_instituciones_rpt_delete
+AFTER DELETE ON instituciones
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar_institucion(OLD.nit_institucion, OLD.id_municipio);
+END$$
+
+DROP TRIGGER IF EXISTS tr_homologacion_rpt_insert$$
+CREATE TRIGGER tr_homologacion_rpt_insert
+AFTER INSERT ON homologacion
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar('resumen_homologaciones', NEW.nit_institucion_destino);
+END$$
+
+DROP TRIGGER IF EXISTS tr_homologacion_rpt_update$$
+CREATE TRIGGER tr_homologacion_rpt_update
+AFTER UPDATE ON homologacion
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar('resumen_homologaciones', OLD.nit_institucion_destino);
+    CALL sp_rpt_marcar('resumen_homologaciones', NEW.nit_institucion_destino);
+END$$
+
+DROP TRIGGER IF EXISTS tr_homologacion_rpt_delete$$
+CREATE TRIGGER tr_homologacion_rpt_delete
+AFTER DELETE ON homologacion
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar('resumen_homologaciones', OLD.nit_institucion_destino);
+END$$
+
+DROP TRIGGER IF EXISTS tr_municipio_rpt_insert$$
+CREATE TRIGGER tr_municipio_rpt_insert
+AFTER INSERT ON municipio
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar('convenios_por_municipio', NEW.id_municipio);
+END$$
+
+DROP TRIGGER IF EXISTS tr_municipio_rpt_update$$
+CREATE TRIGGER tr_municipio_rpt_update
+AFTER UPDATE ON municipio
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar('convenios_por_municipio', OLD.id_municipio);
+    CALL sp_rpt_marcar('convenios_por_municipio', NEW.id_municipio);
+    -- El nombre del municipio se copia en rpt_top_instituciones
+    IF NOT (OLD.nom_municipio <=> NEW.nom_municipio) THEN
+        INSERT INTO rpt_pendientes (reporte, clave)
+        SELECT 'top_instituciones', nit_institucion FROM instituciones WHERE id_municipio = NEW.id_municipio
+        ON DUPLICATE KEY UPDATE marca = marca + 1;
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS tr_municipio_rpt_delete$$
+CREATE TRIGGER tr_municipio_rpt_delete
+AFTER DELETE ON municipio
+FOR EACH ROW
+BEGIN
+    CALL sp_rpt_marcar('convenios_por_municipio', OLD.id_municipio);
+END$$
+
+-- ------------------------------------------------------------
+-- TRIGGERS PARA TABLA: convenios - Estadísticas por periodo
+-- Descripción: Sumar o restar el convenio en su mes de firma y en su mes de inicio
+-- ------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS tr_convenios_periodo_insert$$
+CREATE TRIGGER tr_convenios_periodo_insert
+AFTER INSERT ON convenios
+FOR EACH ROW
+BEGIN
+    CALL sp_estadistica_periodo_convenio(NEW.fecha_firma, NEW.fecha_inicio,
+        NEW.tipo_convenio_sena, NEW.estado_convenio, NEW.precio_estimado, 1);
+END$$
+
+DROP TRIGGER IF EXISTS tr_convenios_periodo_update$$
+CREATE TRIGGER tr_convenios_periodo_update
+AFTER UPDATE ON convenios
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.fecha_firma <=> NEW.fecha_firma)
+       OR NOT (OLD.fecha_inicio <=> NEW.fecha_inicio)
+       OR NOT (OLD.tipo_convenio_sena <=> NEW.tipo_convenio_sena)
+       OR NOT (OLD.estado_convenio <=> NEW.estado_convenio)
+       OR NOT (OLD.precio_estimado <=> NEW.precio_estimado) THEN
+        CALL sp_estadistica_periodo_convenio(OLD.fecha_firma, OLD.fecha_inicio,
+            OLD.tipo_convenio_sena, OLD.estado_convenio, OLD.precio_estimado, -1);
+        CALL sp_estadistica_periodo_convenio(NEW.fecha_firma, NEW.fecha_inicio,
+            NEW.tipo_convenio_sena, NEW.estado_convenio, NEW.precio_estimado, 1);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS tr_convenios_periodo_delete$$
+CREATE TRIGGER tr_convenios_periodo_delete
+AFTER DELETE ON convenios
+FOR EACH ROW
+BEGIN
+    CALL sp_estadistica_periodo_convenio(OLD.fecha_firma, OLD.fecha_inicio,
+        OLD.tipo_convenio_sena, OLD.estado_convenio, OLD.precio_estimado, -1);
+END$$
+
 DELIMITER ;
 
 
@@ -1021,6 +1526,9 @@ BEGIN
     WHERE modalidad IS NOT NULL AND creditos_homologados IS NOT NULL
     GROUP BY modalidad;
     
+    -- 3. Recalcular estadísticas por periodo
+    CALL sp_recalcular_estadistica_periodo();
+    
     -- Obtener total de registros creados
     SELECT COUNT(*) INTO total_registros FROM estadistica_categoria;
     
@@ -1090,13 +1598,191 @@ BEGIN
     END IF;
 END$$
 
+
+-- ------------------------------------------------------------
+-- Procedimientos: sp_rpt_* (marcado de claves de reportes)
+-- Descripción: Usados por los triggers de reportes y por el evento de reconstrucción
+-- ------------------------------------------------------------
+DROP PROCEDURE IF EXISTS sp_rpt_marcar$$
+CREATE PROCEDURE sp_rpt_marcar(IN p_reporte VARCHAR(30), IN p_clave VARCHAR(400))
+BEGIN
+    IF p_clave IS NOT NULL THEN
+        INSERT INTO rpt_pendientes (reporte, clave) VALUES (p_reporte, p_clave)
+        ON DUPLICATE KEY UPDATE marca = marca + 1;
+    END IF;
+END$$
+
+DROP PROCEDURE IF EXISTS sp_rpt_marcar_convenio$$
+CREATE PROCEDURE sp_rpt_marcar_convenio(
+    IN p_nit VARCHAR(20),
+    IN p_supervisor VARCHAR(400),
+    IN p_tipo_convenio_sena VARCHAR(50)
+)
+BEGIN
+    CALL sp_rpt_marcar('top_instituciones', p_nit);
+    CALL sp_rpt_marcar('convenios_por_municipio',
+        (SELECT id_municipio FROM instituciones WHERE nit_institucion = p_nit));
+    CALL sp_rpt_marcar('carga_supervisores', p_supervisor);
+    CALL sp_rpt_marcar('convenios_activos', COALESCE(p_tipo_convenio_sena, ''));
+END$$
+
+DROP PROCEDURE IF EXISTS sp_rpt_marcar_institucion$$
+CREATE PROCEDURE sp_rpt_marcar_institucion(IN p_nit VARCHAR(20), IN p_id_municipio VARCHAR(20))
+BEGIN
+    CALL sp_rpt_marcar('top_instituciones', p_nit);
+    CALL sp_rpt_marcar('resumen_homologaciones', p_nit);
+    CALL sp_rpt_marcar('convenios_por_municipio', p_id_municipio);
+END$$
+
+-- Marca todas las claves (existentes en las tablas base o en las instantáneas) para
+-- reconstruir los reportes completos: carga inicial y corrección programada
+DROP PROCEDURE IF EXISTS sp_rpt_marcar_todos$$
+CREATE PROCEDURE sp_rpt_marcar_todos()
+BEGIN
+    -- Las instantáneas cambian sin escrituras en las tablas base: cachés y ETags usan esta versión
+    UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+    WHERE entidad = 'rpt';
+
+    INSERT INTO rpt_pendientes (reporte, clave)
+    SELECT reporte, clave FROM (
+        SELECT 'top_instituciones' AS reporte, nit_institucion AS clave FROM instituciones
+        UNION SELECT 'top_instituciones', nit_institucion FROM rpt_top_instituciones
+        UNION SELECT 'resumen_homologaciones', nit_institucion FROM instituciones
+        UNION SELECT 'resumen_homologaciones', nit_institucion FROM rpt_resumen_homologaciones
+        UNION SELECT 'convenios_por_municipio', id_municipio FROM municipio
+        UNION SELECT 'convenios_por_municipio', id_municipio FROM rpt_convenios_por_municipio
+        UNION SELECT 'carga_supervisores', supervisor FROM convenios WHERE supervisor IS NOT NULL
+        UNION SELECT 'carga_supervisores', supervisor FROM rpt_carga_supervisores
+        UNION SELECT 'convenios_activos', COALESCE(tipo_convenio_sena, '') FROM convenios
+        UNION SELECT 'convenios_activos', tipo_convenio_sena FROM rpt_convenios_activos
+    ) AS claves
+    ON DUPLICATE KEY UPDATE marca = marca + 1;
+END$$
+
+-- ------------------------------------------------------------
+-- Procedimientos: sp_estadistica_periodo_* (estadísticas por periodo)
+-- Descripción: Usados por los triggers de convenios y para recalcular la tabla completa
+-- ------------------------------------------------------------
+DROP PROCEDURE IF EXISTS sp_estadistica_periodo_sumar$$
+CREATE PROCEDURE sp_estadistica_periodo_sumar(
+    IN p_campo VARCHAR(10),
+    IN p_fecha VARCHAR(50),
+    IN p_tipo_convenio_sena VARCHAR(50),
+    IN p_estado_convenio VARCHAR(50),
+    IN p_monto DECIMAL(15,2),
+    IN p_signo INT
+)
+BEGIN
+    -- Solo fechas normalizadas (YYYY-MM-DD, ver la carga de archivos); 'N/A' y texto libre se omiten
+    IF p_fecha REGEXP '^[0-9]{4}-(0[1-9]|1[0-2])' THEN
+        INSERT INTO estadistica_periodo
+            (campo_fecha, anio, mes, tipo_convenio_sena, estado_convenio, cantidad, suma_total)
+        VALUES (
+            p_campo,
+            CAST(LEFT(p_fecha, 4) AS UNSIGNED),
+            CAST(SUBSTRING(p_fecha, 6, 2) AS UNSIGNED),
+            COALESCE(p_tipo_convenio_sena, ''),
+            COALESCE(p_estado_convenio, ''),
+            GREATEST(p_signo, 0),
+            GREATEST(p_signo, 0) * COALESCE(p_monto, 0)
+        )
+        ON DUPLICATE KEY UPDATE
+            cantidad = GREATEST(cantidad + p_signo, 0),
+            suma_total = suma_total + p_signo * COALESCE(p_monto, 0);
+    END IF;
+END$$
+
+DROP PROCEDURE IF EXISTS sp_estadistica_periodo_convenio$$
+CREATE PROCEDURE sp_estadistica_periodo_convenio(
+    IN p_fecha_firma VARCHAR(50),
+    IN p_fecha_inicio VARCHAR(50),
+    IN p_tipo_convenio_sena VARCHAR(50),
+    IN p_estado_convenio VARCHAR(50),
+    IN p_monto DECIMAL(15,2),
+    IN p_signo INT
+)
+BEGIN
+    CALL sp_estadistica_periodo_sumar('firma', p_fecha_firma, p_tipo_convenio_sena, p_estado_convenio, p_monto, p_signo);
+    CALL sp_estadistica_periodo_sumar('inicio', p_fecha_inicio, p_tipo_convenio_sena, p_estado_convenio, p_monto, p_signo);
+END$$
+
+-- Recalcula estadistica_periodo desde convenios (carga inicial y corrección de desvíos)
+DROP PROCEDURE IF EXISTS sp_recalcular_estadistica_periodo$$
+CREATE PROCEDURE sp_recalcular_estadistica_periodo()
+BEGIN
+    DELETE FROM estadistica_periodo;
+
+    INSERT INTO estadistica_periodo
+        (campo_fecha, anio, mes, tipo_convenio_sena, estado_convenio, cantidad, suma_total)
+    SELECT 'firma', CAST(LEFT(fecha_firma, 4) AS UNSIGNED), CAST(SUBSTRING(fecha_firma, 6, 2) AS UNSIGNED),
+           COALESCE(tipo_convenio_sena, ''), COALESCE(estado_convenio, ''),
+           COUNT(*), COALESCE(SUM(precio_estimado), 0)
+    FROM convenios
+    WHERE fecha_firma REGEXP '^[0-9]{4}-(0[1-9]|1[0-2])'
+    GROUP BY 2, 3, 4, 5
+    UNION ALL
+    SELECT 'inicio', CAST(LEFT(fecha_inicio, 4) AS UNSIGNED), CAST(SUBSTRING(fecha_inicio, 6, 2) AS UNSIGNED),
+           COALESCE(tipo_convenio_sena, ''), COALESCE(estado_convenio, ''),
+           COUNT(*), COALESCE(SUM(precio_estimado), 0)
+    FROM convenios
+    WHERE fecha_inicio REGEXP '^[0-9]{4}-(0[1-9]|1[0-2])'
+    GROUP BY 2, 3, 4, 5;
+END$$
+
 DELIMITER ;
 
 
+-- ------------------------------------------------------------
+-- Evento: ev_purgar_registro_eliminados
+-- Descripción: Conservar las lápidas 30 días (retención del feed de cambios) y guardar
+-- el límite de la purga en registro_eliminados_purga: la API responde 410 a los cursores
+-- anteriores a ese límite, así la retención solo se define aquí; requiere event_scheduler = ON
+-- ------------------------------------------------------------
+DELIMITER $$
+CREATE EVENT IF NOT EXISTS ev_purgar_registro_eliminados
+ON SCHEDULE EVERY 1 DAY
+DO
+BEGIN
+    DECLARE v_corte TIMESTAMP DEFAULT NOW() - INTERVAL 30 DAY;
+
+    DELETE FROM registro_eliminados
+    WHERE fecha_eliminacion < v_corte;
+
+    UPDATE registro_eliminados_purga SET purgado_hasta = v_corte
+    WHERE id = 1 AND (purgado_hasta IS NULL OR purgado_hasta < v_corte);
+END$$
+DELIMITER ;
+
+-- ------------------------------------------------------------
+-- Evento: ev_rpt_reconstruir
+-- Descripción: Marcar todas las claves de reportes cada noche; el refresco en segundo
+-- plano de la API recalcula las instantáneas (corrige cualquier desvío); requiere event_scheduler = ON
+-- ------------------------------------------------------------
+CREATE EVENT IF NOT EXISTS ev_rpt_reconstruir
+ON SCHEDULE EVERY 1 DAY STARTS (CURRENT_DATE + INTERVAL 1 DAY + INTERVAL 2 HOUR)
+DO
+    CALL sp_rpt_marcar_todos();
+
+
 -- ============================================================
 -- SECCIÓN 5: INSERTS - DATOS INICIALES
 -- ============================================================
 
+-- ------------------------------------------------------------
+-- Insertar VERSIONES DE DATOS (una fila por entidad versionada)
+-- ------------------------------------------------------------
+INSERT INTO data_version (entidad) VALUES
+('convenios'),
+('instituciones'),
+('homologacion'),
+('municipio'),
+('estadistica_categoria'),
+('usuario'),
+('rpt');
+
+-- Sin purgas todavía: todos los cursores son válidos
+INSERT INTO registro_eliminados_purga (id) VALUES (1);
+
 -- ------------------------------------------------------------
 -- Insertar ROLES
 -- ------------------------------------------------------------
@@ -1193,3 +1879,715 @@ INSERT INTO estadistica_categoria (categoria, nombre, cantidad) VALUES
 ('nivel_programa', 'Especialización', 0);
 
 
+-- ============================================================
+-- SECCIÓN 6: MIGRACIONES PARA BASES EXISTENTES
+-- ============================================================
+-- Este script recrea la base desde cero. En una base ya desplegada,
+-- ejecutar manualmente las sentencias de cada migración.
+
+-- ------------------------------------------------------------
+-- Migración: columnas normalizadas para búsquedas por prefijo
+-- ------------------------------------------------------------
+-- ALTER TABLE municipio
+--     ADD COLUMN nom_municipio_norm VARCHAR(80) COLLATE utf8mb4_bin
+--         GENERATED ALWAYS AS (REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(TRIM(nom_municipio)), 'á', 'a'), 'é', 'e'), 'í', 'i'), 'ó', 'o'), 'ú', 'u'), 'ü', 'u'), 'ñ', 'n'), 'à', 'a'), 'è', 'e'), 'ì', 'i'), 'ò', 'o'), 'ù', 'u')) STORED,
+--     ADD INDEX idx_nombre_municipio_norm (nom_municipio_norm);
+--
+-- ALTER TABLE instituciones
+--     ADD COLUMN nombre_institucion_norm VARCHAR(100) COLLATE utf8mb4_bin
+--         GENERATED ALWAYS AS (REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(TRIM(nombre_institucion)), 'á', 'a'), 'é', 'e'), 'í', 'i'), 'ó', 'o'), 'ú', 'u'), 'ü', 'u'), 'ñ', 'n'), 'à', 'a'), 'è', 'e'), 'ì', 'i'), 'ò', 'o'), 'ù', 'u')) STORED,
+--     ADD COLUMN nit_institucion_norm VARCHAR(20) COLLATE utf8mb4_bin
+--         GENERATED ALWAYS AS (LOWER(TRIM(nit_institucion))) STORED,
+--     ADD COLUMN direccion_norm VARCHAR(100) COLLATE utf8mb4_bin
+--         GENERATED ALWAYS AS (REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(TRIM(direccion)), 'á', 'a'), 'é', 'e'), 'í', 'i'), 'ó', 'o'), 'ú', 'u'), 'ü', 'u'), 'ñ', 'n'), 'à', 'a'), 'è', 'e'), 'ì', 'i'), 'ò', 'o'), 'ù', 'u')) STORED,
+--     ADD INDEX idx_nombre_institucion_norm (nombre_institucion_norm),
+--     ADD INDEX idx_nit_institucion_norm (nit_institucion_norm),
+--     ADD INDEX idx_direccion_norm (direccion_norm);
+--
+-- ALTER TABLE convenios
+--     ADD COLUMN supervisor_norm VARCHAR(400) COLLATE utf8mb4_bin
+--         GENERATED ALWAYS AS (REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(TRIM(supervisor)), 'á', 'a'), 'é', 'e'), 'í', 'i'), 'ó', 'o'), 'ú', 'u'), 'ü', 'u'), 'ñ', 'n'), 'à', 'a'), 'è', 'e'), 'ì', 'i'), 'ò', 'o'), 'ù', 'u')) STORED,
+--     ADD INDEX idx_supervisor_norm (supervisor_norm(100));
+
+-- ------------------------------------------------------------
+-- Migración: fecha de actualización indexada para las versiones de tablas (ETag)
+-- ------------------------------------------------------------
+-- ALTER TABLE municipio
+--     ADD COLUMN fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+--     ADD INDEX idx_fecha_actualizacion (fecha_actualizacion);
+--
+-- ALTER TABLE instituciones ADD INDEX idx_fecha_actualizacion (fecha_actualizacion);
+-- ALTER TABLE convenios ADD INDEX idx_fecha_actualizacion (fecha_actualizacion);
+-- ALTER TABLE homologacion ADD INDEX idx_fecha_actualizacion (fecha_actualizacion);
+
+-- ------------------------------------------------------------
+-- Migración: tokens de renovación de sesión
+-- ------------------------------------------------------------
+-- CREATE TABLE refresh_token (
+--     id_refresh_token INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+--     id_usuario INT UNSIGNED NOT NULL,
+--     token_hash CHAR(64) NOT NULL,
+--     familia CHAR(32) NOT NULL,
+--     expira DATETIME NOT NULL,
+--     revocado BOOLEAN DEFAULT FALSE,
+--     fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+--     FOREIGN KEY (id_usuario) REFERENCES usuario(id_usuario) ON DELETE CASCADE,
+--     UNIQUE KEY uk_token_hash (token_hash),
+--     INDEX idx_familia (familia),
+--     INDEX idx_usuario_revocado (id_usuario, revocado),
+--     INDEX idx_expira (expira)
+-- ) ENGINE=InnoDB COMMENT='Tokens de renovación de sesión';
+
+-- ------------------------------------------------------------
+-- Migración: registro de versiones por entidad (data_version)
+-- ------------------------------------------------------------
+-- CREATE TABLE data_version (
+--     entidad VARCHAR(40) PRIMARY KEY,
+--     version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+--     fecha_actualizacion TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+-- ) ENGINE=InnoDB COMMENT='Versión por entidad para cachés, ETags y última actualización';
+--
+-- INSERT INTO data_version (entidad, version, fecha_actualizacion)
+-- SELECT 'convenios', 1, COALESCE(MAX(fecha_actualizacion), CURRENT_TIMESTAMP(6)) FROM convenios
+-- UNION ALL SELECT 'instituciones', 1, COALESCE(MAX(fecha_actualizacion), CURRENT_TIMESTAMP(6)) FROM instituciones
+-- UNION ALL SELECT 'homologacion', 1, COALESCE(MAX(fecha_actualizacion), CURRENT_TIMESTAMP(6)) FROM homologacion
+-- UNION ALL SELECT 'municipio', 1, COALESCE(MAX(fecha_actualizacion), CURRENT_TIMESTAMP(6)) FROM municipio
+-- UNION ALL SELECT 'estadistica_categoria', 1, COALESCE(MAX(fecha_actualizacion), CURRENT_TIMESTAMP(6)) FROM estadistica_categoria
+-- UNION ALL SELECT 'usuario', 1, COALESCE(MAX(fecha_actualizacion), CURRENT_TIMESTAMP(6)) FROM usuario;
+--
+-- DELIMITER $$
+-- DROP TRIGGER IF EXISTS tr_convenios_version_insert$$
+-- CREATE TRIGGER tr_convenios_version_insert
+-- AFTER INSERT ON convenios
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'convenios'$$
+--
+-- DROP TRIGGER IF EXISTS tr_convenios_version_update$$
+-- CREATE TRIGGER tr_convenios_version_update
+-- AFTER UPDATE ON convenios
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'convenios'$$
+--
+-- DROP TRIGGER IF EXISTS tr_convenios_version_delete$$
+-- CREATE TRIGGER tr_convenios_version_delete
+-- AFTER DELETE ON convenios
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'convenios'$$
+--
+-- DROP TRIGGER IF EXISTS tr_instituciones_version_insert$$
+-- CREATE TRIGGER tr_instituciones_version_insert
+-- AFTER INSERT ON instituciones
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'instituciones'$$
+--
+-- DROP TRIGGER IF EXISTS tr_instituciones_version_update$$
+-- CREATE TRIGGER tr_instituciones_version_update
+-- AFTER UPDATE ON instituciones
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'instituciones'$$
+--
+-- DROP TRIGGER IF EXISTS tr_instituciones_version_delete$$
+-- CREATE TRIGGER tr_instituciones_version_delete
+-- AFTER DELETE ON instituciones
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'instituciones'$$
+--
+-- DROP TRIGGER IF EXISTS tr_homologacion_version_insert$$
+-- CREATE TRIGGER tr_homologacion_version_insert
+-- AFTER INSERT ON homologacion
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'homologacion'$$
+--
+-- DROP TRIGGER IF EXISTS tr_homologacion_version_update$$
+-- CREATE TRIGGER tr_homologacion_version_update
+-- AFTER UPDATE ON homologacion
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'homologacion'$$
+--
+-- DROP TRIGGER IF EXISTS tr_homologacion_version_delete$$
+-- CREATE TRIGGER tr_homologacion_version_delete
+-- AFTER DELETE ON homologacion
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'homologacion'$$
+--
+-- DROP TRIGGER IF EXISTS tr_municipio_version_insert$$
+-- CREATE TRIGGER tr_municipio_version_insert
+-- AFTER INSERT ON municipio
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'municipio'$$
+--
+-- DROP TRIGGER IF EXISTS tr_municipio_version_update$$
+-- CREATE TRIGGER tr_municipio_version_update
+-- AFTER UPDATE ON municipio
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'municipio'$$
+--
+-- DROP TRIGGER IF EXISTS tr_municipio_version_delete$$
+-- CREATE TRIGGER tr_municipio_version_delete
+-- AFTER DELETE ON municipio
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'municipio'$$
+--
+-- DROP TRIGGER IF EXISTS tr_estadistica_categoria_version_insert$$
+-- CREATE TRIGGER tr_estadistica_categoria_version_insert
+-- AFTER INSERT ON estadistica_categoria
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'estadistica_categoria'$$
+--
+-- DROP TRIGGER IF EXISTS tr_estadistica_categoria_version_update$$
+-- CREATE TRIGGER tr_estadistica_categoria_version_update
+-- AFTER UPDATE ON estadistica_categoria
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'estadistica_categoria'$$
+--
+-- DROP TRIGGER IF EXISTS tr_estadistica_categoria_version_delete$$
+-- CREATE TRIGGER tr_estadistica_categoria_version_delete
+-- AFTER DELETE ON estadistica_categoria
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'estadistica_categoria'$$
+--
+-- DROP TRIGGER IF EXISTS tr_usuario_version_insert$$
+-- CREATE TRIGGER tr_usuario_version_insert
+-- AFTER INSERT ON usuario
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'usuario'$$
+--
+-- DROP TRIGGER IF EXISTS tr_usuario_version_update$$
+-- CREATE TRIGGER tr_usuario_version_update
+-- AFTER UPDATE ON usuario
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'usuario'$$
+--
+-- DROP TRIGGER IF EXISTS tr_usuario_version_delete$$
+-- CREATE TRIGGER tr_usuario_version_delete
+-- AFTER DELETE ON usuario
+-- FOR EACH ROW
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'usuario'$$
+-- DELIMITER ;
+
+-- ------------------------------------------------------------
+-- Migración: lápidas de filas eliminadas para el feed de cambios
+-- ------------------------------------------------------------
+-- CREATE TABLE registro_eliminados (
+--     id_eliminado BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+--     entidad VARCHAR(40) NOT NULL,
+--     clave VARCHAR(40) NOT NULL,
+--     fecha_eliminacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+--     INDEX idx_entidad_fecha (entidad, fecha_eliminacion),
+--     INDEX idx_fecha_eliminacion (fecha_eliminacion)
+-- ) ENGINE=InnoDB COMMENT='Filas eliminadas de convenios, instituciones, homologacion y municipio';
+--
+-- DELIMITER $$
+-- DROP TRIGGER IF EXISTS tr_convenios_registro_eliminados$$
+-- CREATE TRIGGER tr_convenios_registro_eliminados
+-- AFTER DELETE ON convenios
+-- FOR EACH ROW
+--     INSERT INTO registro_eliminados (entidad, clave) VALUES ('convenios', OLD.id_convenio)$$
+--
+-- DROP TRIGGER IF EXISTS tr_instituciones_registro_eliminados$$
+-- CREATE TRIGGER tr_instituciones_registro_eliminados
+-- AFTER DELETE ON instituciones
+-- FOR EACH ROW
+--     INSERT INTO registro_eliminados (entidad, clave) VALUES ('instituciones', OLD.nit_institucion)$$
+--
+-- DROP TRIGGER IF EXISTS tr_homologacion_registro_eliminados$$
+-- CREATE TRIGGER tr_homologacion_registro_eliminados
+-- AFTER DELETE ON homologacion
+-- FOR EACH ROW
+--     INSERT INTO registro_eliminados (entidad, clave) VALUES ('homologacion', OLD.id_homologacion)$$
+--
+-- DROP TRIGGER IF EXISTS tr_municipio_registro_eliminados$$
+-- CREATE TRIGGER tr_municipio_registro_eliminados
+-- AFTER DELETE ON municipio
+-- FOR EACH ROW
+--     INSERT INTO registro_eliminados (entidad, clave) VALUES ('municipio', OLD.id_municipio)$$
+-- DELIMITER ;
+--
+-- CREATE EVENT IF NOT EXISTS ev_purgar_registro_eliminados
+-- ON SCHEDULE EVERY 1 DAY
+-- DO
+--     DELETE FROM registro_eliminados
+--     WHERE fecha_eliminacion < NOW() - INTERVAL 30 DAY;
+
+-- ------------------------------------------------------------
+-- Migración: instantáneas de reportes (rpt_*)
+-- ------------------------------------------------------------
+-- ALTER TABLE convenios ADD INDEX idx_supervisor (supervisor(100));
+--
+-- CREATE TABLE rpt_pendientes (
+--     reporte VARCHAR(30) NOT NULL,
+--     clave VARCHAR(400) NOT NULL,
+--     marca INT UNSIGNED NOT NULL DEFAULT 0 COMMENT 'Cambia si la clave se vuelve a marcar durante un refresco',
+--     PRIMARY KEY (reporte, clave)
+-- ) ENGINE=InnoDB COMMENT='Claves de reportes pendientes de recalcular';
+--
+-- CREATE TABLE rpt_top_instituciones (
+--     nit_institucion VARCHAR(20) PRIMARY KEY,
+--     nombre_institucion VARCHAR(100),
+--     cant_convenios TINYINT UNSIGNED,
+--     nom_municipio VARCHAR(80),
+--     monto_total_convenios DECIMAL(17,2) NOT NULL DEFAULT 0,
+--     total_convenios_activos INT NOT NULL DEFAULT 0,
+--     INDEX idx_orden (cant_convenios DESC, monto_total_convenios DESC)
+-- ) ENGINE=InnoDB COMMENT='Instantánea de v_top_instituciones';
+--
+-- CREATE TABLE rpt_carga_supervisores (
+--     supervisor VARCHAR(400) PRIMARY KEY,
+--     total_convenios INT NOT NULL DEFAULT 0,
+--     convenios_activos INT NOT NULL DEFAULT 0,
+--     convenios_finalizados INT NOT NULL DEFAULT 0,
+--     monto_total_supervisado DECIMAL(17,2) NOT NULL DEFAULT 0,
+--     monto_promedio DECIMAL(17,2) NOT NULL DEFAULT 0,
+--     INDEX idx_orden (total_convenios DESC, monto_total_supervisado DESC)
+-- ) ENGINE=InnoDB COMMENT='Instantánea de v_carga_supervisores';
+--
+-- CREATE TABLE rpt_convenios_por_municipio (
+--     id_municipio VARCHAR(20) PRIMARY KEY,
+--     nom_municipio VARCHAR(80),
+--     total_instituciones INT NOT NULL DEFAULT 0,
+--     total_convenios INT NOT NULL DEFAULT 0,
+--     monto_total DECIMAL(17,2) NOT NULL DEFAULT 0,
+--     INDEX idx_orden (total_convenios DESC, monto_total DESC)
+-- ) ENGINE=InnoDB COMMENT='Instantánea de v_convenios_por_municipio';
+--
+-- CREATE TABLE rpt_resumen_homologaciones (
+--     nit_institucion VARCHAR(20) PRIMARY KEY,
+--     nombre_institucion VARCHAR(100),
+--     total_homologaciones INT NOT NULL DEFAULT 0,
+--     total_creditos_homologados BIGINT,
+--     promedio_creditos DECIMAL(10,2),
+--     modalidades_diferentes INT NOT NULL DEFAULT 0,
+--     niveles_diferentes INT NOT NULL DEFAULT 0,
+--     INDEX idx_orden (total_homologaciones DESC)
+-- ) ENGINE=InnoDB COMMENT='Instantánea de v_resumen_homologaciones';
+--
+-- CREATE TABLE rpt_convenios_activos (
+--     tipo_convenio_sena VARCHAR(50) PRIMARY KEY COMMENT 'Cadena vacía = convenios sin tipo',
+--     cantidad_activos INT NOT NULL DEFAULT 0,
+--     monto_total DECIMAL(17,2),
+--     monto_promedio DECIMAL(17,2),
+--     fecha_primer_convenio VARCHAR(50),
+--     fecha_ultimo_convenio VARCHAR(50),
+--     supervisores_distintos INT NOT NULL DEFAULT 0,
+--     INDEX idx_orden (cantidad_activos DESC)
+-- ) ENGINE=InnoDB COMMENT='Instantánea de v_estadisticas_convenios_activos';
+--
+-- DELIMITER $$
+-- DROP PROCEDURE IF EXISTS sp_rpt_marcar$$
+-- CREATE PROCEDURE sp_rpt_marcar(IN p_reporte VARCHAR(30), IN p_clave VARCHAR(400))
+-- BEGIN
+--     IF p_clave IS NOT NULL THEN
+--         INSERT INTO rpt_pendientes (reporte, clave) VALUES (p_reporte, p_clave)
+--         ON DUPLICATE KEY UPDATE marca = marca + 1;
+--     END IF;
+-- END$$
+--
+-- DROP PROCEDURE IF EXISTS sp_rpt_marcar_convenio$$
+-- CREATE PROCEDURE sp_rpt_marcar_convenio(
+--     IN p_nit VARCHAR(20),
+--     IN p_supervisor VARCHAR(400),
+--     IN p_tipo_convenio_sena VARCHAR(50)
+-- )
+-- BEGIN
+--     CALL sp_rpt_marcar('top_instituciones', p_nit);
+--     CALL sp_rpt_marcar('convenios_por_municipio',
+--         (SELECT id_municipio FROM instituciones WHERE nit_institucion = p_nit));
+--     CALL sp_rpt_marcar('carga_supervisores', p_supervisor);
+--     CALL sp_rpt_marcar('convenios_activos', COALESCE(p_tipo_convenio_sena, ''));
+-- END$$
+--
+-- DROP PROCEDURE IF EXISTS sp_rpt_marcar_institucion$$
+-- CREATE PROCEDURE sp_rpt_marcar_institucion(IN p_nit VARCHAR(20), IN p_id_municipio VARCHAR(20))
+-- BEGIN
+--     CALL sp_rpt_marcar('top_instituciones', p_nit);
+--     CALL sp_rpt_marcar('resumen_homologaciones', p_nit);
+--     CALL sp_rpt_marcar('convenios_por_municipio', p_id_municipio);
+-- END$$
+--
+-- -- Marca todas las claves (existentes en las tablas base o en las instantáneas) para
+-- -- reconstruir los reportes completos: carga inicial y corrección programada
+-- DROP PROCEDURE IF EXISTS sp_rpt_marcar_todos$$
+-- CREATE PROCEDURE sp_rpt_marcar_todos()
+-- BEGIN
+--     INSERT INTO rpt_pendientes (reporte, clave)
+--     SELECT reporte, clave FROM (
+--         SELECT 'top_instituciones' AS reporte, nit_institucion AS clave FROM instituciones
+--         UNION SELECT 'top_instituciones', nit_institucion FROM rpt_top_instituciones
+--         UNION SELECT 'resumen_homologaciones', nit_institucion FROM instituciones
+--         UNION SELECT 'resumen_homologaciones', nit_institucion FROM rpt_resumen_homologaciones
+--         UNION SELECT 'convenios_por_municipio', id_municipio FROM municipio
+--         UNION SELECT 'convenios_por_municipio', id_municipio FROM rpt_convenios_por_municipio
+--         UNION SELECT 'carga_supervisores', supervisor FROM convenios WHERE supervisor IS NOT NULL
+--         UNION SELECT 'carga_supervisores', supervisor FROM rpt_carga_supervisores
+--         UNION SELECT 'convenios_activos', COALESCE(tipo_convenio_sena, '') FROM convenios
+--         UNION SELECT 'convenios_activos', tipo_convenio_sena FROM rpt_convenios_activos
+--     ) AS claves
+--     ON DUPLICATE KEY UPDATE marca = marca + 1;
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_convenios_rpt_insert$$
+-- CREATE TRIGGER tr_convenios_rpt_insert
+-- AFTER INSERT ON convenios
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar_convenio(NEW.nit_institucion, NEW.supervisor, NEW.tipo_convenio_sena);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_convenios_rpt_update$$
+-- CREATE TRIGGER tr_convenios_rpt_update
+-- AFTER UPDATE ON convenios
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar_convenio(OLD.nit_institucion, OLD.supervisor, OLD.tipo_convenio_sena);
+--     CALL sp_rpt_marcar_convenio(NEW.nit_institucion, NEW.supervisor, NEW.tipo_convenio_sena);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_convenios_rpt_delete$$
+-- CREATE TRIGGER tr_convenios_rpt_delete
+-- AFTER DELETE ON convenios
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar_convenio(OLD.nit_institucion, OLD.supervisor, OLD.tipo_convenio_sena);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_instituciones_rpt_insert$$
+-- CREATE TRIGGER tr_instituciones_rpt_insert
+-- AFTER INSERT ON instituciones
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar_institucion(NEW.nit_institucion, NEW.id_municipio);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_instituciones_rpt_update$$
+-- CREATE TRIGGER tr_instituciones_rpt_update
+-- AFTER UPDATE ON instituciones
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar_institucion(OLD.nit_institucion, OLD.id_municipio);
+--     CALL sp_rpt_marcar_institucion(NEW.nit_institucion, NEW.id_municipio);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_instituciones_rpt_delete$$
+-- CREATE TRIGGER tr_instituciones_rpt_delete
+-- AFTER DELETE ON instituciones
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar_institucion(OLD.nit_institucion, OLD.id_municipio);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_homologacion_rpt_insert$$
+-- CREATE TRIGGER tr_homologacion_rpt_insert
+-- AFTER INSERT ON homologacion
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar('resumen_homologaciones', NEW.nit_institucion_destino);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_homologacion_rpt_update$$
+-- CREATE TRIGGER tr_homologacion_rpt_update
+-- AFTER UPDATE ON homologacion
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar('resumen_homologaciones', OLD.nit_institucion_destino);
+--     CALL sp_rpt_marcar('resumen_homologaciones', NEW.nit_institucion_destino);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_homologacion_rpt_delete$$
+-- CREATE TRIGGER tr_homologacion_rpt_delete
+-- AFTER DELETE ON homologacion
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar('resumen_homologaciones', OLD.nit_institucion_destino);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_municipio_rpt_insert$$
+-- CREATE TRIGGER tr_municipio_rpt_insert
+-- AFTER INSERT ON municipio
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar('convenios_por_municipio', NEW.id_municipio);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_municipio_rpt_update$$
+-- CREATE TRIGGER tr_municipio_rpt_update
+-- AFTER UPDATE ON municipio
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar('convenios_por_municipio', OLD.id_municipio);
+--     CALL sp_rpt_marcar('convenios_por_municipio', NEW.id_municipio);
+--     -- El nombre del municipio se copia en rpt_top_instituciones
+--     IF NOT (OLD.nom_municipio <=> NEW.nom_municipio) THEN
+--         INSERT INTO rpt_pendientes (reporte, clave)
+--         SELECT 'top_instituciones', nit_institucion FROM instituciones WHERE id_municipio = NEW.id_municipio
+--         ON DUPLICATE KEY UPDATE marca = marca + 1;
+--     END IF;
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_municipio_rpt_delete$$
+-- CREATE TRIGGER tr_municipio_rpt_delete
+-- AFTER DELETE ON municipio
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_rpt_marcar('convenios_por_municipio', OLD.id_municipio);
+-- END$$
+-- DELIMITER ;
+--
+-- CREATE EVENT IF NOT EXISTS ev_rpt_reconstruir
+-- ON SCHEDULE EVERY 1 DAY STARTS (CURRENT_DATE + INTERVAL 1 DAY + INTERVAL 2 HOUR)
+-- DO
+--     CALL sp_rpt_marcar_todos();
+--
+-- Carga inicial: marcar todas las claves (la primera lectura de cada reporte las calcula)
+-- CALL sp_rpt_marcar_todos();
+
+-- ------------------------------------------------------------
+-- Migración: estadísticas de convenios por periodo (estadistica_periodo)
+-- ------------------------------------------------------------
+-- CREATE TABLE estadistica_periodo (
+--     campo_fecha ENUM('firma', 'inicio') NOT NULL COMMENT 'Fecha del convenio que define el periodo',
+--     anio SMALLINT UNSIGNED NOT NULL,
+--     mes TINYINT UNSIGNED NOT NULL,
+--     tipo_convenio_sena VARCHAR(50) NOT NULL DEFAULT '' COMMENT 'Cadena vacía = convenios sin tipo',
+--     estado_convenio VARCHAR(50) NOT NULL DEFAULT '' COMMENT 'Cadena vacía = convenios sin estado',
+--     cantidad INT NOT NULL DEFAULT 0,
+--     suma_total DECIMAL(17,2) NOT NULL DEFAULT 0 COMMENT 'Suma de precio_estimado',
+--     fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+--     PRIMARY KEY (campo_fecha, anio, mes, tipo_convenio_sena, estado_convenio)
+-- ) ENGINE=InnoDB COMMENT='Estadísticas de convenios por periodo';
+--
+-- DELIMITER $$
+-- DROP TRIGGER IF EXISTS tr_convenios_periodo_insert$$
+-- CREATE TRIGGER tr_convenios_periodo_insert
+-- AFTER INSERT ON convenios
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_estadistica_periodo_convenio(NEW.fecha_firma, NEW.fecha_inicio,
+--         NEW.tipo_convenio_sena, NEW.estado_convenio, NEW.precio_estimado, 1);
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_convenios_periodo_update$$
+-- CREATE TRIGGER tr_convenios_periodo_update
+-- AFTER UPDATE ON convenios
+-- FOR EACH ROW
+-- BEGIN
+--     IF NOT (OLD.fecha_firma <=> NEW.fecha_firma)
+--        OR NOT (OLD.fecha_inicio <=> NEW.fecha_inicio)
+--        OR NOT (OLD.tipo_convenio_sena <=> NEW.tipo_convenio_sena)
+--        OR NOT (OLD.estado_convenio <=> NEW.estado_convenio)
+--        OR NOT (OLD.precio_estimado <=> NEW.precio_estimado) THEN
+--         CALL sp_estadistica_periodo_convenio(OLD.fecha_firma, OLD.fecha_inicio,
+--             OLD.tipo_convenio_sena, OLD.estado_convenio, OLD.precio_estimado, -1);
+--         CALL sp_estadistica_periodo_convenio(NEW.fecha_firma, NEW.fecha_inicio,
+--             NEW.tipo_convenio_sena, NEW.estado_convenio, NEW.precio_estimado, 1);
+--     END IF;
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_convenios_periodo_delete$$
+-- CREATE TRIGGER tr_convenios_periodo_delete
+-- AFTER DELETE ON convenios
+-- FOR EACH ROW
+-- BEGIN
+--     CALL sp_estadistica_periodo_convenio(OLD.fecha_firma, OLD.fecha_inicio,
+--         OLD.tipo_convenio_sena, OLD.estado_convenio, OLD.precio_estimado, -1);
+-- END$$
+-- DROP PROCEDURE IF EXISTS sp_estadistica_periodo_sumar$$
+-- CREATE PROCEDURE sp_estadistica_periodo_sumar(
+--     IN p_campo VARCHAR(10),
+--     IN p_fecha VARCHAR(50),
+--     IN p_tipo_convenio_sena VARCHAR(50),
+--     IN p_estado_convenio VARCHAR(50),
+--     IN p_monto DECIMAL(15,2),
+--     IN p_signo INT
+-- )
+-- BEGIN
+--     -- Solo fechas normalizadas (YYYY-MM-DD, ver la carga de archivos); 'N/A' y texto libre se omiten
+--     IF p_fecha REGEXP '^[0-9]{4}-(0[1-9]|1[0-2])' THEN
+--         INSERT INTO estadistica_periodo
+--             (campo_fecha, anio, mes, tipo_convenio_sena, estado_convenio, cantidad, suma_total)
+--         VALUES (
+--             p_campo,
+--             CAST(LEFT(p_fecha, 4) AS UNSIGNED),
+--             CAST(SUBSTRING(p_fecha, 6, 2) AS UNSIGNED),
+--             COALESCE(p_tipo_convenio_sena, ''),
+--             COALESCE(p_estado_convenio, ''),
+--             GREATEST(p_signo, 0),
+--             GREATEST(p_signo, 0) * COALESCE(p_monto, 0)
+--         )
+--         ON DUPLICATE KEY UPDATE
+--             cantidad = GREATEST(cantidad + p_signo, 0),
+--             suma_total = suma_total + p_signo * COALESCE(p_monto, 0);
+--     END IF;
+-- END$$
+--
+-- DROP PROCEDURE IF EXISTS sp_estadistica_periodo_convenio$$
+-- CREATE PROCEDURE sp_estadistica_periodo_convenio(
+--     IN p_fecha_firma VARCHAR(50),
+--     IN p_fecha_inicio VARCHAR(50),
+--     IN p_tipo_convenio_sena VARCHAR(50),
+--     IN p_estado_convenio VARCHAR(50),
+--     IN p_monto DECIMAL(15,2),
+--     IN p_signo INT
+-- )
+-- BEGIN
+--     CALL sp_estadistica_periodo_sumar('firma', p_fecha_firma, p_tipo_convenio_sena, p_estado_convenio, p_monto, p_signo);
+--     CALL sp_estadistica_periodo_sumar('inicio', p_fecha_inicio, p_tipo_convenio_sena, p_estado_convenio, p_monto, p_signo);
+-- END$$
+--
+-- Recalcula estadistica_periodo desde convenios (carga inicial y corrección de desvíos)
+-- DROP PROCEDURE IF EXISTS sp_recalcular_estadistica_periodo$$
+-- CREATE PROCEDURE sp_recalcular_estadistica_periodo()
+-- BEGIN
+--     DELETE FROM estadistica_periodo;
+--
+--     INSERT INTO estadistica_periodo
+--         (campo_fecha, anio, mes, tipo_convenio_sena, estado_convenio, cantidad, suma_total)
+--     SELECT 'firma', CAST(LEFT(fecha_firma, 4) AS UNSIGNED), CAST(SUBSTRING(fecha_firma, 6, 2) AS UNSIGNED),
+--            COALESCE(tipo_convenio_sena, ''), COALESCE(estado_convenio, ''),
+--            COUNT(*), COALESCE(SUM(precio_estimado), 0)
+--     FROM convenios
+--     WHERE fecha_firma REGEXP '^[0-9]{4}-(0[1-9]|1[0-2])'
+--     GROUP BY 2, 3, 4, 5
+--     UNION ALL
+--     SELECT 'inicio', CAST(LEFT(fecha_inicio, 4) AS UNSIGNED), CAST(SUBSTRING(fecha_inicio, 6, 2) AS UNSIGNED),
+--            COALESCE(tipo_convenio_sena, ''), COALESCE(estado_convenio, ''),
+--            COUNT(*), COALESCE(SUM(precio_estimado), 0)
+--     FROM convenios
+--     WHERE fecha_inicio REGEXP '^[0-9]{4}-(0[1-9]|1[0-2])'
+--     GROUP BY 2, 3, 4, 5;
+-- END$$
+-- DELIMITER ;
+--
+-- Carga inicial desde los convenios existentes
+-- CALL sp_recalcular_estadistica_periodo();
+
+-- ------------------------------------------------------------
+-- Migración: columnas *_norm llenadas por la aplicación
+-- ------------------------------------------------------------
+-- Las columnas generadas con LOWER/TRIM/REPLACE no coincidían con normalizar_texto
+-- (otras tildes, espacios repetidos). Pasan a ser columnas normales: se vacían y la
+-- aplicación las completa al iniciar (core.busqueda.completar_normalizadas).
+-- ALTER TABLE municipio
+--     MODIFY COLUMN nom_municipio_norm VARCHAR(80) COLLATE utf8mb4_bin DEFAULT NULL;
+-- ALTER TABLE instituciones
+--     MODIFY COLUMN nombre_institucion_norm VARCHAR(100) COLLATE utf8mb4_bin DEFAULT NULL,
+--     MODIFY COLUMN nit_institucion_norm VARCHAR(20) COLLATE utf8mb4_bin DEFAULT NULL,
+--     MODIFY COLUMN direccion_norm VARCHAR(100) COLLATE utf8mb4_bin DEFAULT NULL;
+-- ALTER TABLE convenios
+--     MODIFY COLUMN supervisor_norm VARCHAR(400) COLLATE utf8mb4_bin DEFAULT NULL;
+--
+-- UPDATE municipio SET nom_municipio_norm = NULL;
+-- UPDATE instituciones SET nombre_institucion_norm = NULL, nit_institucion_norm = NULL, direccion_norm = NULL;
+-- UPDATE convenios SET supervisor_norm = NULL;
+
+-- ------------------------------------------------------------
+-- Migración: versión de las tablas hijas en cambios de llave (ON UPDATE CASCADE)
+-- ------------------------------------------------------------
+-- DELIMITER $$
+-- DROP TRIGGER IF EXISTS tr_instituciones_version_update$$
+-- CREATE TRIGGER tr_instituciones_version_update
+-- AFTER UPDATE ON instituciones
+-- FOR EACH ROW
+-- BEGIN
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'instituciones';
+--     IF NOT (OLD.nit_institucion <=> NEW.nit_institucion) THEN
+--         UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--         WHERE entidad IN ('convenios', 'homologacion');
+--     END IF;
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_municipio_version_update$$
+-- CREATE TRIGGER tr_municipio_version_update
+-- AFTER UPDATE ON municipio
+-- FOR EACH ROW
+-- BEGIN
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'municipio';
+--     IF NOT (OLD.id_municipio <=> NEW.id_municipio) THEN
+--         UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--         WHERE entidad = 'instituciones';
+--     END IF;
+-- END$$
+--
+-- DROP TRIGGER IF EXISTS tr_rol_version_update$$
+-- CREATE TRIGGER tr_rol_version_update
+-- AFTER UPDATE ON rol
+-- FOR EACH ROW
+--     IF NOT (OLD.id_rol <=> NEW.id_rol) THEN
+--         UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--         WHERE entidad = 'usuario';
+--     END IF$$
+-- DELIMITER ;
+
+-- ------------------------------------------------------------
+-- Migración: límite de la purga de lápidas (registro_eliminados_purga)
+-- ------------------------------------------------------------
+-- Las purgas anteriores usaban el mismo corte de 30 días
+-- CREATE TABLE registro_eliminados_purga (
+--     id TINYINT UNSIGNED PRIMARY KEY,
+--     purgado_hasta TIMESTAMP NULL DEFAULT NULL
+-- ) ENGINE=InnoDB COMMENT='Límite de la última purga de registro_eliminados';
+-- INSERT INTO registro_eliminados_purga (id, purgado_hasta) VALUES (1, NOW() - INTERVAL 30 DAY);
+--
+-- DROP EVENT IF EXISTS ev_purgar_registro_eliminados;
+-- DELIMITER $$
+-- CREATE EVENT ev_purgar_registro_eliminados
+-- ON SCHEDULE EVERY 1 DAY
+-- DO
+-- BEGIN
+--     DECLARE v_corte TIMESTAMP DEFAULT NOW() - INTERVAL 30 DAY;
+--
+--     DELETE FROM registro_eliminados
+--     WHERE fecha_eliminacion < v_corte;
+--
+--     UPDATE registro_eliminados_purga SET purgado_hasta = v_corte
+--     WHERE id = 1 AND (purgado_hasta IS NULL OR purgado_hasta < v_corte);
+-- END$$
+-- DELIMITER ;
+
+-- ------------------------------------------------------------
+-- Migración: versión de las reconstrucciones de reportes (data_version 'rpt')
+-- ------------------------------------------------------------
+-- INSERT INTO data_version (entidad) VALUES ('rpt');
+--
+-- DELIMITER $$
+-- DROP PROCEDURE IF EXISTS sp_rpt_marcar_todos$$
+-- CREATE PROCEDURE sp_rpt_marcar_todos()
+-- BEGIN
+--     UPDATE data_version SET version = version + 1, fecha_actualizacion = CURRENT_TIMESTAMP(6)
+--     WHERE entidad = 'rpt';
+--
+--     INSERT INTO rpt_pendientes (reporte, clave)
+--     SELECT reporte, clave FROM (
+--         SELECT 'top_instituciones' AS reporte, nit_institucion AS clave FROM instituciones
+--         UNION SELECT 'top_instituciones', nit_institucion FROM rpt_top_instituciones
+--         UNION SELECT 'resumen_homologaciones', nit_institucion FROM instituciones
+--         UNION SELECT 'resumen_homologaciones', nit_institucion FROM rpt_resumen_homologaciones
+--         UNION SELECT 'convenios_por_municipio', id_municipio FROM municipio
+--         UNION SELECT 'convenios_por_municipio', id_municipio FROM rpt_convenios_por_municipio
+--         UNION SELECT 'carga_supervisores', supervisor FROM convenios WHERE supervisor IS NOT NULL
+--         UNION SELECT 'carga_supervisores', supervisor FROM rpt_carga_supervisores
+--         UNION SELECT 'convenios_activos', COALESCE(tipo_convenio_sena, '') FROM convenios
+--         UNION SELECT 'convenios_activos', tipo_convenio_sena FROM rpt_convenios_activos
+--     ) AS claves
+--     ON DUPLICATE KEY UPDATE marca = marca + 1;
+-- END$$
+-- DELIMITER ;
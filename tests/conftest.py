@@ -0,0 +1,99 @@
+import os
+import tempfile
+
+# core.config lee el entorno al importarse: se fija antes de importar la aplicación
+os.environ.setdefault("JWT_SECRET", "secreto-de-pruebas")
+os.environ["HASH_PROCESOS"] = "0"
+os.environ["METRICAS_DIR"] = ""
+os.environ["PERFILADO_DIR"] = tempfile.mkdtemp(prefix="perfiles_pruebas_")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.crud.convenios_crud
+import core.analitica
+import core.autorizacion
+import core.busqueda
+import core.cache
+import core.versiones
+import main
+from core.autorizacion import registro_usuarios
+from core.database import get_db
+from core.security import create_access_token
+from core.versiones import TABLAS_VERSIONADAS, registro_versiones
+
+# Módulos que usan el engine directamente, fuera de la sesión de la petición
+MODULOS_CON_ENGINE = (
+    core.autorizacion,
+    core.versiones,
+    core.busqueda,
+    core.analitica,
+    app.crud.convenios_crud,
+)
+
+ID_ADMINISTRADOR = 1
+ID_USUARIO = 2
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """Base de datos SQLite en memoria con los usuarios y las versiones de datos"""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conexion:
+        conexion.execute(text("CREATE TABLE usuario (id_usuario INTEGER PRIMARY KEY, id_rol INTEGER, estado INTEGER)"))
+        conexion.execute(
+            text("INSERT INTO usuario VALUES (:id_usuario, :id_rol, 1)"),
+            [{"id_usuario": ID_ADMINISTRADOR, "id_rol": 1}, {"id_usuario": ID_USUARIO, "id_rol": 2}]
+        )
+        conexion.execute(text(
+            "CREATE TABLE data_version (entidad TEXT PRIMARY KEY, version INTEGER, fecha_actualizacion TIMESTAMP)"
+        ))
+        conexion.execute(
+            text("INSERT INTO data_version VALUES (:entidad, 1, CURRENT_TIMESTAMP)"),
+            [{"entidad": tabla} for tabla in TABLAS_VERSIONADAS]
+        )
+    for modulo in MODULOS_CON_ENGINE:
+        monkeypatch.setattr(modulo, "engine", engine)
+
+    # Las copias en memoria no deben sobrevivir de una prueba a otra
+    registro_usuarios.invalidar()
+    registro_versiones.invalidar()
+    for cache in core.cache._caches.values():
+        cache.invalidar()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def cliente(engine):
+    """Cliente de la aplicación con get_db apuntando a la base de pruebas (sin ejecutar el lifespan)"""
+    Sesion = sessionmaker(bind=engine, autoflush=False)
+
+    def get_db_pruebas():
+        db = Sesion()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[get_db] = get_db_pruebas
+    yield TestClient(main.app)
+    main.app.dependency_overrides.pop(get_db, None)
+
+
+def _encabezados(id_usuario: int, id_rol: int) -> dict:
+    token = create_access_token({"sub": str(id_usuario), "rol": id_rol})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admin():
+    return _encabezados(ID_ADMINISTRADOR, 1)
+
+
+@pytest.fixture
+def no_admin():
+    return _encabezados(ID_USUARIO, 2)
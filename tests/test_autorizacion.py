@@ -0,0 +1,56 @@
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+import core.autorizacion
+from core.autorizacion import registro_usuarios
+from core.security import create_access_token
+from tests.conftest import ID_ADMINISTRADOR, ID_USUARIO
+
+
+def _contar_consultas(engine) -> list:
+    consultas = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: consultas.append(sql))
+    return consultas
+
+
+def test_usuario_inexistente_se_recuerda(engine):
+    assert registro_usuarios.rol_vigente(ID_ADMINISTRADOR) == 1
+    consultas = _contar_consultas(engine)
+
+    assert registro_usuarios.rol_vigente(99) is None
+    assert registro_usuarios.rol_vigente(99) is None
+    assert len([sql for sql in consultas if "id_usuario = " in sql]) == 1
+
+
+def test_usuario_desactivado_se_recuerda_hasta_el_refresco(engine):
+    assert registro_usuarios.rol_vigente(ID_USUARIO) == 2
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(f"UPDATE usuario SET estado = 0 WHERE id_usuario = {ID_USUARIO}")
+    registro_usuarios.invalidar()
+    consultas = _contar_consultas(engine)
+
+    assert registro_usuarios.rol_vigente(ID_USUARIO) is None
+    assert registro_usuarios.rol_vigente(ID_USUARIO) is None
+    assert len([sql for sql in consultas if "id_usuario = " in sql]) == 1
+
+    # Reactivado en otro worker: el refresco descarta el resultado negativo
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(f"UPDATE usuario SET estado = 1 WHERE id_usuario = {ID_USUARIO}")
+    registro_usuarios.invalidar()
+    assert registro_usuarios.rol_vigente(ID_USUARIO) == 2
+
+
+def test_base_de_datos_caida_responde_503(cliente, admin, monkeypatch):
+    class EngineCaido:
+        def connect(self):
+            raise OperationalError("SELECT 1", {}, Exception("Can't connect to MySQL server"))
+
+    # Con la copia cargada se sigue autorizando; un usuario que no está en ella requiere consultar
+    assert cliente.get("/meta/cache", headers=admin).status_code == 200
+    monkeypatch.setattr(core.autorizacion, "engine", EngineCaido())
+    registro_usuarios.invalidar()
+
+    assert cliente.get("/meta/cache", headers=admin).status_code == 200
+    nuevo = {"Authorization": f"Bearer {create_access_token({'sub': '3', 'rol': 1})}"}
+    respuesta = cliente.get("/meta/cache", headers=nuevo)
+    assert respuesta.status_code == 503
@@ -0,0 +1,53 @@
+import pytest
+
+from core.busqueda import IndiceTrigramas
+from core.versiones import registro_versiones
+
+
+@pytest.fixture
+def indice(engine):
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql("CREATE TABLE municipio (id_municipio INTEGER PRIMARY KEY, nom_municipio TEXT)")
+        conexion.exec_driver_sql("INSERT INTO municipio VALUES (1, 'Pereira'), (2, 'Dosquebradas')")
+    indice = IndiceTrigramas("municipio", "id_municipio", ("nom_municipio",))
+    indice._construir()
+    assert indice.vigente()
+    return indice
+
+
+def _escribir(engine, sentencia: str) -> None:
+    """Escritura de una fila con el incremento que hace el trigger de data_version"""
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(sentencia)
+        conexion.exec_driver_sql("UPDATE data_version SET version = version + 1 WHERE entidad = 'municipio'")
+    registro_versiones.invalidar()
+
+
+def test_escritura_local_no_reconstruye(engine, indice):
+    _escribir(engine, "INSERT INTO municipio VALUES (3, 'Santa Rosa de Cabal')")
+    indice.actualizar(3, {"nom_municipio": "Santa Rosa de Cabal"})
+
+    assert indice.vigente()
+    assert indice.buscar("nom_municipio", "rosa") == [3]
+
+
+def test_escritura_local_y_ajena_reconstruye(engine, indice):
+    _escribir(engine, "INSERT INTO municipio VALUES (3, 'Santa Rosa de Cabal')")
+    indice.actualizar(3, {"nom_municipio": "Santa Rosa de Cabal"})
+    # Otro worker escribe antes de la siguiente búsqueda: su fila no está en el índice
+    _escribir(engine, "INSERT INTO municipio VALUES (4, 'La Virginia')")
+
+    assert not indice.vigente()
+    indice._construir()
+    assert indice.vigente()
+    assert indice.buscar("nom_municipio", "virginia") == [4]
+
+
+def test_copia_de_versiones_anterior_a_la_escritura_local(engine, indice):
+    registro_versiones.versiones(("municipio",))
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql("UPDATE data_version SET version = version + 1 WHERE entidad = 'municipio'")
+    indice.eliminar(2)
+
+    # registro_versiones todavía tiene la versión anterior a la eliminación
+    assert indice.vigente()
@@ -0,0 +1,35 @@
+import pytest
+
+import app.router.meta as meta
+
+
+@pytest.fixture
+def purga(engine, monkeypatch):
+    monkeypatch.setattr(meta, "obtener_cambios", lambda db, desde, max_filas: {})
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(
+            "CREATE TABLE registro_eliminados_purga (id INTEGER PRIMARY KEY, purgado_hasta TIMESTAMP)"
+        )
+        conexion.exec_driver_sql("INSERT INTO registro_eliminados_purga (id) VALUES (1)")
+
+    def purgar_hasta(fecha):
+        with engine.begin() as conexion:
+            conexion.exec_driver_sql(f"UPDATE registro_eliminados_purga SET purgado_hasta = '{fecha}'")
+
+    return purgar_hasta
+
+
+def test_sin_purgas_todos_los_cursores_son_validos(cliente, admin, purga):
+    respuesta = cliente.get("/meta/cambios", params={"desde": "2001-01-01T00:00:00"}, headers=admin)
+
+    assert respuesta.status_code == 200
+
+
+def test_cursor_anterior_a_la_purga_expira(cliente, admin, purga):
+    purga("2024-06-01 00:00:00")
+
+    anterior = cliente.get("/meta/cambios", params={"desde": "2024-05-31T23:59:59"}, headers=admin)
+    posterior = cliente.get("/meta/cambios", params={"desde": "2024-06-01T00:00:00"}, headers=admin)
+
+    assert anterior.status_code == 410
+    assert posterior.status_code == 200
@@ -0,0 +1,32 @@
+from sqlalchemy import text
+
+import main
+from core.database import SessionLocal, get_db, metricas_pool
+
+
+def test_peticion_sin_consultas_no_toma_conexiones(cliente, no_admin):
+    # Con el get_db real: el engine de MySQL no tiene servidor, cualquier checkout fallaría
+    main.app.dependency_overrides.pop(get_db, None)
+    antes = dict(metricas_pool)
+
+    # El endpoint recibe la sesión pero el rol se rechaza antes de consultar
+    respuesta = cliente.get("/estadisticas/dashboard", headers=no_admin)
+
+    assert respuesta.status_code == 401
+    assert metricas_pool["sesiones_solicitadas"] == antes["sesiones_solicitadas"] + 1
+    assert metricas_pool["sesiones_materializadas"] == antes["sesiones_materializadas"]
+    assert metricas_pool["checkouts"] == antes["checkouts"]
+
+
+def test_sesion_usada_se_cuenta_una_vez(engine):
+    antes = metricas_pool["sesiones_materializadas"]
+    db = SessionLocal(bind=engine)
+    try:
+        assert metricas_pool["sesiones_materializadas"] == antes
+        db.execute(text("SELECT 1"))
+        db.commit()
+        db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+
+    assert metricas_pool["sesiones_materializadas"] == antes + 1
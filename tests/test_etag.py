@@ -0,0 +1,80 @@
+import pytest
+
+import app.crud.convenios_crud as crud_convenios
+import app.crud.estadistica_crud as crud_estadistica
+from core.analitica import instantanea_analitica
+from core.versiones import registro_versiones
+from tests.test_respuestas import FILAS_CONVENIOS, FILAS_ESTADISTICAS
+
+
+@pytest.fixture
+def filas(monkeypatch):
+    monkeypatch.setattr(crud_estadistica, "obtener_todas_estadisticas", lambda db: FILAS_ESTADISTICAS)
+    monkeypatch.setattr(crud_convenios, "obtener_todos_convenios", lambda db, *args, **kwargs: FILAS_CONVENIOS)
+
+
+@pytest.mark.parametrize("ruta", ["/estadisticas/obtener-todas", "/convenios/obtener-todos"])
+@pytest.mark.parametrize("parametros", [{}, {"rapido": "true"}])
+def test_etag_en_ambas_respuestas(cliente, admin, filas, ruta, parametros):
+    respuesta = cliente.get(ruta, params=parametros, headers=admin)
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"].startswith('W/"')
+    assert respuesta.headers["cache-control"] == "private, no-cache"
+
+    revalidacion = cliente.get(ruta, params=parametros, headers={**admin, "If-None-Match": respuesta.headers["etag"]})
+    assert revalidacion.status_code == 304
+    assert revalidacion.headers["etag"] == respuesta.headers["etag"]
+
+
+def test_etag_cambia_con_la_version(cliente, admin, filas, engine):
+    etag = cliente.get("/estadisticas/obtener-todas", headers=admin).headers["etag"]
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(
+            "UPDATE data_version SET version = version + 1 WHERE entidad = 'estadistica_categoria'"
+        )
+    registro_versiones.invalidar()
+
+    respuesta = cliente.get("/estadisticas/obtener-todas", headers={**admin, "If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] != etag
+
+
+@pytest.mark.parametrize("ruta, codigo", [
+    ("/convenios/obtener-todos", 403),
+    ("/convenios/buscar", 403),
+    ("/estadisticas/obtener-todas", 401),
+    ("/estadisticas/dashboard", 401),
+    ("/estadisticas/periodos", 401),
+    ("/homologaciones/obtener-todas-homologaciones/", 401),
+    ("/institucion/obtener-todas", 401),
+    ("/municipio/obtener-todos", 401),
+    ("/reportes/top-instituciones", 403),
+])
+def test_sin_permisos_no_recibe_304(cliente, no_admin, ruta, codigo):
+    respuesta = cliente.get(ruta, headers={**no_admin, "If-None-Match": "*"})
+
+    assert respuesta.status_code == codigo
+    assert "etag" not in respuesta.headers
+
+
+@pytest.mark.parametrize("ruta, parametros, metodo", [
+    ("/analitica/agrupar", {"por": "estado_convenio"}, "agrupar"),
+    ("/analitica/pivote", {"filas": "estado_convenio", "columnas": "anio_firma"}, "pivotar"),
+])
+def test_etag_en_analitica(cliente, admin, monkeypatch, ruta, parametros, metodo):
+    monkeypatch.setattr(instantanea_analitica, metodo, lambda *args: [{"estado_convenio": "Activo", "cantidad": 3}])
+
+    respuesta = cliente.get(ruta, params=parametros, headers=admin)
+    assert respuesta.status_code == 200
+    assert respuesta.headers["cache-control"] == "private, no-cache"
+
+    revalidacion = cliente.get(ruta, params=parametros, headers={**admin, "If-None-Match": respuesta.headers["etag"]})
+    assert revalidacion.status_code == 304
+
+
+@pytest.mark.parametrize("ruta", ["/analitica/agrupar", "/analitica/pivote"])
+def test_analitica_sin_permisos_no_recibe_304(cliente, no_admin, ruta):
+    respuesta = cliente.get(ruta, headers={**no_admin, "If-None-Match": "*"})
+
+    assert respuesta.status_code == 403
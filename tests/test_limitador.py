@@ -0,0 +1,42 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from core.config import settings
+from core.limitador import ip_cliente, limitar_por_ip
+
+PROXY = "10.0.0.5"
+
+
+def _peticion(reenviada: str = None, origen: str = PROXY) -> Request:
+    encabezados = [(b"x-forwarded-for", reenviada.encode())] if reenviada else []
+    return Request({"type": "http", "method": "POST", "path": "/token", "headers": encabezados, "client": (origen, 4321)})
+
+
+@pytest.fixture
+def proxy_confiable(monkeypatch):
+    monkeypatch.setattr(settings, "PROXIES_CONFIABLES", "10.0.0.0/8")
+    monkeypatch.setattr(settings, "LIMITE_ACTIVO", True)
+
+
+def test_ips_reenviadas_tienen_cubetas_separadas(proxy_confiable):
+    limitar = limitar_por_ip("prueba_reenviadas", 1, 0)
+
+    limitar(_peticion("203.0.113.1"))
+    with pytest.raises(HTTPException) as error:
+        limitar(_peticion("203.0.113.1"))
+    assert error.value.status_code == 429
+    # Otro cliente detrás del mismo proxy conserva su cupo
+    limitar(_peticion("203.0.113.2"))
+
+
+def test_ip_reenviada_solo_desde_proxies_confiables(proxy_confiable):
+    assert ip_cliente(_peticion("203.0.113.1", origen="198.51.100.7")) == "198.51.100.7"
+    # El cliente puede escribir las primeras entradas: cuenta la que agregó el último proxy confiable
+    assert ip_cliente(_peticion("1.2.3.4, 203.0.113.1, 10.0.0.9")) == "203.0.113.1"
+    assert ip_cliente(_peticion()) == PROXY
+
+
+def test_sin_proxies_confiables_usa_la_conexion(monkeypatch):
+    monkeypatch.setattr(settings, "PROXIES_CONFIABLES", "")
+    assert ip_cliente(_peticion("203.0.113.1")) == PROXY
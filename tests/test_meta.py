@@ -0,0 +1,43 @@
+import pytest
+
+from core.config import settings
+
+# Métricas de operación: solo administradores
+RUTAS_METRICAS = [
+    "/meta/pool",
+    "/meta/sql",
+    "/meta/notificaciones",
+    "/meta/limitador",
+    "/meta/cache",
+    "/meta/analitica",
+]
+
+
+@pytest.mark.parametrize("ruta", RUTAS_METRICAS)
+def test_metricas_requieren_token(cliente, ruta):
+    assert cliente.get(ruta).status_code == 401
+
+
+@pytest.mark.parametrize("ruta", RUTAS_METRICAS)
+def test_metricas_solo_administradores(cliente, no_admin, ruta):
+    assert cliente.get(ruta, headers=no_admin).status_code == 403
+
+
+@pytest.mark.parametrize("ruta", RUTAS_METRICAS)
+def test_metricas_administrador(cliente, admin, ruta):
+    assert cliente.get(ruta, headers=admin).status_code == 200
+
+
+def test_prometheus_con_token_de_metricas(cliente, monkeypatch):
+    monkeypatch.setattr(settings, "METRICAS_TOKEN", "token-del-scraper")
+
+    assert cliente.get("/meta/metrics").status_code == 401
+    assert cliente.get("/meta/metrics", headers={"Authorization": "Bearer otro"}).status_code == 401
+    respuesta = cliente.get("/meta/metrics", headers={"Authorization": "Bearer token-del-scraper"})
+    assert respuesta.status_code == 200
+    assert "# TYPE http_peticiones_total counter" in respuesta.text
+
+
+def test_prometheus_con_token_de_usuario(cliente, admin, no_admin):
+    assert cliente.get("/meta/metrics", headers=no_admin).status_code == 403
+    assert cliente.get("/meta/metrics", headers=admin).status_code == 200
@@ -0,0 +1,58 @@
+import json
+import os
+
+from core import metricas
+from core.config import settings
+
+
+def _instantanea_worker(pid: int, valor: float) -> dict:
+    return {
+        "pid": pid,
+        "hora": 0,
+        "familias": [
+            {"nombre": "prueba_total", "tipo": "counter", "ayuda": "Prueba",
+             "muestras": [{"etiquetas": {"ruta": "/a"}, "valor": valor}]},
+            {"nombre": "prueba_segundos", "tipo": "histogram", "ayuda": "Prueba", "limites": [1.0],
+             "muestras": [{"etiquetas": {}, "cuentas": [1, 1], "suma": 2.5, "total": 2}]},
+            {"nombre": "prueba_en_uso", "tipo": "gauge", "ayuda": "Prueba",
+             "muestras": [{"etiquetas": {}, "valor": 3}]},
+        ],
+    }
+
+
+def _escribir(directorio, pid: int, valor: float, vencido: bool) -> str:
+    ruta = os.path.join(directorio, f"worker_{pid}.json")
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(_instantanea_worker(pid, valor), archivo)
+    if vencido:
+        os.utime(ruta, (0, 0))
+    return ruta
+
+
+def test_totales_de_workers_terminados_no_retroceden(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICAS_DIR", str(tmp_path))
+    muerto = _escribir(tmp_path, 999001, 5, vencido=True)
+    _escribir(tmp_path, 999002, 2, vencido=False)
+
+    for _ in range(2):
+        texto = metricas.exportar_prometheus()
+        assert 'prueba_total{ruta="/a"} 7' in texto
+        assert "prueba_segundos_count 4" in texto
+        assert 'prueba_en_uso{worker="999002"} 3' in texto
+        assert 'worker="999001"' not in texto
+    assert not os.path.exists(muerto)
+
+    # Un segundo worker que termina se suma a los ya archivados
+    _escribir(tmp_path, 999003, 10, vencido=True)
+    assert 'prueba_total{ruta="/a"} 17' in metricas.exportar_prometheus()
+
+
+def test_exportacion_indica_cuantos_workers_incluye(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICAS_DIR", "")
+    assert "metricas_workers 1\n" in metricas.exportar_prometheus()
+
+    monkeypatch.setattr(settings, "METRICAS_DIR", str(tmp_path))
+    _escribir(tmp_path, 999003, 1, vencido=False)
+    _escribir(tmp_path, 999004, 1, vencido=True)
+    # El propio proceso y el worker vigente; el vencido solo aporta a los archivados
+    assert "metricas_workers 2\n" in metricas.exportar_prometheus()
@@ -0,0 +1,44 @@
+import asyncio
+
+from core.config import settings
+from core.notificaciones import CanalCambios
+
+
+def test_el_canal_sigue_despues_de_un_error(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICACIONES_INTERVALO", 0.01)
+    monkeypatch.setattr(settings, "NOTIFICACIONES_ESPERA_MAXIMA", 0.05)
+    canal = CanalCambios()
+    lecturas = iter([
+        {"convenios": 1},
+        RuntimeError("MySQL no responde"),
+        RuntimeError("MySQL no responde"),
+        {"convenios": 2},
+    ])
+
+    def leer_versiones():
+        lectura = next(lecturas, {"convenios": 2})
+        if isinstance(lectura, Exception):
+            raise lectura
+        return lectura
+
+    monkeypatch.setattr(canal, "_leer_versiones", leer_versiones)
+
+    async def escuchar():
+        cola = canal.suscribir()
+        try:
+            return await asyncio.wait_for(cola.get(), timeout=2)
+        finally:
+            canal.desuscribir(cola)
+            await asyncio.wait_for(canal._tarea, timeout=1)
+
+    evento = asyncio.run(escuchar())
+
+    assert evento["entidades"] == ["convenios"]
+    assert evento["versiones"] == {"convenios": 2}
+
+
+def test_espera_con_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICACIONES_INTERVALO", 2)
+    monkeypatch.setattr(settings, "NOTIFICACIONES_ESPERA_MAXIMA", 60)
+
+    assert [CanalCambios._espera(fallos) for fallos in range(7)] == [2, 4, 8, 16, 32, 60, 60]
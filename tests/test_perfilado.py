@@ -0,0 +1,55 @@
+import asyncio
+
+from starlette.responses import StreamingResponse
+
+from core.perfilado import MiddlewarePerfilado
+
+
+def test_administrador_recibe_el_perfil(cliente, admin):
+    respuesta = cliente.get("/meta/cache", headers={**admin, "X-Perfilar": "1"})
+
+    assert respuesta.status_code == 200
+    id_perfil = respuesta.headers["x-perfil-id"]
+    assert respuesta.headers["x-perfil-url"] == f"/meta/perfiles/{id_perfil}"
+    assert cliente.get(f"/meta/perfiles/{id_perfil}", headers=admin).status_code == 200
+
+
+def test_marca_ignorada_sin_ser_administrador(cliente, no_admin):
+    sin_marca = cliente.get("/meta/cache", headers=no_admin)
+    con_marca = cliente.get("/meta/cache", params={"perfilar": "1"}, headers={**no_admin, "X-Perfilar": "1"})
+
+    assert con_marca.status_code == sin_marca.status_code
+    assert con_marca.json() == sin_marca.json()
+    assert "x-perfil-id" not in con_marca.headers
+
+
+def test_streaming_envia_los_encabezados_sin_esperar_el_perfil(engine, admin):
+    enviados = []
+    primer_fragmento = asyncio.Event()
+
+    async def eventos():
+        # El encabezado debe haber salido antes de que el streaming produzca su primer fragmento
+        await primer_fragmento.wait()
+        yield b"data: 1\n\n"
+
+    async def aplicacion(scope, receive, send):
+        await StreamingResponse(eventos(), media_type="text/event-stream")(scope, receive, send)
+
+    async def recibir():
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def enviar(mensaje):
+        enviados.append(mensaje)
+        if mensaje["type"] == "http.response.start":
+            primer_fragmento.set()
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/meta/eventos", "query_string": b"",
+        "headers": [(nombre.lower().encode(), valor.encode()) for nombre, valor in admin.items()]
+                   + [(b"x-perfilar", b"1")],
+    }
+    asyncio.run(asyncio.wait_for(MiddlewarePerfilado(aplicacion)(scope, recibir, enviar), timeout=5))
+
+    assert enviados[0]["type"] == "http.response.start"
+    assert [m.get("body") for m in enviados[1:] if m.get("body")] == [b"data: 1\n\n"]
@@ -0,0 +1,64 @@
+import pytest
+
+import app.crud.reportes as crud_reportes
+from core.versiones import registro_versiones
+
+
+class SesionFalsa:
+    cerrada = False
+
+    def close(self):
+        self.cerrada = True
+
+
+def test_lectura_no_refresca(engine, monkeypatch):
+    monkeypatch.setattr(crud_reportes, "refrescar_reportes", lambda db: pytest.fail("La lectura no debe refrescar"))
+    monkeypatch.setattr(crud_reportes, "_leer_pagina", lambda db, nombre, limite, desplazamiento: [{"clave": "a"}])
+
+    assert crud_reportes.obtener_reporte(None, "top_instituciones", 10, 0) == [{"clave": "a"}]
+
+
+def test_refresco_en_segundo_plano_actualiza_la_cache(engine, monkeypatch):
+    pagina = ["anterior"]
+    sesion = SesionFalsa()
+    monkeypatch.setattr(crud_reportes, "_leer_pagina", lambda db, nombre, limite, desplazamiento: [pagina[0]])
+    monkeypatch.setattr(crud_reportes, "SessionLocal", lambda: sesion)
+
+    def refrescar(db):
+        pagina[0] = "refrescada"
+        return 3
+
+    monkeypatch.setattr(crud_reportes, "refrescar_reportes", refrescar)
+    assert crud_reportes.obtener_reporte(None, "top_instituciones", 10, 0) == ["anterior"]
+
+    # Una escritura solo despierta al hilo de refresco
+    crud_reportes._pedido_refresco.clear()
+    crud_reportes.programar_refresco_reportes()
+    assert crud_reportes._pedido_refresco.is_set()
+    crud_reportes._pedido_refresco.clear()
+
+    crud_reportes._refrescar_pendientes()
+    assert sesion.cerrada
+    assert crud_reportes.obtener_reporte(None, "top_instituciones", 10, 0) == ["refrescada"]
+
+
+def test_reconstruccion_cambia_etag_y_cache(cliente, admin, engine, monkeypatch):
+    lecturas = []
+    monkeypatch.setattr(crud_reportes, "refrescar_reportes", lambda db: 0)
+    monkeypatch.setattr(
+        crud_reportes, "_leer_pagina",
+        lambda db, nombre, limite, desplazamiento: lecturas.append(nombre) or []
+    )
+    respuesta = cliente.get("/reportes/top-instituciones", headers=admin)
+    etag = respuesta.headers["etag"]
+    assert cliente.get("/reportes/top-instituciones", headers={**admin, "If-None-Match": etag}).status_code == 304
+
+    # sp_rpt_marcar_todos en otro worker (p. ej. el evento nocturno ev_rpt_reconstruir)
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql("UPDATE data_version SET version = version + 1 WHERE entidad = 'rpt'")
+    registro_versiones.invalidar()
+
+    respuesta = cliente.get("/reportes/top-instituciones", headers={**admin, "If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] != etag
+    assert lecturas == ["top_instituciones", "top_instituciones"]
@@ -0,0 +1,61 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import app.crud.convenios_crud as crud_convenios
+import app.crud.estadistica_crud as crud_estadistica
+
+# Filas como las entrega PyMySQL: DECIMAL llega como Decimal y DATETIME como datetime
+FILAS_ESTADISTICAS = [
+    {
+        "id_estadistica": 1, "categoria": "convenios", "nombre": "Interadministrativo",
+        "cantidad": 12, "fecha_actualizacion": datetime(2024, 3, 5, 14, 30, 0),
+    },
+    {
+        "id_estadistica": 2, "categoria": "convenios", "nombre": "Marco",
+        "cantidad": 0, "fecha_actualizacion": datetime(2024, 3, 5, 14, 30, 0, 125000),
+    },
+]
+
+FILAS_CONVENIOS = [
+    {
+        **{campo: None for campo in crud_convenios.CAMPOS_CONVENIO},
+        "id_convenio": 7, "tipo_convenio": "Interadministrativo", "nombre_institucion": "GOBERNACIÓN DE RISARALDA",
+        "fecha_firma": "2024-01-15", "precio_estimado": Decimal("50000000.50"),
+    },
+    {
+        **{campo: None for campo in crud_convenios.CAMPOS_CONVENIO},
+        "id_convenio": 8, "precio_estimado": Decimal("0"),
+    },
+    {
+        **{campo: None for campo in crud_convenios.CAMPOS_CONVENIO},
+        "id_convenio": 9,
+    },
+]
+
+
+@pytest.mark.parametrize("ruta, modulo, funcion, filas", [
+    ("/estadisticas/obtener-todas", crud_estadistica, "obtener_todas_estadisticas", FILAS_ESTADISTICAS),
+    ("/convenios/obtener-todos", crud_convenios, "obtener_todos_convenios", FILAS_CONVENIOS),
+])
+def test_rapido_igual_a_response_model(cliente, admin, monkeypatch, ruta, modulo, funcion, filas):
+    monkeypatch.setattr(modulo, funcion, lambda db, *args, **kwargs: filas)
+
+    por_modelo = cliente.get(ruta, headers=admin)
+    rapido = cliente.get(ruta, params={"rapido": "true"}, headers=admin)
+
+    assert por_modelo.status_code == rapido.status_code == 200
+    assert rapido.headers["content-type"] == "application/json"
+    assert rapido.json() == por_modelo.json()
+
+
+def test_rapido_serializa_tipos_de_la_base_de_datos(cliente, admin, monkeypatch):
+    monkeypatch.setattr(crud_convenios, "obtener_todos_convenios", lambda db, *args, **kwargs: FILAS_CONVENIOS)
+
+    convenios = cliente.get("/convenios/obtener-todos", params={"rapido": "true"}, headers=admin).json()
+
+    assert convenios[0]["precio_estimado"] == 50000000.5
+    assert convenios[1]["precio_estimado"] == 0.0
+    assert convenios[2]["precio_estimado"] is None
+    assert convenios[2]["supervisor"] is None
@@ -0,0 +1,74 @@
+import threading
+
+from sqlalchemy.exc import OperationalError
+
+import core.versiones
+from core.config import settings
+from core.versiones import RegistroVersiones, TABLAS_VERSIONADAS
+
+
+class EngineCaido:
+    """Engine cuya conexión falla, como MySQL caído"""
+
+    def __init__(self):
+        self.intentos = 0
+
+    def connect(self):
+        self.intentos += 1
+        raise OperationalError("SELECT 1", {}, Exception("Can't connect to MySQL server"))
+
+
+def test_fallo_sirve_la_copia_anterior_sin_reintentar(engine, monkeypatch):
+    registro = RegistroVersiones()
+    copia = registro.versiones(TABLAS_VERSIONADAS)
+    assert copia is not None
+
+    caido = EngineCaido()
+    monkeypatch.setattr(core.versiones, "engine", caido)
+    monkeypatch.setattr(settings, "VERSIONES_REINTENTO", 60)
+    registro.invalidar()
+
+    for _ in range(5):
+        assert registro.versiones(TABLAS_VERSIONADAS) == copia
+    assert caido.intentos == 1
+
+    # Pasada la espera se vuelve a consultar
+    monkeypatch.setattr(settings, "VERSIONES_REINTENTO", 0)
+    monkeypatch.setattr(core.versiones, "engine", engine)
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql("UPDATE data_version SET version = 7 WHERE entidad = 'usuario'")
+    assert registro.versiones(("usuario",)) == (7,)
+
+
+def test_sin_copia_y_base_caida_retorna_none(monkeypatch):
+    monkeypatch.setattr(core.versiones, "engine", EngineCaido())
+    assert RegistroVersiones().versiones(("usuario",)) is None
+
+
+def test_un_solo_hilo_consulta_y_los_demas_no_esperan(engine, monkeypatch):
+    registro = RegistroVersiones()
+    copia = registro.versiones(("usuario",))
+
+    consultando = threading.Event()
+    liberar = threading.Event()
+
+    class EngineLento:
+        intentos = 0
+
+        def connect(self):
+            EngineLento.intentos += 1
+            consultando.set()
+            liberar.wait(5)
+            return engine.connect()
+
+    monkeypatch.setattr(core.versiones, "engine", EngineLento())
+    registro.invalidar()
+    hilo = threading.Thread(target=registro.versiones, args=(("usuario",),))
+    hilo.start()
+    assert consultando.wait(5)
+
+    # Mientras el primer hilo consulta, los demás responden con la copia anterior
+    assert registro.versiones(("usuario",)) == copia
+    liberar.set()
+    hilo.join(5)
+    assert EngineLento.intentos == 1